@@ -1,4 +1,26 @@
 from django.db import models
+from django.db.models.signals import pre_save
+from django.utils import timezone
+
+
+class ModificationDateTimeField(models.DateTimeField):
+    # Время последнего изменения записи, обновляется при каждом сохранении
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('auto_now', True)
+        super().__init__(*args, **kwargs)
+
+    def contribute_to_class(self, cls, name, **kwargs):
+        super().contribute_to_class(cls, name, **kwargs)
+        if not cls._meta.abstract:
+            pre_save.connect(self.fill_loaded, sender=cls)
+
+    def fill_loaded(self, sender, instance, raw=False, **kwargs):
+        # loaddata сохраняет объекты в обход auto_now: записи из фикстур
+        # без этого поля получают время создания
+        if raw and getattr(instance, self.attname) is None:
+            setattr(instance, self.attname, getattr(
+                instance, 'created_at', None,
+            ) or timezone.now())
 
 
 class Published(models.Model):
@@ -12,6 +34,9 @@ class Published(models.Model):
         auto_now_add=True,
         verbose_name='Добавлено',
     )
+    updated_at = ModificationDateTimeField(
+        verbose_name='Изменено',
+    )
 
     class Meta:
         abstract = True
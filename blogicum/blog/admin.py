@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from blog.models import Category, Comment, Location, Post
+from blog.search import matching_ids, to_match
 
 
 class PostsInline(admin.StackedInline):
@@ -23,6 +24,8 @@ class PostAdmin(admin.ModelAdmin):
         'location',
         'category',
         'is_published',
+        'is_visible',
+        'comment_count',
         'created_at',
     )
     list_editable = (
@@ -36,6 +39,14 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ('title',)
     list_display_links = ('title',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по заголовку и тексту идёт через индекс FTS5
+        if not to_match(search_term):
+            return super().get_search_results(
+                request, queryset, search_term,
+            )
+        return queryset.filter(pk__in=matching_ids(search_term)), False
+
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
@@ -44,3 +55,5 @@ class CommentAdmin(admin.ModelAdmin):
         'author',
         'created_at',
     )
+    # Путь ветки считается при создании, перенос ответа его бы сломал
+    readonly_fields = ('parent',)
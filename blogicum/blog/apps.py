@@ -1,7 +1,21 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
     verbose_name = 'Блог'
+
+    def ready(self):
+        from blog import signals  # noqa: F401
+        from blog.sqlite import configure_connection
+        post_migrate.connect(ensure_search_index, sender=self)
+        connection_created.connect(configure_connection)
+
+
+def ensure_search_index(using, **kwargs):
+    from blog.search import install_search_index
+    install_search_index(connections[using])
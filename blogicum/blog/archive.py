@@ -0,0 +1,103 @@
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from blog.models import MonthlyPostCount, Post
+
+SITE_SCOPE = 'all'
+
+
+def category_scope(category_id):
+    return f'category:{category_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def month_bounds(year, month):
+    # В СССР переход на летнее время бывал ровно в полночь первого числа,
+    # поэтому несуществующее локальное время разрешаем явно
+    start = timezone.make_aware(datetime(year, month, 1), is_dst=False)
+    if month == 12:
+        year, month = year + 1, 1
+    else:
+        month += 1
+    return start, timezone.make_aware(datetime(year, month, 1), is_dst=False)
+
+
+def scope_posts(scope):
+    posts = Post.objects.filter(is_visible=True)
+    if scope.startswith('category:'):
+        return posts.filter(category_id=scope.split(':')[1])
+    if scope.startswith('author:'):
+        return posts.filter(author_id=scope.split(':')[1])
+    return posts
+
+
+def archive_buckets(posts):
+    # posts — пары (pub_date, category_id, author_id) изменённых постов
+    buckets = set()
+    for pub_date, category_id, author_id in posts:
+        local = timezone.localtime(pub_date)
+        for scope in (
+            SITE_SCOPE, category_scope(category_id), author_scope(author_id),
+        ):
+            buckets.add((scope, local.year, local.month))
+    return buckets
+
+
+@transaction.atomic
+def refresh_archive(buckets):
+    # Пересчитываем только затронутые месяцы: каждый подсчёт идёт
+    # по индексу на pub_date в пределах одного месяца
+    for scope, year, month in buckets:
+        if scope == category_scope(None):
+            continue
+        start, end = month_bounds(year, month)
+        count = scope_posts(scope).filter(
+            pub_date__gte=start, pub_date__lt=end,
+        ).count()
+        if count:
+            MonthlyPostCount.objects.update_or_create(
+                scope=scope, year=year, month=month,
+                defaults={'post_count': count},
+            )
+        else:
+            MonthlyPostCount.objects.filter(
+                scope=scope, year=year, month=month,
+            ).delete()
+
+
+@transaction.atomic
+def rebuild_archive():
+    MonthlyPostCount.objects.all().delete()
+    tz = timezone.get_current_timezone()
+    visible = Post.objects.filter(is_visible=True).annotate(
+        year=ExtractYear('pub_date', tzinfo=tz),
+        month=ExtractMonth('pub_date', tzinfo=tz),
+    ).order_by()
+    rows = []
+    for group, make_scope in (
+        ((), lambda row: SITE_SCOPE),
+        (('category_id',), lambda row: category_scope(row['category_id'])),
+        (('author_id',), lambda row: author_scope(row['author_id'])),
+    ):
+        for row in visible.values('year', 'month', *group).annotate(
+            total=Count('pk'),
+        ).iterator():
+            rows.append(MonthlyPostCount(
+                scope=make_scope(row), year=row['year'], month=row['month'],
+                post_count=row['total'],
+            ))
+    MonthlyPostCount.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def archive_months(scope):
+    return MonthlyPostCount.objects.filter(scope=scope).order_by(
+        '-year', '-month',
+    )
@@ -0,0 +1,78 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.decorators import classonlymethod
+
+from blog.views import CategoryPosts, PostDetailView, PostListView, Profile
+
+_lock = threading.Lock()
+_executor = None
+
+
+def get_executor():
+    # Отдельный пул ограниченного размера: синхронные части Django
+    # под ASGI по умолчанию выполняются в одном общем потоке
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_VIEW_WORKERS,
+                thread_name_prefix='blog-async-view',
+            )
+        return _executor
+
+
+class AsyncViewMixin:
+    # Асинхронный вариант представления для ASGI: запросы к базе
+    # и рендеринг шаблона идут в пуле потоков, а цикл событий
+    # в это время обслуживает другие соединения
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        def handle(request, *args, **kwargs):
+            try:
+                response = view(request, *args, **kwargs)
+                if hasattr(response, 'render'):
+                    response.render()
+                return response
+            finally:
+                # Соединения потоков пула живут столько же, сколько
+                # соединения обычного запроса: CONN_MAX_AGE
+                close_old_connections()
+
+        async def async_view(request, *args, **kwargs):
+            return await sync_to_async(
+                handle, thread_sensitive=False, executor=get_executor(),
+            )(request, *args, **kwargs)
+
+        update_wrapper(async_view, view)
+        return async_view
+
+
+class AsyncPostListView(AsyncViewMixin, PostListView):
+    pass
+
+
+class AsyncCategoryPosts(AsyncViewMixin, CategoryPosts):
+    pass
+
+
+class AsyncProfile(AsyncViewMixin, Profile):
+    pass
+
+
+class AsyncPostDetailView(AsyncViewMixin, PostDetailView):
+    pass
+
+
+ASYNC_VARIANTS = {
+    PostListView: AsyncPostListView,
+    CategoryPosts: AsyncCategoryPosts,
+    Profile: AsyncProfile,
+    PostDetailView: AsyncPostDetailView,
+}
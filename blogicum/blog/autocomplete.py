@@ -0,0 +1,154 @@
+import threading
+from bisect import bisect_left, insort
+
+from django.urls import reverse
+
+from blog.cache import bump_version, scope_tokens
+from blog.models import Category, Location, User
+
+AUTOCOMPLETE_LIMIT = 10
+
+# Модель, поля (подпись первой) и флаг публикации для каждого вида
+# подсказок; снятые с публикации объекты в индекс не попадают
+AUTOCOMPLETE_KINDS = {
+    'user': (User, ('username',), None),
+    'category': (Category, ('title', 'slug'), 'is_published'),
+    'location': (Location, ('name',), 'is_published'),
+}
+
+# Страница объекта строится по последнему из полей
+AUTOCOMPLETE_URLS = {
+    'user': 'blog:profile',
+    'category': 'blog:category_posts',
+}
+
+
+def autocomplete_scope(kind):
+    return ('autocomplete', kind)
+
+
+def normalize(text):
+    return ' '.join(text.casefold().split())
+
+
+def prefix_keys(label):
+    # Ключ с начала каждого слова: «Нижний Новгород» найдётся и по «новг»
+    words = normalize(label).split(' ')
+    return {' '.join(words[position:]) for position in range(len(words))}
+
+
+class PrefixIndex:
+    # Отсортированный список пар (ключ, pk): ключи с общим префиксом
+    # лежат подряд, поэтому поиск — bisect и короткий проход вперёд
+    def __init__(self, rows=()):
+        self.values = {pk: tuple(values) for pk, *values in rows}
+        self.entries = sorted(
+            (key, pk) for pk, values in self.values.items()
+            for key in prefix_keys(values[0])
+        )
+
+    def remove(self, pk):
+        values = self.values.pop(pk, None)
+        if values is None:
+            return
+        for key in prefix_keys(values[0]):
+            position = bisect_left(self.entries, (key, pk))
+            if self.entries[position:position + 1] == [(key, pk)]:
+                del self.entries[position]
+
+    def add(self, pk, values):
+        self.remove(pk)
+        self.values[pk] = tuple(values)
+        for key in prefix_keys(values[0]):
+            insort(self.entries, (key, pk))
+
+    def search(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        prefix = normalize(prefix)
+        found = []
+        if not prefix:
+            return found
+        position = bisect_left(self.entries, (prefix,))
+        while position < len(self.entries) and len(found) < limit:
+            key, pk = self.entries[position]
+            if not key.startswith(prefix):
+                break
+            if pk not in found:
+                found.append(pk)
+            position += 1
+        return [(pk, self.values[pk]) for pk in found]
+
+
+def build_index(kind):
+    model, fields, published = AUTOCOMPLETE_KINDS[kind]
+    queryset = model.objects.all()
+    if published:
+        queryset = queryset.filter(**{published: True})
+    return PrefixIndex(
+        queryset.values_list('pk', *fields).iterator(chunk_size=5000)
+    )
+
+
+# Индексы живут в памяти процесса; поиск и правки идут под блокировкой,
+# чтобы не читать список посреди вставки
+_lock = threading.Lock()
+_indexes = {}
+
+
+def get_index(kind, token):
+    # Вызывать под _lock
+    cached = _indexes.get(kind)
+    if not cached or cached[0] != token:
+        _indexes[kind] = cached = (token, build_index(kind))
+    return cached[1]
+
+
+def search(kind, query, limit=AUTOCOMPLETE_LIMIT, token=None):
+    if token is None:
+        token, = scope_tokens((autocomplete_scope(kind),))
+    with _lock:
+        return get_index(kind, token).search(query, limit)
+
+
+def autocomplete(query, kinds=AUTOCOMPLETE_KINDS, limit=AUTOCOMPLETE_LIMIT):
+    # Версии всех индексов читаются одним запросом
+    tokens = scope_tokens([autocomplete_scope(kind) for kind in kinds])
+    results = []
+    for kind, token in zip(kinds, tokens):
+        for pk, values in search(kind, query, limit, token):
+            url_name = AUTOCOMPLETE_URLS.get(kind)
+            results.append({
+                'kind': kind,
+                'id': pk,
+                'label': values[0],
+                'url': reverse(url_name, args=[values[-1]])
+                if url_name else None,
+            })
+    return results
+
+
+def refresh_entry(kind, instance, deleted=False):
+    # Индекс этого процесса правится на месте и получает новую версию;
+    # другие процессы увидят смену версии и перестроят свой индекс.
+    # Если локальный индекс уже отстал от общей версии, он сбрасывается
+    _, fields, published = AUTOCOMPLETE_KINDS[kind]
+    listed = not deleted and (not published or getattr(instance, published))
+    with _lock:
+        current, = scope_tokens((autocomplete_scope(kind),))
+        cached = _indexes.pop(kind, None)
+        token = bump_version(*autocomplete_scope(kind))
+        if not cached or cached[0] != current:
+            return
+        index = cached[1]
+        if listed:
+            index.add(instance.pk, [
+                getattr(instance, field) for field in fields
+            ])
+        else:
+            index.remove(instance.pk)
+        _indexes[kind] = (token, index)
+
+
+def invalidate_autocomplete():
+    # После массовых правок в обход сигналов, например загрузки дампа
+    for kind in AUTOCOMPLETE_KINDS:
+        bump_version(*autocomplete_scope(kind))
@@ -0,0 +1,118 @@
+import asyncio
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+
+# Адрес клиента не из INTERNAL_IPS, чтобы не включалась панель DjDT
+CLIENT_ADDR = '192.0.2.1'
+
+
+def wsgi_environ(path, query='', method='GET', body=b'', meta=None):
+    return {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost',
+        'REMOTE_ADDR': CLIENT_ADDR,
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        **(meta or {}),
+    }
+
+
+def asgi_scope(path, query=''):
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'localhost')],
+        'client': (CLIENT_ADDR, 0),
+        'server': ('localhost', 80),
+    }
+
+
+def run_wsgi(requests, concurrency):
+    # Многопоточный WSGI-сервер: по потоку на одновременный запрос
+    handler = WSGIHandler()
+
+    def fetch(request):
+        statuses = []
+        started = time.perf_counter()
+        body = handler(
+            wsgi_environ(*request),
+            lambda status, headers, exc_info=None: statuses.append(status),
+        )
+        for _ in body:
+            pass
+        # close() отправляет request_finished, как это делает сервер
+        body.close()
+        return time.perf_counter() - started, int(statuses[0].split()[0])
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        started = time.perf_counter()
+        results = list(pool.map(fetch, requests))
+        return results, time.perf_counter() - started
+
+
+def run_asgi(requests, concurrency):
+    # Один цикл событий и не больше concurrency запросов в обработке
+    async def main():
+        handler = ASGIHandler()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def fetch(request):
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            async with semaphore:
+                started = time.perf_counter()
+                await handler(asgi_scope(*request), receive, send)
+                return time.perf_counter() - started, messages[0]['status']
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*map(fetch, requests))
+        return results, time.perf_counter() - started
+
+    return asyncio.run(main())
+
+
+def summarize(results, elapsed):
+    latencies = sorted(latency for latency, _ in results)
+
+    def percentile(share):
+        index = min(len(latencies) - 1, int(len(latencies) * share))
+        return round(latencies[index] * 1000, 2)
+
+    return {
+        'requests': len(results),
+        'errors': sum(status >= 400 for _, status in results),
+        'rps': round(len(results) / elapsed, 1),
+        'p50_ms': percentile(0.5),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+    }
@@ -0,0 +1,247 @@
+import time
+from datetime import datetime
+from hashlib import md5
+from http import HTTPStatus
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from blog.models import CacheVersion, Category, User
+
+
+def version_key(model_name, pk):
+    return f'blog:version:{model_name}:{pk}'
+
+
+def bump_version(model_name, pk):
+    token = uuid4().hex
+    key = version_key(model_name, pk)
+    if not CacheVersion.objects.filter(key=key).update(
+        token=token, updated_at=timezone.now(),
+    ):
+        # Одновременная первая смена версии: достаточно любой из двух
+        CacheVersion.objects.bulk_create(
+            [CacheVersion(key=key, token=token)], ignore_conflicts=True,
+        )
+    return token
+
+
+def get_versions(keys):
+    # Раздел, версия которого ещё не менялась, имеет пустую версию
+    versions = dict.fromkeys(keys, '')
+    versions.update(CacheVersion.objects.filter(
+        key__in=versions,
+    ).values_list('key', 'token'))
+    return versions
+
+
+def invalidate_pages(category_ids=(), author_ids=(), posts_changed=True):
+    # Сбрасываем кэш ленты и только тех страниц категорий и профилей,
+    # где мог отображаться изменённый объект; posts_changed=False —
+    # изменились только комментарии, а не сами посты. Ленты RSS и Atom
+    # комментариев не содержат и имеют свои версии
+    bump_version('feed_page', 'all')
+    if posts_changed:
+        bump_version('facet_index', 'all')
+        bump_version('feed', 'all')
+    for slug in Category.objects.filter(
+        pk__in=category_ids
+    ).values_list('slug', flat=True):
+        bump_version('category_page', slug)
+        if posts_changed:
+            bump_version('category_feed', slug)
+    for username in User.objects.filter(
+        pk__in=author_ids
+    ).values_list('username', flat=True):
+        bump_version('profile_page', username)
+        if posts_changed:
+            bump_version('profile_feed', username)
+
+
+def invalidate_posts_pages(posts, posts_changed=True):
+    category_ids, author_ids = set(), set()
+    for category_id, author_id in posts.values_list(
+        'category_id', 'author_id'
+    ).distinct():
+        category_ids.add(category_id)
+        author_ids.add(author_id)
+    invalidate_pages(category_ids, author_ids, posts_changed)
+
+
+def attach_post_card_versions(posts):
+    # Версия карточки складывается из версий поста, категории,
+    # местоположения и автора; все они читаются одним запросом
+    keys = {
+        post.pk: (
+            version_key('post', post.pk),
+            version_key('category', post.category_id),
+            version_key('location', post.location_id),
+            version_key('user', post.author_id),
+        )
+        for post in posts
+    }
+    versions = get_versions(
+        {key for post_keys in keys.values() for key in post_keys}
+    )
+    for post in posts:
+        post.card_version = '-'.join(
+            versions[key] for key in keys[post.pk]
+        )
+
+
+def scope_versions(scopes):
+    # Версии разделов и время их последней смены
+    keys = [version_key(*scope) for scope in scopes]
+    versions = dict.fromkeys(keys, ('', None))
+    versions.update(
+        (key, (token, updated_at))
+        for key, token, updated_at in CacheVersion.objects.filter(
+            key__in=keys,
+        ).values_list('key', 'token', 'updated_at')
+    )
+    return [versions[key] for key in keys]
+
+
+def scope_tokens(scopes):
+    return [token for token, _ in scope_versions(scopes)]
+
+
+def page_cache_key(name, tokens, request):
+    # В ключ входят путь с параметрами (номер страницы или курсор),
+    # версии затронутых разделов и интервал времени для отложенных постов
+    bucket = int(time.time() // settings.PAGE_CACHE_BUCKET)
+    raw = '|'.join((request.get_full_path(), str(bucket), *tokens))
+    return f'blog:page:{name}:{md5(raw.encode()).hexdigest()}'
+
+
+def record_page_cache_access(name, hit):
+    # Счётчики приблизительные: incr файлового кэша читает и пишет
+    # значение без блокировки между процессами
+    key = f'blog:page_stats:{name}:{"hits" if hit else "misses"}'
+    stats = caches['stats']
+    stats.add(key, 0, None)
+    stats.incr(key)
+
+
+def get_page_cache_stats(names):
+    stats = caches['stats'].get_many([
+        f'blog:page_stats:{name}:{kind}'
+        for name in names for kind in ('hits', 'misses')
+    ])
+    return {
+        name: (
+            stats.get(f'blog:page_stats:{name}:hits', 0),
+            stats.get(f'blog:page_stats:{name}:misses', 0),
+        )
+        for name in names
+    }
+
+
+def reset_page_cache_stats(names):
+    caches['stats'].delete_many([
+        f'blog:page_stats:{name}:{kind}'
+        for name in names for kind in ('hits', 'misses')
+    ])
+
+
+class AnonymousPageCacheMixin:
+    # Кэширует готовые страницы для GET-запросов анонимных читателей
+    page_cache_name = None
+
+    page_cache_versions = None
+
+    def get_page_cache_scopes(self):
+        return (('feed_page', 'all'),)
+
+    def get_page_cache_versions(self):
+        # Читаются один раз за запрос: по ним же ConditionalGetMixin
+        # строит ETag и Last-Modified
+        if self.page_cache_versions is None:
+            self.page_cache_versions = scope_versions(
+                self.get_page_cache_scopes()
+            )
+        return self.page_cache_versions
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET' or request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+        key = page_cache_key(self.page_cache_name, [
+            token for token, _ in self.get_page_cache_versions()
+        ], request)
+        response = cache.get(key)
+        record_page_cache_access(self.page_cache_name, response is not None)
+        if response is not None:
+            response['X-Page-Cache'] = 'HIT'
+            return response
+        response = super().dispatch(request, *args, **kwargs)
+        response['X-Page-Cache'] = 'MISS'
+        if response.status_code != HTTPStatus.OK:
+            return response
+        if hasattr(response, 'add_post_render_callback'):
+            response.add_post_render_callback(
+                lambda rendered: cache.set(
+                    key, rendered, settings.PAGE_CACHE_TIMEOUT,
+                )
+            )
+        else:
+            cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+        return response
+
+
+class ConditionalGetMixin:
+    # Отвечает 304 Not Modified по ETag и Last-Modified без рендеринга
+    # шаблона. Для списков они строятся по версиям разделов кэша страниц:
+    # версия меняется при любой правке, видной в списке, и хранит время
+    # этой правки
+    def get_conditional_state(self):
+        versions = self.get_page_cache_versions()
+        return {
+            'tokens': [token for token, _ in versions],
+            'updated_at': max(
+                (updated_at for _, updated_at in versions if updated_at),
+                default=None,
+            ),
+        }
+
+    def get_etag(self, state):
+        request = self.request
+        raw = '|'.join(map(str, (
+            request.get_full_path(),
+            request.user.pk,
+            # Страница залогиненного пользователя содержит CSRF-токен
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+            if request.user.is_authenticated else '',
+            *state.values(),
+        )))
+        return quote_etag(md5(raw.encode()).hexdigest())
+
+    @staticmethod
+    def get_last_modified(state):
+        last_modified = max(
+            (value for value in state.values()
+             if isinstance(value, datetime)),
+            default=None,
+        )
+        return int(last_modified.timestamp()) if last_modified else None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        state = self.get_conditional_state()
+        etag = self.get_etag(state)
+        last_modified = self.get_last_modified(state)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified,
+        )
+        if response is not None:
+            return response
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == HTTPStatus.OK:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
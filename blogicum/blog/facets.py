@@ -0,0 +1,431 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from copy import copy
+from datetime import datetime, time, timedelta
+from heapq import merge
+from itertools import chain, islice
+
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from blog.cache import scope_tokens
+from blog.models import Location, Post
+
+FACETS = ('category', 'location', 'author')
+
+# Версия индекса меняется вместе с составом или разметкой видимых
+# постов, но не от новых комментариев
+FACET_SCOPE = ('facet_index', 'all')
+
+# Сколько самых частых значений фасета показывать
+FACET_VALUES_LIMIT = 10
+
+# Быстрые фильтры по дате: число дней и подпись
+DATE_PRESETS = ((7, 'За неделю'), (30, 'За месяц'), (365, 'За год'))
+
+# Больший период в ?days= не фильтрует вовсе
+MAX_FILTER_DAYS = 100 * 365
+
+# Посты, изменённые незадолго до прошлой сверки, читаются ещё раз:
+# транзакция могла записать updated_at раньше, а закоммитить позже
+SYNC_OVERLAP = timedelta(minutes=1)
+
+# Сегменты индекса сливаются, когда изменений больше этого числа
+# и двадцатой части постов
+COMPACT_MIN_CHANGES = 1000
+
+
+def hidden_locations():
+    # Снятые с публикации местоположения в фасет не попадают
+    return frozenset(
+        Location.objects.filter(is_published=False).values_list(
+            'pk', flat=True,
+        )
+    )
+
+
+class FacetSegment:
+    # Посты в порядке ленты (новые первыми): id, дата и по столбцу
+    # на фасет, а у каждого значения фасета — отсортированные номера
+    # его постов. Диапазон дат — отрезок номеров, выборка с фильтрами —
+    # отсортированный список номеров
+    def __init__(self, rows):
+        self.ids, self.keys = array('q'), array('d')
+        self.columns = {facet: array('q') for facet in FACETS}
+        positions = {facet: {} for facet in FACETS}
+        for position, (pk, timestamp, *values) in enumerate(rows):
+            self.ids.append(pk)
+            self.keys.append(-timestamp)
+            for facet, value in zip(FACETS, values):
+                self.columns[facet].append(value or 0)
+                if value:
+                    positions[facet].setdefault(value, []).append(position)
+        self.positions = {
+            facet: {
+                value: array('l', value_positions)
+                for value, value_positions in values.items()
+            }
+            for facet, values in positions.items()
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    @cached_property
+    def by_id(self):
+        # Номера постов по возрастанию id: поиск поста по id при сверке
+        order = sorted(range(len(self.ids)), key=self.ids.__getitem__)
+        return array('q', map(self.ids.__getitem__, order)), array('l', order)
+
+    def position(self, pk):
+        ids, order = self.by_id
+        index = bisect_left(ids, pk)
+        if index < len(ids) and ids[index] == pk:
+            return order[index]
+        return None
+
+    def rows(self, positions=None):
+        if positions is None:
+            positions = range(len(self.ids))
+        for position in positions:
+            yield (
+                self.ids[position], -self.keys[position],
+                *(self.columns[facet][position] for facet in FACETS),
+            )
+
+    def sort_key(self, position):
+        return self.keys[position], -self.ids[position]
+
+    def date_range(self, start=None, end=None):
+        # Номера постов с start <= pub_date < end
+        low = 0 if end is None else bisect_right(self.keys, -end.timestamp())
+        high = len(self.keys) if start is None else bisect_right(
+            self.keys, -start.timestamp(),
+        )
+        return range(low, max(low, high))
+
+    def select(self, start, end, chosen):
+        selected = self.date_range(start, end)
+        if not chosen:
+            return selected
+        # Список строится по самому редкому фасету, остальные фильтры
+        # проверяются по столбцам
+        low, high = selected.start, selected.stop
+        candidates = {
+            facet: [
+                items[bisect_left(items, low):bisect_left(items, high)]
+                for items in map(self.positions[facet].get, values)
+                if items
+            ]
+            for facet, values in chosen.items()
+        }
+        first = min(
+            candidates, key=lambda facet: sum(map(len, candidates[facet])),
+        )
+        selected = sorted(chain.from_iterable(candidates.pop(first)))
+        for facet in candidates:
+            column, values = self.columns[facet], chosen[facet]
+            selected = [
+                position for position in selected
+                if column[position] in values
+            ]
+        return selected
+
+    def counts(self, selected, facet):
+        if isinstance(selected, range):
+            return Counter({
+                value: (
+                    bisect_left(items, selected.stop)
+                    - bisect_left(items, selected.start)
+                )
+                for value, items in self.positions[facet].items()
+            })
+        column = self.columns[facet]
+        return Counter(column[position] for position in selected)
+
+
+class FacetSelection:
+    # Выборка по обоим сегментам индекса без постов, убранных
+    # из основного
+    def __init__(self, index, base, delta):
+        self.index, self.delta = index, delta
+        removed = index.removed
+        if isinstance(base, range):
+            self.base_removed = removed[
+                bisect_left(removed, base.start):
+                bisect_left(removed, base.stop)
+            ]
+        else:
+            removed = set(removed)
+            base = [position for position in base if position not in removed]
+            self.base_removed = ()
+        self.base = base
+
+    def __len__(self):
+        return len(self.base) - len(self.base_removed) + len(self.delta)
+
+    def ids_at(self, offset, limit):
+        base, delta = self.index.base, self.index.delta
+        if not self.base_removed and not self.delta:
+            return [
+                base.ids[position]
+                for position in self.base[offset:offset + limit]
+            ]
+        removed = set(self.base_removed)
+        merged = merge(
+            (
+                (*base.sort_key(position), base.ids[position])
+                for position in self.base if position not in removed
+            ),
+            (
+                (*delta.sort_key(position), delta.ids[position])
+                for position in self.delta
+            ),
+        )
+        return [pk for *_, pk in islice(merged, offset, offset + limit)]
+
+
+class FacetIndex:
+    # Основной сегмент строится по всем видимым постам один раз. После
+    # изменений в нём только отмечаются номера убранных постов, а их
+    # новые версии и новые посты попадают в малый сегмент; когда
+    # изменений набирается много, сегменты сливаются
+    def __init__(self, rows, hidden=frozenset(), synced_at=None):
+        self.base = FacetSegment(rows)
+        self.removed = array('l')
+        self.delta = FacetSegment(())
+        self.hidden = {'location': hidden}
+        self.synced_at = synced_at
+
+    @staticmethod
+    def row(pk, pub_date, *values):
+        return (pk, pub_date.timestamp(), *values)
+
+    @classmethod
+    def build(cls):
+        synced_at = timezone.now()
+        rows = Post.objects.filter(is_visible=True).order_by(
+            '-pub_date', '-id',
+        ).values_list(
+            'pk', 'pub_date', 'category_id', 'location_id', 'author_id',
+        ).iterator(chunk_size=5000)
+        return cls(
+            (cls.row(*row) for row in rows), hidden_locations(), synced_at,
+        )
+
+    def __len__(self):
+        return len(self.base) - len(self.removed) + len(self.delta)
+
+    def synced(self):
+        # Новый индекс из текущего и постов, изменённых после прошлой
+        # сверки; удалённые посты находятся по расхождению числа постов
+        synced_at = timezone.now()
+        changed = {}
+        for pk, is_visible, *row in Post.objects.filter(
+            updated_at__gte=self.synced_at - SYNC_OVERLAP,
+        ).values_list(
+            'pk', 'is_visible',
+            'pub_date', 'category_id', 'location_id', 'author_id',
+        ):
+            changed[pk] = self.row(pk, *row) if is_visible else None
+        removed = set(self.removed)
+        removed.update(
+            position for position in map(self.base.position, changed)
+            if position is not None
+        )
+        delta = [row for row in self.delta.rows() if row[0] not in changed]
+        delta += filter(None, changed.values())
+        visible = Post.objects.filter(is_visible=True)
+        total = visible.count()
+        if len(self.base) - len(removed) + len(delta) != total:
+            # Посты удаляли: сверяемся с id всех видимых постов
+            ids = set(visible.values_list('pk', flat=True))
+            removed.update(
+                position for position, pk in enumerate(self.base.ids)
+                if pk not in ids
+            )
+            delta = [row for row in delta if row[0] in ids]
+            if len(self.base) - len(removed) + len(delta) != total:
+                # Пост стал видимым без отметки updated_at
+                return self.build()
+        if len(removed) + len(delta) > max(
+            COMPACT_MIN_CHANGES, len(self.base) // 20,
+        ):
+            rows = list(self.base.rows(
+                position for position in range(len(self.base))
+                if position not in removed
+            )) + delta
+            rows.sort(key=lambda row: (-row[1], -row[0]))
+            return FacetIndex(rows, hidden_locations(), synced_at)
+        index = copy(self)
+        index.removed = array('l', sorted(removed))
+        index.delta = FacetSegment(
+            sorted(delta, key=lambda row: (-row[1], -row[0]))
+        )
+        index.hidden = {'location': hidden_locations()}
+        index.synced_at = synced_at
+        return index
+
+    def select(self, filters, skip=None):
+        chosen = {
+            facet: filters.values[facet] - self.hidden.get(facet, set())
+            for facet in FACETS
+            if facet != skip and filters.values[facet]
+        }
+        return FacetSelection(self, *(
+            segment.select(filters.start, filters.end, chosen)
+            for segment in (self.base, self.delta)
+        ))
+
+    def facet_counts(self, filters, facet):
+        # Счётчик значения учитывает все фильтры, кроме своего фасета,
+        # чтобы было видно, сколько постов добавит ещё одна галочка
+        selected = self.select(filters, skip=facet)
+        counts = self.base.counts(selected.base, facet)
+        counts.subtract(
+            self.base.columns[facet][position]
+            for position in selected.base_removed
+        )
+        counts.update(self.delta.counts(selected.delta, facet))
+        hidden = self.hidden.get(facet, ())
+        return {
+            value: count for value, count in counts.items()
+            if value and value not in hidden
+            and (count or value in filters.values[facet])
+        }
+
+    def ids_at(self, selected, offset, limit):
+        return selected.ids_at(offset, limit)
+
+
+_lock = threading.Lock()
+_index_cache = {}
+
+
+def get_facet_index():
+    # Индекс строится один раз на процесс, а после смены версии раздела
+    # дополняется изменёнными постами
+    token, = scope_tokens((FACET_SCOPE,))
+    cached = _index_cache.get('index')
+    if cached and cached[0] == token:
+        return cached[1]
+    with _lock:
+        cached = _index_cache.get('index')
+        if cached and cached[0] == token:
+            return cached[1]
+        index = cached[1].synced() if cached else FacetIndex.build()
+        _index_cache['index'] = (token, index)
+        return index
+
+
+def parse_ids(values):
+    return {int(value) for value in values if value.isdigit()}
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def local_midnight(day, shift=0):
+    # Даты у границ календаря не укладываются в datetime вместе
+    # с часовым поясом; для них None — фильтр не применяется
+    try:
+        return timezone.make_aware(datetime.combine(
+            day + timedelta(days=shift), time.min,
+        ), is_dst=False)
+    except OverflowError:
+        return None
+
+
+class FacetFilters:
+    # Фильтры из строки запроса: ?category=1&location=2&days=30
+    # или ?date_from=2023-01-01&date_to=2023-01-31
+    def __init__(self, params):
+        self.values = {
+            facet: parse_ids(params.getlist(facet)) for facet in FACETS
+        }
+        self.date_from = parse_date(params.get('date_from'))
+        self.date_to = parse_date(params.get('date_to'))
+        days = params.get('days', '')
+        self.days = (
+            int(days) if days.isdigit()
+            and 0 < int(days) <= MAX_FILTER_DAYS else None
+        )
+        self.start = self.end = None
+        if self.days:
+            self.start = timezone.now() - timedelta(days=self.days)
+        elif self.date_from:
+            self.start = local_midnight(self.date_from)
+            if self.start is None:
+                self.date_from = None
+        if self.date_to and not self.days:
+            self.end = local_midnight(self.date_to, shift=1)
+            if self.end is None:
+                self.date_to = None
+
+    def params(self, **changes):
+        params = [
+            (facet, value) for facet in FACETS
+            for value in sorted(changes.get(facet, self.values[facet]))
+        ]
+        if self.days:
+            params.append(('days', self.days))
+        else:
+            if self.date_from:
+                params.append(('date_from', self.date_from.isoformat()))
+            if self.date_to:
+                params.append(('date_to', self.date_to.isoformat()))
+        return params
+
+    def toggled(self, facet, value):
+        return self.params(**{facet: self.values[facet] ^ {value}})
+
+    def for_days(self, days):
+        params = [
+            (facet, value) for facet in FACETS
+            for value in sorted(self.values[facet])
+        ]
+        if days:
+            params.append(('days', days))
+        return params
+
+
+def facet_values(index, filters, facet, limit=FACET_VALUES_LIMIT):
+    # Самые частые значения и все выбранные: (значение, число, выбрано)
+    counts = index.facet_counts(filters, facet)
+    selected = filters.values[facet]
+    top = sorted(counts, key=lambda value: (-counts[value], value))[:limit]
+    top += sorted(value for value in selected if value not in top)
+    return [
+        (value, counts.get(value, 0), value in selected) for value in top
+    ]
+
+
+class FacetResults:
+    # Последовательность для Paginator поверх выборки индекса
+    def __init__(self, index, filters):
+        self.index = index
+        self.selected = index.select(filters)
+
+    def count(self):
+        return len(self.selected)
+
+    def __len__(self):
+        return len(self.selected)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        if stop is None or stop <= start:
+            return []
+        ids = self.index.ids_at(self.selected, start, stop - start)
+        posts = Post.objects.select_related(
+            'author', 'category', 'location',
+        ).in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
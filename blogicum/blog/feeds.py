@@ -0,0 +1,172 @@
+import os
+import tempfile
+from hashlib import md5
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Max
+from django.http import Http404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+
+from blog.cache import scope_tokens
+from blog.models import Category, Post, User
+
+
+class StreamingFeedMixin:
+    # Посты читаются из базы и пишутся в документ по одному,
+    # поэтому длинная лента не собирается в памяти целиком
+    def __init__(self, *args, item_source=(), latest=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.item_source = item_source
+        self.latest = latest
+
+    def latest_post_date(self):
+        return self.latest or super().latest_post_date()
+
+    def write_items(self, handler):
+        for item in self.item_source:
+            self.items = []
+            self.add_item(**item)
+            super().write_items(handler)
+        self.items = []
+
+
+class StreamingRssFeed(StreamingFeedMixin, Rss201rev2Feed):
+    pass
+
+
+class StreamingAtomFeed(StreamingFeedMixin, Atom1Feed):
+    pass
+
+
+FEED_TYPES = {
+    'rss': StreamingRssFeed,
+    'atom': StreamingAtomFeed,
+}
+
+
+def feed_source(category=None, author=None):
+    # Те же правила видимости, что у ленты, категории и профиля
+    # для постороннего читателя
+    posts = Post.objects.filter(is_visible=True)
+    if category is not None:
+        category = Category.objects.filter(
+            slug=category, is_published=True,
+        ).first()
+        if category is None:
+            raise Http404('Категория не найдена.')
+        return (
+            f'Блогикум — {category.title}', category.description,
+            reverse('blog:category_posts', args=[category.slug]),
+            posts.filter(category=category),
+        )
+    if author is not None:
+        user = User.objects.filter(username=author).first()
+        if user is None:
+            raise Http404('Пользователь не найден.')
+        return (
+            f'Блогикум — @{user.username}', f'Публикации @{user.username}',
+            reverse('blog:profile', args=[user.username]),
+            posts.filter(author=user),
+        )
+    return (
+        'Блогикум', 'Новые публикации', reverse('blog:index'), posts,
+    )
+
+
+def feed_items(posts, request):
+    for post in posts.iterator(chunk_size=settings.FEED_CHUNK_SIZE):
+        link = request.build_absolute_uri(
+            reverse('blog:post_detail', args=[post.pk])
+        )
+        yield dict(
+            title=post.title,
+            link=link,
+            description=post.text,
+            unique_id=link,
+            author_name=post.author.username,
+            pubdate=post.pub_date,
+            updateddate=post.updated_at,
+            categories=(post.category.title,),
+        )
+
+
+def open_descriptor(path):
+    # Файл открывается по дескриптору: FileResponse не будет искать его
+    # по имени, которое к моменту ответа может смениться или исчезнуть
+    return open(os.open(path, os.O_RDONLY), 'rb')
+
+
+def feed_path(feed_format, category=None, author=None):
+    # Адрес самой ленты без строки запроса: файл ленты общий
+    # для всех читателей
+    if category is not None:
+        return reverse('blog:category_feed', args=[category, feed_format])
+    if author is not None:
+        return reverse('blog:profile_feed', args=[author, feed_format])
+    return reverse('blog:feed', args=[feed_format])
+
+
+def write_feed(path, feed_format, request, category=None, author=None):
+    title, description, link, posts = feed_source(category, author)
+    posts = posts.select_related('author', 'category').order_by(
+        '-pub_date', '-id',
+    )[:settings.FEED_ITEMS]
+    feed = FEED_TYPES[feed_format](
+        title=title,
+        link=request.build_absolute_uri(link),
+        description=description,
+        feed_url=request.build_absolute_uri(
+            feed_path(feed_format, category, author)
+        ),
+        language=settings.LANGUAGE_CODE,
+        item_source=feed_items(posts, request),
+        latest=Post.objects.filter(
+            pk__in=posts.values('pk')
+        ).aggregate(latest=Max('updated_at'))['latest'],
+    )
+    # Готовый файл подменяется атомарно, читатели не увидят половину
+    # ленты; открытый дескриптор переживает удаление устаревшего файла
+    descriptor, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as outfile:
+            feed.write(outfile, 'utf-8')
+        feed_file = open_descriptor(temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return feed_file
+
+
+def feed_scopes(category=None, author=None):
+    # Версии меняются только вместе с постами, категорией или автором,
+    # но не с комментариями
+    if category is not None:
+        return (('category_feed', category),)
+    if author is not None:
+        return (('profile_feed', author),)
+    return (('feed', 'all'),)
+
+
+def open_feed(feed_format, request, category=None, author=None):
+    # Файл ленты пересобирается только после смены версии раздела,
+    # опрос читателями отдаёт уже готовый файл без запросов к базе
+    token, = scope_tokens(feed_scopes(category, author))
+    # Ссылки в файле абсолютные: схема и хост входят в его имя
+    prefix = md5('|'.join(map(str, (
+        feed_format, category, author, request.scheme, request.get_host(),
+    ))).encode()).hexdigest()
+    root = Path(settings.FEED_ROOT)
+    path = root / f'{prefix}-{token}.xml'
+    try:
+        return open_descriptor(path), path
+    except FileNotFoundError:
+        pass
+    root.mkdir(parents=True, exist_ok=True)
+    feed_file = write_feed(path, feed_format, request, category, author)
+    for stale in root.glob(f'{prefix}-*.xml'):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return feed_file, path
@@ -1,6 +1,82 @@
 from django import forms
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
+from django.urls import reverse
+from PIL import Image
 
 from blog.models import Comment, Post, User
+from blog.uploads import RejectedUpload
+
+
+class AutocompleteWidget(forms.TextInput):
+    # Поле поиска с подсказками вместо списка из всех строк таблицы;
+    # выбранный pk уходит в скрытом поле с именем исходного
+    template_name = 'widgets/autocomplete.html'
+
+    class Media:
+        js = ('js/autocomplete.js',)
+
+    def __init__(self, kind, attrs=None):
+        super().__init__(attrs)
+        self.kind = kind
+        self.choices = ()
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget'].update(
+            url=f'{reverse("blog:autocomplete")}?kind={self.kind}',
+            label=self.selected_label(value),
+        )
+        return context
+
+    def selected_label(self, value):
+        # Подпись выбранного объекта — один запрос по pk, а не весь список
+        if not str(value).isdigit():
+            return ''
+        selected = self.choices.queryset.filter(pk=value).first()
+        return str(selected) if selected else ''
+
+
+class PostImageField(forms.ImageField):
+    # Размер файла и число пикселей проверяются до проверки Pillow,
+    # которая декодирует фото: по заголовку, без чтения пикселей
+    def to_python(self, data):
+        if data in self.empty_values:
+            return super().to_python(data)
+        if (isinstance(data, RejectedUpload)
+                or data.size > settings.POST_IMAGE_MAX_SIZE):
+            raise forms.ValidationError(
+                'Файл больше %(limit)s.',
+                code='file_too_large',
+                params={'limit': filesizeformat(settings.POST_IMAGE_MAX_SIZE)},
+            )
+        width, height = self.header_size(data)
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            raise forms.ValidationError(
+                'Фото больше %(limit)s мегапикселей.',
+                code='too_many_pixels',
+                params={'limit': settings.POST_IMAGE_MAX_PIXELS // 10 ** 6},
+            )
+        return super().to_python(data)
+
+    @staticmethod
+    def header_size(data):
+        if hasattr(data, 'temporary_file_path'):
+            source = data.temporary_file_path()
+        else:
+            source = data
+            data.seek(0)
+        try:
+            with Image.open(source) as image:
+                return image.size
+        except Image.DecompressionBombError:
+            return float('inf'), 1
+        except OSError:
+            # Не фото: ошибку покажет ImageField
+            return 0, 0
+        finally:
+            if source is data:
+                data.seek(0)
 
 
 class PostForm(forms.ModelForm):
@@ -8,10 +84,13 @@ class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ('title', 'text', 'pub_date', 'location', 'category', 'image')
+        field_classes = {'image': PostImageField}
         widgets = {
             'pub_date': forms.DateTimeInput(
                 format='%Y-%m-%dT%H:%M', attrs={'type': 'datetime-local'}
-            )
+            ),
+            'location': AutocompleteWidget('location'),
+            'category': AutocompleteWidget('category'),
         }
 
 
@@ -0,0 +1,254 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from PIL import Image
+
+from blog.cache import bump_version, invalidate_posts_pages
+from blog.imaging import (
+    SAVE_FORMATS, VARIANT_FORMATS, read_header, render_renditions,
+    rendition_name, variant_formats,
+)
+from blog.models import ImageBlob, Post
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pool = None
+
+
+def get_pool():
+    # Пул процессов: Pillow держит GIL на декодировании и ресайзе.
+    # spawn, а не fork: форк многопоточного сервера может зависнуть
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def rendition_job(post):
+    return (
+        post.image.path, post.image.name, settings.POST_IMAGE_WIDTHS,
+        variant_formats(settings.POST_IMAGE_FORMATS),
+    )
+
+
+def renditions_current(post):
+    # Копии сделаны для этого фото и во всех доступных форматах
+    meta = post.image_meta
+    return meta.get('name') == post.image.name and meta.get(
+        'formats'
+    ) == variant_formats(settings.POST_IMAGE_FORMATS)
+
+
+def store_renditions(pk, name, result):
+    # Копии относятся к конкретному файлу: если фото успели заменить,
+    # запись не изменится
+    updated = Post.objects.filter(pk=pk, image=name).update(
+        image_meta={'name': name, **result},
+        updated_at=timezone.now(),
+    )
+    if updated:
+        bump_version('post', pk)
+        invalidate_posts_pages(
+            Post.objects.filter(pk=pk), posts_changed=False,
+        )
+
+
+def renditions_done(pk, name, future):
+    # Выполняется в служебном потоке пула
+    try:
+        store_renditions(pk, name, future.result())
+    except Exception:
+        logger.exception('Не удалось подготовить копии фото %s', name)
+    finally:
+        close_old_connections()
+
+
+def schedule_renditions(post):
+    # Копии готовятся после коммита: процесс пула читает файл,
+    # а запрос не ждёт окончания обработки
+    job = rendition_job(post)
+
+    def submit():
+        # Тот же файл у другого поста: копии уже готовы
+        for other in Post.objects.filter(image=job[1]).exclude(
+            pk=post.pk
+        ).only('image', 'image_meta'):
+            if renditions_current(other):
+                store_renditions(post.pk, job[1], {
+                    key: value for key, value in other.image_meta.items()
+                    if key != 'name'
+                })
+                return
+        if not settings.IMAGE_WORKERS:
+            try:
+                store_renditions(post.pk, job[1], render_renditions(*job))
+            except Exception:
+                logger.exception(
+                    'Не удалось подготовить копии фото %s', job[1],
+                )
+            return
+        get_pool().submit(render_renditions, *job).add_done_callback(
+            partial(renditions_done, post.pk, job[1])
+        )
+
+    transaction.on_commit(submit)
+
+
+def record_image_header(post):
+    # Размеры и формат известны сразу после загрузки, до копий:
+    # страница поста не будет прыгать уже при первом показе
+    try:
+        with Image.open(post.image.path) as image:
+            header = read_header(image, post.image.path)
+    except OSError:
+        logger.warning('Не удалось прочитать фото %s', post.image.name)
+        return
+    post.image_meta = {'name': post.image.name, **header}
+    Post.objects.filter(pk=post.pk).update(image_meta=post.image_meta)
+
+
+def image_meta(post):
+    # Сведения о текущем фото; устаревшие, если фото заменили, не нужны
+    meta = post.image_meta
+    if not post.image or meta.get('name') != post.image.name:
+        return {}
+    return meta
+
+
+def image_sources(post, max_width=None):
+    # Готовые копии текущего фото и сам оригинал как самый широкий
+    # вариант: пары (адрес, ширина) по возрастанию
+    meta = image_meta(post)
+    sources = [
+        (post.image.storage.url(name), width)
+        for width, name in meta.get('renditions', ())
+        if max_width is None or width <= max_width
+    ]
+    width = meta.get('width')
+    if sources and width and (max_width is None or width <= max_width):
+        sources.append((post.image.url, width))
+    return sources
+
+
+def image_files(name):
+    # Фото, его копии и их варианты во всех форматах
+    names = [name]
+    for width in settings.POST_IMAGE_WIDTHS:
+        names += [
+            rendition_name(name, width, suffix)
+            for suffix in set(SAVE_FORMATS.values())
+        ]
+    return [
+        file_name + suffix for file_name in names
+        for suffix in ('', *VARIANT_FORMATS.values())
+    ]
+
+
+def claim_image(name):
+    # Хранилище отмечает файл раньше, чем проверяет его и отдаёт имя:
+    # файл без ссылок с недавней отметкой не удаляется, а удаление,
+    # начатое в это время, отметка дождётся, и файл запишется заново
+    now = timezone.now()
+    blobs = ImageBlob.objects.filter(name=name)
+    if blobs.update(claimed_at=now):
+        return
+    try:
+        with transaction.atomic():
+            ImageBlob.objects.create(name=name, claimed_at=now)
+    except IntegrityError:
+        blobs.update(claimed_at=now)
+
+
+def settle_image(name):
+    # Пост сохранён с этим файлом: отметка хранилища больше не нужна
+    ImageBlob.objects.filter(name=name, claimed_at__isnull=False).update(
+        claimed_at=None,
+    )
+
+
+def acquire_image(name):
+    # Сначала запись, а не чтение: строку файла не удалят между
+    # проверкой и увеличением счётчика
+    refs = ImageBlob.objects.filter(name=name)
+    if refs.update(ref_count=F('ref_count') + 1, claimed_at=None):
+        return
+    try:
+        with transaction.atomic():
+            ImageBlob.objects.create(name=name, ref_count=1)
+    except IntegrityError:
+        refs.update(ref_count=F('ref_count') + 1, claimed_at=None)
+
+
+def unused_images():
+    # Файлы без ссылок, которые хранилище давно не отдавало
+    claimed_before = timezone.now() - timedelta(
+        seconds=settings.IMAGE_CLAIM_TTL,
+    )
+    return ImageBlob.objects.filter(ref_count=0).filter(
+        Q(claimed_at__isnull=True) | Q(claimed_at__lt=claimed_before),
+    )
+
+
+def release_image(name):
+    # Файл без ссылок удаляется после коммита, если за это время
+    # его не загрузили снова
+    ImageBlob.objects.filter(name=name, ref_count__gt=0).update(
+        ref_count=F('ref_count') - 1,
+    )
+    deleted, _ = unused_images().filter(name=name).delete()
+    if deleted:
+        transaction.on_commit(partial(delete_image_files, name))
+
+
+def clear_unused_images():
+    # Файлы, которые загрузили, но так и не сохранили в посте
+    total = 0
+    for name in unused_images().values_list('name', flat=True):
+        deleted, _ = unused_images().filter(name=name).delete()
+        if deleted:
+            delete_image_files(name)
+            total += 1
+    return total
+
+
+def delete_image_files(name):
+    # Пока файлы удаляются, их строка без ссылок держит блокировку:
+    # загрузка тех же байтов ждёт коммита и записывает файл заново
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                blob = ImageBlob.objects.create(name=name)
+        except IntegrityError:
+            # На файл снова ссылаются
+            return
+        storage = Post._meta.get_field('image').storage
+        for file_name in image_files(name):
+            storage.delete(file_name)
+        blob.delete()
+
+
+def recount_images():
+    # Счётчики ссылок по постам: после загрузки дампа и для старых фото
+    counts = dict(Post.objects.exclude(image='').values_list(
+        'image',
+    ).annotate(total=Count('pk')).order_by())
+    with transaction.atomic():
+        ImageBlob.objects.exclude(name__in=counts).delete()
+        for name, total in counts.items():
+            ImageBlob.objects.update_or_create(
+                name=name, defaults={'ref_count': total},
+            )
+    return len(counts)
@@ -0,0 +1,167 @@
+# Обработка фото постов на Pillow. Модуль выполняется в процессах пула
+# и не должен импортировать Django
+import os
+from pathlib import PurePosixPath
+
+from PIL import Image, ImageOps
+
+# Форматы, в которых сохраняются копии; остальные сохраняются в PNG
+SAVE_FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp'}
+
+# Варианты файла в современных форматах лежат рядом с ним:
+# photo.jpg -> photo.jpg.avif, photo.jpg.webp. Порядок — предпочтение
+VARIANT_FORMATS = {'AVIF': '.avif', 'WEBP': '.webp'}
+
+VARIANT_TYPES = {'.avif': 'image/avif', '.webp': 'image/webp'}
+
+# Сторона уменьшенного фото, по которому выбирается цвет-заглушка
+PLACEHOLDER_SIZE = 64
+
+# Значения тега Orientation, при которых фото повёрнуто на 90°
+ROTATED = {5, 6, 7, 8}
+
+
+def rendition_name(name, width, suffix):
+    # Копия лежит рядом с оригиналом: photo.jpg -> photo.640w.jpg
+    path = PurePosixPath(name)
+    return str(path.with_name(f'{path.stem}.{width}w{suffix}'))
+
+
+def variant_formats(formats):
+    # Форматы из списка, которые умеет сохранять установленный Pillow
+    # (AVIF — только с подключаемым модулем)
+    Image.init()
+    return [
+        image_format for image_format in VARIANT_FORMATS
+        if image_format in formats and image_format in Image.SAVE
+    ]
+
+
+def oriented_size(image):
+    width, height = image.size
+    if image.getexif().get(0x0112) in ROTATED:
+        return height, width
+    return width, height
+
+
+def save_variants(image, path, formats, quality):
+    # Метаданные в варианты не переносятся; вариант не больше
+    # исходного файла, иначе он не нужен
+    if image.mode not in ('RGB', 'RGBA'):
+        transparent = 'A' in image.mode or 'transparency' in image.info
+        image = image.convert('RGBA' if transparent else 'RGB')
+    size = os.path.getsize(path)
+    for image_format in formats:
+        variant = path + VARIANT_FORMATS[image_format]
+        image.save(variant, image_format, quality=quality)
+        if os.path.getsize(variant) >= size:
+            os.remove(variant)
+
+
+def read_header(image, path):
+    # Размеры с учётом поворота, формат и размер файла: всё это
+    # есть в заголовке, пиксели не декодируются
+    width, height = oriented_size(image)
+    return {
+        'width': width,
+        'height': height,
+        'format': image.format,
+        'size': os.path.getsize(path),
+    }
+
+
+def dominant_color(image):
+    # Самый частый цвет уменьшенного фото — фон, пока фото грузится
+    small = image.convert('RGB')
+    small.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    palette = small.quantize(colors=5)
+    _, index = max(palette.getcolors())
+    red, green, blue = palette.getpalette()[index * 3:index * 3 + 3]
+    return f'#{red:02x}{green:02x}{blue:02x}'
+
+
+def describe_image(path):
+    with Image.open(path) as image:
+        header = read_header(image, path)
+        image.draft('RGB', (PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+        return {**header, 'placeholder': dominant_color(image)}
+
+
+def describe_image_safely(path):
+    # Для пакетной обработки: ошибка одного файла не останавливает пачку
+    try:
+        return describe_image(path)
+    except OSError as error:
+        return error
+
+
+def render_renditions(path, name, widths, formats=(), quality=82):
+    # Уменьшенные копии фото по ширине, без метаданных; копии шире
+    # оригинала не делаются. Для оригинала и копий сохраняются
+    # варианты в форматах formats. Возвращает и сведения о фото
+    with Image.open(path) as image:
+        header = read_header(image, path)
+        image_format = image.format
+        widths = sorted(w for w in widths if w < header['width'])
+        if not formats:
+            # JPEG сразу декодируется в уменьшенном масштабе
+            largest = widths[-1] if widths else PLACEHOLDER_SIZE
+            image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+    header['placeholder'] = dominant_color(image)
+    # Вариант в формате самого файла не нужен
+    variants = [
+        variant for variant in formats if variant != image_format
+    ]
+    if variants:
+        save_variants(image, path, variants, quality)
+    if image_format not in SAVE_FORMATS:
+        image_format = 'PNG'
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        image = image.convert('RGBA')
+    renditions = []
+    for rendition_width in widths:
+        size = (
+            rendition_width,
+            max(1, round(image.height * rendition_width / image.width)),
+        )
+        rendition = rendition_name(
+            name, rendition_width, SAVE_FORMATS[image_format],
+        )
+        rendition_path = os.path.join(
+            os.path.dirname(path), PurePosixPath(rendition).name,
+        )
+        resized = image.resize(size, Image.Resampling.LANCZOS)
+        resized.save(
+            rendition_path, image_format, quality=quality, optimize=True,
+        )
+        if variants:
+            save_variants(resized, rendition_path, variants, quality)
+        renditions.append((rendition_width, rendition))
+    return {**header, 'renditions': renditions, 'formats': list(formats)}
+
+
+def variant_savings(root):
+    # Размер файлов с вариантами и их лучших вариантов по всей папке
+    report = {'files': 0, 'original_bytes': 0, 'variant_bytes': 0}
+    report.update({f'{suffix[1:]}_files': 0 for suffix in VARIANT_TYPES})
+    for directory, _, names in os.walk(root):
+        names = set(names)
+        for name in names:
+            variants = [
+                suffix for suffix in VARIANT_TYPES if name + suffix in names
+            ]
+            if not variants:
+                continue
+            path = os.path.join(directory, name)
+            report['files'] += 1
+            report['original_bytes'] += os.path.getsize(path)
+            report['variant_bytes'] += min(
+                os.path.getsize(path + suffix) for suffix in variants
+            )
+            for suffix in variants:
+                report[f'{suffix[1:]}_files'] += 1
+    report['saved_bytes'] = report['original_bytes'] - report['variant_bytes']
+    return report
@@ -0,0 +1,113 @@
+import json
+import os
+import subprocess
+import sys
+from itertools import cycle, islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from blog.benchmark import run_asgi, run_wsgi, summarize
+from blog.models import Post
+
+RUNNERS = {'wsgi': run_wsgi, 'asgi': run_asgi}
+
+
+def default_paths():
+    # Лента и страницы первого видимого поста, его категории и автора
+    paths = [reverse('blog:index')]
+    post = Post.objects.filter(is_visible=True).select_related(
+        'category', 'author',
+    ).first()
+    if post is not None:
+        paths += [
+            reverse('blog:post_detail', args=[post.pk]),
+            reverse('blog:category_posts', args=[post.category.slug]),
+            reverse('blog:profile', args=[post.author.username]),
+        ]
+    return paths
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность и хвостовые задержки страниц '
+        'для чтения под WSGI (потоки) и ASGI (асинхронные представления). '
+        'Каждый режим запускается в отдельном процессе с настройками '
+        'своего сервера; запросы подаются в обработчик Django напрямую, '
+        'без сети, поэтому генератор нагрузки делит процессор с сайтом.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode', choices=('both', *RUNNERS), default='both',
+            help='Какой режим измерять (по умолчанию оба).',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help='Сколько запросов отправить.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=64,
+            help='Сколько запросов обрабатывается одновременно.',
+        )
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Адрес страницы; можно указать несколько раз.',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Уникальный параметр в каждом запросе: мимо кэша страниц.',
+        )
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Вывести результат одного режима в формате JSON.',
+        )
+
+    def handle(self, *args, mode, **options):
+        if mode == 'both':
+            results = {name: self.run_child(name, options) for name in RUNNERS}
+        else:
+            results = {mode: self.run(mode, **options)}
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+            return
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<5} {result["rps"]:>9} запр/с  '
+                f'p50 {result["p50_ms"]:>8} мс  p95 {result["p95_ms"]:>8} мс  '
+                f'p99 {result["p99_ms"]:>8} мс  ошибок {result["errors"]}'
+            )
+
+    @staticmethod
+    def run(mode, requests, concurrency, paths, cold, **options):
+        paths = paths or default_paths()
+        batch = [
+            (path, f'bench={number}' if cold else '')
+            for number, path in enumerate(islice(cycle(paths), requests))
+        ]
+        return summarize(*RUNNERS[mode](batch, concurrency))
+
+    def run_child(self, mode, options):
+        # Под ASGI представления и middleware выбираются при загрузке
+        # настроек, поэтому каждый режим — отдельный процесс
+        command = [
+            sys.executable, '-m', 'django', 'benchmark_views',
+            '--mode', mode, '--json',
+            '--requests', str(options['requests']),
+            '--concurrency', str(options['concurrency']),
+        ]
+        for path in options['paths'] or ():
+            command += ['--path', path]
+        if options['cold']:
+            command.append('--cold')
+        env = dict(
+            os.environ, BLOGICUM_ASYNC_VIEWS='1' if mode == 'asgi' else '0',
+        )
+        child = subprocess.run(
+            command, cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True,
+        )
+        if child.returncode:
+            raise CommandError(child.stderr)
+        return json.loads(child.stdout.splitlines()[-1])[mode]
@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from importlib import import_module
+from pathlib import Path
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import login
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import got_request_exception
+from django.db import OperationalError, connections
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.urls import reverse
+
+from blog.benchmark import run_wsgi, summarize
+from blog.models import Post, User
+from blog.replica import refresh_snapshot
+
+# Значение BLOGICUM_SQLITE_TUNING для каждого режима
+MODES = {'baseline': '0', 'tuned': '1'}
+
+
+def auth_meta(user):
+    # Сессия и CSRF-токен пользователя, от имени которого пишутся
+    # комментарии, в виде заголовков WSGI
+    request = HttpRequest()
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+    login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
+    request.session.save()
+    token = get_token(request)
+    return {
+        'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+        'HTTP_COOKIE': (
+            f'{settings.SESSION_COOKIE_NAME}={request.session.session_key}; '
+            f'{settings.CSRF_COOKIE_NAME}={request.META["CSRF_COOKIE"]}'
+        ),
+        'HTTP_X_CSRFTOKEN': token,
+    }
+
+
+class LockCounter:
+    # Считает запросы, упавшие на «database is locked»
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, sender, **kwargs):
+        error = sys.exc_info()[1]
+        if isinstance(error, OperationalError) and 'locked' in str(error):
+            with self.lock:
+                self.count += 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает базу одновременными комментариями к посту и запросами '
+        'ленты и сравнивает SQLite по умолчанию с профилем SQLITE_PRAGMAS. '
+        'Каждый режим работает в отдельном процессе на своей копии базы, '
+        'рабочая база не меняется.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode', choices=('both', *MODES), default='both',
+            help='Какой режим измерять (по умолчанию оба).',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help='Сколько запросов отправить.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=32,
+            help='Сколько запросов обрабатывается одновременно.',
+        )
+        parser.add_argument(
+            '--writes', type=int, default=20,
+            help='Доля комментариев среди запросов, в процентах.',
+        )
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Вывести результат в формате JSON.',
+        )
+        parser.add_argument(
+            '--child', action='store_true', help=argparse.SUPPRESS,
+        )
+
+    def handle(self, *args, mode, child, **options):
+        if child:
+            self.stdout.write(json.dumps({mode: self.run(**options)}))
+            return
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('Сравнение поддерживается только для SQLite.')
+        modes = MODES if mode == 'both' else (mode,)
+        results = {name: self.run_child(name, options) for name in modes}
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+            return
+        for name, result in results.items():
+            for kind in ('reads', 'writes'):
+                kind_result = result[kind]
+                self.stdout.write(
+                    f'{name:<8} {kind:<6} '
+                    f'{kind_result["rps"]:>8} запр/с  '
+                    f'p50 {kind_result["p50_ms"]:>8} мс  '
+                    f'p99 {kind_result["p99_ms"]:>8} мс  '
+                    f'ошибок {kind_result["errors"]}'
+                )
+            self.stdout.write(
+                f'{name:<8} всего  {result["rps"]:>8} запр/с  '
+                f'блокировок {result["locked"]}'
+            )
+
+    @staticmethod
+    def run(requests, concurrency, writes, **options):
+        post = Post.objects.filter(is_visible=True).first()
+        if post is None:
+            raise CommandError('Нет опубликованных постов для комментариев.')
+        user, _ = User.objects.get_or_create(username='benchmark')
+        meta = auth_meta(user)
+        comment_path = reverse('blog:add_comment', args=[post.pk])
+        feed_path = reverse('blog:index')
+        batch, is_write = [], []
+        for number in range(requests):
+            # Комментарии равномерно вперемешку с чтением ленты
+            write = number * writes // 100 != (number + 1) * writes // 100
+            is_write.append(write)
+            if write:
+                body = urlencode({'text': f'Комментарий {number}'}).encode()
+                batch.append((comment_path, '', 'POST', body, meta))
+            else:
+                # Уникальный параметр проводит чтение мимо кэша страниц
+                batch.append((feed_path, f'bench={number}'))
+        locked = LockCounter()
+        got_request_exception.connect(locked)
+        try:
+            results, elapsed = run_wsgi(batch, concurrency)
+        finally:
+            got_request_exception.disconnect(locked)
+        summary = summarize(results, elapsed)
+        for kind, flag in (('reads', False), ('writes', True)):
+            summary[kind] = summarize([
+                result for result, write in zip(results, is_write)
+                if write is flag
+            ], elapsed)
+        summary['locked'] = locked.count
+        return summary
+
+    def run_child(self, mode, options):
+        # Режим задаётся настройками, а WAL остаётся в файле базы,
+        # поэтому каждый режим — отдельный процесс и свежая копия
+        command = [
+            sys.executable, '-m', 'django', 'benchmark_writes',
+            '--mode', mode, '--child',
+            '--requests', str(options['requests']),
+            '--concurrency', str(options['concurrency']),
+            '--writes', str(options['writes']),
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            copy = Path(directory) / 'db.sqlite3'
+            refresh_snapshot(settings.DATABASES['default']['NAME'], copy)
+            env = dict(
+                os.environ, BLOGICUM_DB=str(copy),
+                BLOGICUM_SQLITE_TUNING=MODES[mode], BLOGICUM_ASYNC_VIEWS='0',
+            )
+            env.pop('BLOGICUM_REPLICA', None)
+            child = subprocess.run(
+                command, cwd=settings.BASE_DIR, env=env,
+                capture_output=True, text=True,
+            )
+        if child.returncode:
+            raise CommandError(child.stderr[-2000:])
+        return json.loads(child.stdout.splitlines()[-1])[mode]
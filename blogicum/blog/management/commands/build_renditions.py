@@ -0,0 +1,72 @@
+from concurrent.futures import as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog.images import (
+    get_pool, rendition_job, renditions_current, store_renditions,
+)
+from blog.imaging import render_renditions
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Готовит уменьшенные копии фото и их варианты в форматах '
+        'POST_IMAGE_FORMATS для постов, у которых их ещё нет, '
+        'в пуле из IMAGE_WORKERS процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=200,
+            help='Сколько постов обрабатывать за один проход.',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать копии у всех постов с фото.',
+        )
+
+    def handle(self, *args, chunk_size, force, **options):
+        last_pk = 0
+        built = failed = 0
+        while True:
+            chunk = list(
+                Post.objects.filter(pk__gt=last_pk).exclude(image='').only(
+                    'pk', 'image', 'image_meta',
+                ).order_by('pk')[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            jobs = {
+                post.pk: rendition_job(post) for post in chunk
+                if force or not renditions_current(post)
+            }
+            for pk, name, result in self.render(jobs):
+                if isinstance(result, Exception):
+                    failed += 1
+                    self.stderr.write(f'{name}: {result}')
+                else:
+                    built += 1
+                    store_renditions(pk, name, result)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано фото: {built}, с ошибками: {failed}.'
+        ))
+
+    @staticmethod
+    def render(jobs):
+        if not settings.IMAGE_WORKERS:
+            for pk, job in jobs.items():
+                try:
+                    yield pk, job[1], render_renditions(*job)
+                except Exception as error:
+                    yield pk, job[1], error
+            return
+        futures = {
+            get_pool().submit(render_renditions, *job): (pk, job[1])
+            for pk, job in jobs.items()
+        }
+        for future in as_completed(futures):
+            pk, name = futures[future]
+            yield pk, name, future.exception() or future.result()
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog.sitemaps import build_sitemaps
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает индекс sitemap и сжатые шарды для постов, категорий '
+        'и профилей. Пересобираются только изменившиеся шарды.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url', default=settings.SITEMAP_BASE_URL,
+            help='Адрес сайта, с которого начинаются ссылки в sitemap.',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересобрать все шарды.',
+        )
+
+    def handle(self, *args, **options):
+        written, removed = build_sitemaps(
+            options['base_url'], force=options['force'],
+        )
+        for name in written:
+            self.stdout.write(f'Записан {name}')
+        for name in removed:
+            self.stdout.write(f'Удалён {name}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Шардов пересобрано: {len(written)}, удалено: {len(removed)}.'
+        ))
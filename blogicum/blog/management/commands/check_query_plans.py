@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+
+from blog.models import Category, Comment, Post, User
+from blog.publishing import scheduled_posts
+from blog.threads import path_segment, thread_replies, thread_roots
+from blog.views import CategoryPosts, PostListView, Profile
+
+# Признаки плохого плана в выводе EXPLAIN QUERY PLAN
+FULL_SCAN = 'SCAN'
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN QUERY PLAN для запросов страниц-списков '
+        'и завершается с ошибкой, если какой-то из них читает таблицу '
+        'целиком или сортирует результат во временном B-дереве.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--category', help='Slug категории для проверки.')
+        parser.add_argument('--author', help='Имя автора для проверки.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Проверка планов поддерживается только SQLite.')
+        failed = []
+        for title, queryset in self.get_querysets(options):
+            plan = queryset.explain()
+            problems = self.find_problems(plan)
+            style = self.style.ERROR if problems else self.style.SUCCESS
+            self.stdout.write(style(title))
+            self.stdout.write(plan)
+            if problems:
+                failed.append(f'{title}: {"; ".join(problems)}')
+        if failed:
+            raise CommandError(
+                'Запросы без подходящих индексов:\n' + '\n'.join(failed)
+            )
+
+    @staticmethod
+    def find_problems(plan):
+        problems = []
+        for line in plan.splitlines():
+            detail = line.split(maxsplit=3)[-1]
+            if detail.startswith(FULL_SCAN) and 'USING' not in detail:
+                problems.append(detail)
+            elif detail.startswith(TEMP_SORT):
+                problems.append(detail)
+        return problems
+
+    def get_querysets(self, options):
+        anonymous = AnonymousUser()
+        category = options['category'] or (
+            Category.objects.values_list('slug', flat=True).first() or 'slug'
+        )
+        author = User.objects.filter(
+            username=options['author']
+        ).first() if options['author'] else User.objects.first()
+
+        yield 'Главная страница', self.get_view_queryset(
+            PostListView, anonymous, '/')
+        yield 'Страница категории', self.get_view_queryset(
+            CategoryPosts, anonymous, f'/category/{category}/',
+            category=category)
+        if author is None:
+            self.stderr.write(
+                'Нет ни одного пользователя — профиль не проверяется.'
+            )
+        else:
+            url = f'/profile/{author.username}/'
+            yield 'Профиль (чужой)', self.get_view_queryset(
+                Profile, anonymous, url, author=author.username)
+            yield 'Профиль (свой)', self.get_view_queryset(
+                Profile, author, url, author=author.username)
+        yield 'Отложенные публикации', scheduled_posts()[:20]
+        post = Post(pk=Post.objects.values_list('pk', flat=True).first() or 1)
+        yield 'Ветки комментариев к посту', thread_roots(
+            post, settings.COMMENTS_PAGE_SIZE, settings.COMMENT_THREAD_REPLIES,
+        )
+        roots = [Comment(post=post, path=path_segment(pk)) for pk in (1, 2)]
+        for root in roots:
+            root.replies_cutoff = None
+        yield 'Ответы в ветках', thread_replies(roots)
+
+    @staticmethod
+    def get_view_queryset(view_class, user, url, **kwargs):
+        request = RequestFactory().get(url)
+        request.user = user
+        view = view_class()
+        view.setup(request, **kwargs)
+        return view.get_queryset()[:view.paginate_by]
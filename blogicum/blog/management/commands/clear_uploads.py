@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from blog.images import clear_unused_images
+from blog.uploads import clear_expired_uploads
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет незавершённые загрузки фото по частям старше '
+        'CHUNKED_UPLOAD_TTL вместе с принятыми частями и файлы фото, '
+        'которые так и не попали в пост за IMAGE_CLAIM_TTL. Запускается '
+        'по расписанию.'
+    )
+
+    def handle(self, *args, **options):
+        total = clear_expired_uploads()
+        images = clear_unused_images()
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено загрузок: {total}, файлов фото: {images}.'
+        ))
@@ -0,0 +1,42 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from blog.transfer import (
+    TRANSFER_MODELS, encode_value, export_rows, open_dump,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает категории, местоположения, пользователей, посты '
+        'и комментарии в файл JSON Lines (по объекту на строку). '
+        'Файл с расширением .gz сжимается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Путь к файлу или «-».')
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько строк читать из базы за один запрос.',
+        )
+
+    def handle(self, *args, output, chunk_size, **options):
+        dump = open_dump(output, 'w')
+        try:
+            for model in TRANSFER_MODELS:
+                exported = 0
+                for row in export_rows(model, chunk_size):
+                    dump.write(json.dumps(
+                        row, ensure_ascii=False, default=encode_value,
+                    ) + '\n')
+                    exported += 1
+                    if exported % chunk_size == 0:
+                        self.stderr.write(
+                            f'{model._meta.label_lower}: {exported}',
+                            ending='\r',
+                        )
+                self.stderr.write(f'{model._meta.label_lower}: {exported}')
+        finally:
+            if output != '-':
+                dump.close()
@@ -0,0 +1,69 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog.cache import bump_version, invalidate_posts_pages
+from blog.images import get_pool, image_meta
+from blog.imaging import describe_image_safely
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Сохраняет размеры, формат, размер файла и цвет-заглушку фото '
+        'у постов, где их ещё нет. Посты обрабатываются пачками, '
+        'фото читаются в пуле из IMAGE_WORKERS процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько постов обрабатывать за один проход.',
+        )
+
+    def handle(self, *args, chunk_size, **options):
+        last_pk = 0
+        filled = failed = 0
+        while True:
+            chunk = list(
+                Post.objects.filter(pk__gt=last_pk).exclude(image='').only(
+                    'pk', 'image', 'image_meta',
+                ).order_by('pk')[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            posts = [
+                post for post in chunk
+                if 'placeholder' not in image_meta(post)
+            ]
+            changed = []
+            for post, result in zip(posts, self.describe(posts)):
+                if isinstance(result, Exception):
+                    failed += 1
+                    self.stderr.write(f'{post.image.name}: {result}')
+                    continue
+                # Готовые копии того же фото сохраняются
+                post.image_meta = {
+                    **image_meta(post), 'name': post.image.name, **result,
+                }
+                changed.append(post)
+            # Одним запросом на пачку, в обход Post.save
+            Post.objects.bulk_update(changed, ['image_meta'])
+            for post in changed:
+                bump_version('post', post.pk)
+            if changed:
+                invalidate_posts_pages(
+                    Post.objects.filter(pk__in=[post.pk for post in changed]),
+                    posts_changed=False,
+                )
+            filled += len(changed)
+        self.stdout.write(self.style.SUCCESS(
+            f'Сведения сохранены: {filled}, с ошибками: {failed}.'
+        ))
+
+    @staticmethod
+    def describe(posts):
+        paths = [post.image.path for post in posts]
+        if not settings.IMAGE_WORKERS:
+            return map(describe_image_safely, paths)
+        return get_pool().map(describe_image_safely, paths)
@@ -0,0 +1,36 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog.imaging import variant_savings
+
+
+class Command(BaseCommand):
+    help = (
+        'Считает, сколько байт экономят варианты фото в современных '
+        'форматах по сравнению с исходными файлами в MEDIA_ROOT.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Вывести результат в формате JSON.',
+        )
+
+    def handle(self, *args, **options):
+        report = variant_savings(settings.MEDIA_ROOT)
+        if options['json']:
+            self.stdout.write(json.dumps(report))
+            return
+        share = (
+            report['saved_bytes'] / report['original_bytes'] * 100
+            if report['original_bytes'] else 0
+        )
+        self.stdout.write(
+            f'Файлов с вариантами: {report["files"]} '
+            f'(webp: {report["webp_files"]}, avif: {report["avif_files"]})\n'
+            f'Исходные файлы: {report["original_bytes"]} байт\n'
+            f'Лучшие варианты: {report["variant_bytes"]} байт\n'
+            f'Экономия: {report["saved_bytes"]} байт ({share:.1f}%)'
+        )
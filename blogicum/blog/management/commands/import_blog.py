@@ -0,0 +1,78 @@
+from collections import Counter
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from blog.archive import rebuild_archive
+from blog.autocomplete import invalidate_autocomplete
+from blog.cache import invalidate_posts_pages
+from blog.models import Post
+from blog.transfer import (
+    ImportState, import_dump, open_dump, refresh_imported_posts,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает дамп export_blog пачками через bulk_create. '
+        'Ключи объектов сдвигаются за существующие, пользователи '
+        'и категории сопоставляются по username и slug. Прерванную '
+        'загрузку можно продолжить тем же вызовом.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Путь к файлу или «-».')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько объектов сохранять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки (по умолчанию <input>.checkpoint).',
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать загрузку заново, игнорируя контрольную точку.',
+        )
+
+    def handle(self, *args, batch_size, checkpoint, restart, **options):
+        path = options['input']
+        checkpoint = checkpoint or f'{path}.checkpoint'
+        if restart:
+            Path(checkpoint).unlink(missing_ok=True)
+        state = ImportState.load(checkpoint)
+        if state.line:
+            self.stdout.write(f'Продолжаем со строки {state.line + 1}.')
+        created = Counter()
+
+        def report(model, count, line):
+            created[model._meta.label_lower] += count
+            self.stdout.write(
+                f'{model._meta.label_lower}: '
+                f'{created[model._meta.label_lower]} (строка {line})',
+                ending='\r',
+            )
+
+        dump = open_dump(path, 'r')
+        try:
+            import_dump(dump, state, checkpoint, batch_size, report)
+        finally:
+            if path != '-':
+                dump.close()
+        self.stdout.write('')
+        # Производные данные: видимость, счётчики, ссылки на фото, архив,
+        # кэш страниц и индекс подсказок
+        posts = refresh_imported_posts(
+            state.offsets[Post._meta.label_lower]
+        )
+        call_command('recount_comments', stdout=self.stdout)
+        call_command('recount_images', stdout=self.stdout)
+        rebuild_archive()
+        invalidate_posts_pages(posts)
+        invalidate_autocomplete()
+        # Пустой дамп не доходит до записи контрольной точки
+        Path(checkpoint).unlink(missing_ok=True)
+        for label, count in created.items():
+            self.stdout.write(f'{label}: создано {count}')
+        self.stdout.write(self.style.SUCCESS('Загрузка завершена.'))
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from django.urls import URLResolver, get_resolver
+
+from blog.cache import get_page_cache_stats, reset_page_cache_stats
+
+
+def page_cache_names(patterns=None):
+    # Имена кэша у всех представлений URLconf, которые кэшируют страницы
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    names = {}
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            names.update(dict.fromkeys(page_cache_names(pattern.url_patterns)))
+            continue
+        name = getattr(
+            getattr(pattern.callback, 'view_class', None),
+            'page_cache_name', None,
+        )
+        if name:
+            names[name] = None
+    return list(names)
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает долю попаданий в кэш страниц для анонимных читателей. '
+        'Счётчики видны другим процессам, только если кэш общий '
+        '(memcached, redis, файловый).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Обнулить счётчики после вывода.',
+        )
+
+    def handle(self, *args, reset, **options):
+        names = page_cache_names()
+        total_hits = total_misses = 0
+        for name, (hits, misses) in get_page_cache_stats(names).items():
+            total_hits += hits
+            total_misses += misses
+            self.stdout.write(self.format_row(name, hits, misses))
+        self.stdout.write(self.format_row('всего', total_hits, total_misses))
+        if reset:
+            reset_page_cache_stats(names)
+
+    @staticmethod
+    def format_row(name, hits, misses):
+        requests = hits + misses
+        ratio = hits / requests if requests else 0
+        return (
+            f'{name:<16} попаданий: {hits:<8} промахов: {misses:<8} '
+            f'доля попаданий: {ratio:.1%}'
+        )
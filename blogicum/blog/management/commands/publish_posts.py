@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog.publishing import publish_due_posts, scheduled_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает в ленте отложенные посты, время публикации которых '
+        'наступило. Запускайте по расписанию или с флагом --loop.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Проверять посты постоянно, раз в --interval секунд.',
+        )
+        parser.add_argument('--interval', type=float, default=30)
+        parser.add_argument(
+            '--list', action='store_true',
+            help='Показать ближайшие отложенные публикации.',
+        )
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for post in scheduled_posts()[:options['limit']]:
+                pub_date = timezone.localtime(post.pub_date)
+                self.stdout.write(
+                    f'{pub_date:%Y-%m-%d %H:%M} #{post.pk} {post.title} '
+                    f'(@{post.author.username}, {post.category.title})'
+                )
+            return
+        while True:
+            published = publish_due_posts()
+            if published:
+                self.stdout.write(f'Опубликовано постов: {published}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
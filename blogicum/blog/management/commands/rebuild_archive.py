@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blog.archive import rebuild_archive
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает сводную таблицу архива по месяцам.'
+
+    def handle(self, *args, **options):
+        rows = rebuild_archive()
+        self.stdout.write(self.style.SUCCESS(f'Месяцев в архиве: {rows}.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from blog.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново строит полнотекстовый индекс FTS5 по заголовкам и текстам '
+        'постов и восстанавливает триггеры, которые его обновляют.'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Полнотекстовый индекс есть только в SQLite.')
+        rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен.'))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from blog.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает сохранённые счётчики комментариев у постов '
+        'и исправляет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько постов проверять за один запрос.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать расхождения, ничего не исправляя.',
+        )
+
+    def handle(self, *args, chunk_size, dry_run, **options):
+        actual = Coalesce(Subquery(
+            Comment.objects.filter(post=OuterRef('pk')).order_by().values(
+                'post').annotate(total=Count('pk')).values('total')
+        ), 0)
+        last_pk = 0
+        checked = drifted = 0
+        while True:
+            chunk = list(
+                Post.objects.filter(pk__gt=last_pk).order_by('pk').annotate(
+                    actual=actual,
+                ).values_list('pk', 'comment_count', 'actual')[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_pk = chunk[-1][0]
+            checked += len(chunk)
+            wrong = [pk for pk, stored, real in chunk if stored != real]
+            drifted += len(wrong)
+            if wrong and not dry_run:
+                # Пересчёт прямо в UPDATE не теряет параллельные изменения
+                Post.objects.filter(pk__in=wrong).update(comment_count=actual)
+            self.stdout.write(f'Проверено постов: {checked}', ending='\r')
+        self.stdout.write('')
+        verb = 'Найдено' if dry_run else 'Исправлено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} расхождений: {drifted} из {checked}.'
+        ))
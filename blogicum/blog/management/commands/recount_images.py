@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from blog.images import recount_images
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает ссылки постов на файлы фото. Нужна после загрузки '
+        'дампа и при расхождениях; файлы при этом не удаляются.'
+    )
+
+    def handle(self, *args, **options):
+        total = recount_images()
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов фото со ссылками: {total}.'
+        ))
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from blog.replica import refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'Снимает копию основной базы SQLite для чтения через онлайн-бэкап. '
+        'Запускайте чаще, чем раз в REPLICA_MAX_LAG секунд, '
+        'или с флагом --loop.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Обновлять снимок постоянно, раз в --interval секунд.',
+        )
+        parser.add_argument('--interval', type=float, default=10)
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_PATH:
+            raise CommandError(
+                'Реплика не настроена: задайте путь к снимку '
+                'в переменной окружения BLOGICUM_REPLICA.'
+            )
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('Снимок поддерживается только для SQLite.')
+        source = settings.DATABASES['default']['NAME']
+        while True:
+            started = refresh_snapshot(source, settings.REPLICA_PATH)
+            self.stdout.write(
+                f'Снимок обновлён за {time.time() - started:.2f} с'
+            )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,40 @@
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.http import Http404
+from django.utils.cache import patch_vary_headers
+from django.views.static import serve
+from PIL import Image
+
+from blog.imaging import VARIANT_TYPES
+
+
+def accepted_variants(request):
+    # Форматы вариантов, которые браузер перечислил в Accept
+    accept = request.headers.get('Accept', '')
+    return [
+        (suffix, content_type)
+        for suffix, content_type in VARIANT_TYPES.items()
+        if content_type in accept
+    ]
+
+
+def serve_media(request, path):
+    # Фото отдаётся в лучшем формате из тех, что принимает браузер;
+    # ответ зависит от Accept, о чём сообщает Vary
+    document_root = settings.MEDIA_ROOT
+    suffix = PurePosixPath(path).suffix.lower()
+    if suffix not in Image.registered_extensions():
+        return serve(request, path, document_root)
+    response = None
+    for variant_suffix, content_type in accepted_variants(request):
+        try:
+            response = serve(request, path + variant_suffix, document_root)
+        except Http404:
+            continue
+        response['Content-Type'] = content_type
+        break
+    if response is None:
+        response = serve(request, path, document_root)
+    patch_vary_headers(response, ('Accept',))
+    return response
@@ -0,0 +1,59 @@
+# Generated by Django 3.2.16 on 2026-10-17 00:10
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+
+def fill_monthly_post_count(apps, schema_editor):
+    MonthlyPostCount = apps.get_model('blog', 'MonthlyPostCount')
+    Post = apps.get_model('blog', 'Post')
+    tz = timezone.get_current_timezone()
+    visible = Post.objects.filter(is_visible=True).annotate(
+        year=ExtractYear('pub_date', tzinfo=tz),
+        month=ExtractMonth('pub_date', tzinfo=tz),
+    ).order_by()
+    rows = []
+    for group, prefix in ((), 'all'), (('category_id',), 'category:'), (
+            ('author_id',), 'author:'):
+        for row in visible.values('year', 'month', *group).annotate(
+                total=Count('pk')):
+            scope = prefix + ''.join(str(row[field]) for field in group)
+            rows.append(MonthlyPostCount(
+                scope=scope, year=row['year'], month=row['month'],
+                post_count=row['total'],
+            ))
+    MonthlyPostCount.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_post_is_visible'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyPostCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=64, verbose_name='Раздел')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='Год')),
+                ('month', models.PositiveSmallIntegerField(verbose_name='Месяц')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+            ],
+            options={
+                'verbose_name': 'месяц архива',
+                'verbose_name_plural': 'Архив по месяцам',
+                'ordering': ('scope', '-year', '-month'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='monthlypostcount',
+            constraint=models.UniqueConstraint(fields=('scope', 'year', 'month'), name='unique_archive_month'),
+        ),
+        migrations.RunPython(
+            fill_monthly_post_count, migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.16 on 2026-10-17 00:19
+
+import blog.abstracts
+from django.db import migrations
+from django.db.models import F
+
+
+def fill_updated_at(apps, schema_editor):
+    # Для существующих записей считаем временем изменения время создания
+    for model_name in ('Category', 'Location', 'Post', 'Comment'):
+        apps.get_model('blog', model_name).objects.update(
+            updated_at=F('created_at')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_monthly_post_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=blog.abstracts.ModificationDateTimeField(auto_now=True, verbose_name='Изменено'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='updated_at',
+            field=blog.abstracts.ModificationDateTimeField(auto_now=True, verbose_name='Изменено'),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='updated_at',
+            field=blog.abstracts.ModificationDateTimeField(auto_now=True, verbose_name='Изменено'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=blog.abstracts.ModificationDateTimeField(auto_now=True, verbose_name='Изменено'),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from blog.search import rebuild_search_index
+    if schema_editor.connection.vendor == 'sqlite':
+        rebuild_search_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from blog.search import DROP_SQL
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in DROP_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
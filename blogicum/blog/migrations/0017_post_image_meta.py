@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-17 01:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0016_comment_threads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_meta',
+            field=models.JSONField(default=dict, editable=False, help_text='Уменьшенные копии фото, заполняются при обработке.', verbose_name='Сведения о фото'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.2.16 on 2026-10-17 01:13
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_images(apps, schema_editor):
+    # Ссылки на уже загруженные фото, в том числе со старыми именами
+    Post = apps.get_model('blog', 'Post')
+    ImageBlob = apps.get_model('blog', 'ImageBlob')
+    ImageBlob.objects.bulk_create(
+        ImageBlob(name=name, ref_count=total)
+        for name, total in Post.objects.exclude(image='').values_list(
+            'image',
+        ).annotate(total=Count('pk')).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0017_post_image_meta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Файл')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='Количество ссылок')),
+            ],
+            options={
+                'verbose_name': 'файл фото',
+                'verbose_name_plural': 'Файлы фото',
+            },
+        ),
+        migrations.RunPython(count_images, migrations.RunPython.noop),
+    ]
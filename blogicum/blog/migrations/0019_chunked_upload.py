@@ -0,0 +1,32 @@
+# Generated by Django 3.2.16 on 2026-10-17 01:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('blog', '0018_image_blob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChunkedUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, verbose_name='Имя файла')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Размер файла')),
+                ('offset', models.PositiveBigIntegerField(default=0, verbose_name='Загружено байт')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Начата')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunked_uploads', to=settings.AUTH_USER_MODEL, verbose_name='Автор загрузки')),
+            ],
+            options={
+                'verbose_name': 'загрузка по частям',
+                'verbose_name_plural': 'Загрузки по частям',
+            },
+        ),
+    ]
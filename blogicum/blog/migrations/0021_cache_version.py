@@ -0,0 +1,24 @@
+# Generated by Django 3.2.16 on 2026-10-17 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0020_sync_related_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Раздел')),
+                ('token', models.CharField(max_length=32, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'версия кэша',
+                'verbose_name_plural': 'Версии кэша',
+            },
+        ),
+    ]
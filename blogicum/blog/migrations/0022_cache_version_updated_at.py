@@ -0,0 +1,19 @@
+# Generated by Django 3.2.16 on 2026-10-17 01:44
+
+import blog.abstracts
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0021_cache_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cacheversion',
+            name='updated_at',
+            field=blog.abstracts.ModificationDateTimeField(auto_now=True, verbose_name='Изменена'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-17 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0023_comment_root_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageblob',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Загружен'),
+        ),
+    ]
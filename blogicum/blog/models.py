@@ -1,7 +1,11 @@
+import uuid
+from datetime import date
+
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
 
-from blog.abstracts import Published
+from blog.abstracts import ModificationDateTimeField, Published
 
 User = get_user_model()
 
@@ -82,14 +86,79 @@ class Post(Published):
         upload_to='',
         blank=True,
     )
+    image_meta = models.JSONField(
+        default=dict,
+        editable=False,
+        verbose_name='Сведения о фото',
+        help_text='Уменьшенные копии фото, заполняются при обработке.',
+    )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев',
+    )
+    is_visible = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Виден в ленте',
+        help_text='Пост опубликован, его категория опубликована '
+                  'и время публикации наступило.',
+    )
 
     class Meta:
         verbose_name = 'пост'
         verbose_name_plural = 'Посты'
+        indexes = (
+            # Лента: фильтр по is_visible стоит в условии частичного
+            # индекса, иначе SQLite не использует его для сортировки
+            models.Index(
+                fields=('pub_date',),
+                condition=models.Q(is_visible=True),
+                name='post_visible_pub_date_idx',
+            ),
+            # Страница категории
+            models.Index(
+                fields=('category', 'pub_date'),
+                condition=models.Q(is_visible=True),
+                name='post_category_pub_date_idx',
+            ),
+            # Страница пользователя
+            models.Index(
+                fields=('author', 'pub_date'),
+                name='post_author_pub_date_idx',
+            ),
+            # Отложенные публикации, которые ждут своего времени
+            models.Index(
+                fields=('pub_date',),
+                condition=models.Q(is_published=True, is_visible=False),
+                name='post_scheduled_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.is_visible = self.get_visibility()
+        # Счётчик комментариев меняется только атомарными UPDATE, а сведения
+        # о фото — обработчиком фото, поэтому при обычном сохранении поста
+        # их не перезаписываем
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in ('comment_count', 'image_meta')
+            ]
+        super().save(*args, **kwargs)
+
+    def get_visibility(self, now=None):
+        return (
+            self.is_published
+            and self.pub_date <= (now or timezone.now())
+            and self.category is not None
+            and self.category.is_published
+        )
+
 
 class Comment(models.Model):
     text = models.TextField(
@@ -103,13 +172,183 @@ class Comment(models.Model):
     created_at = models.DateTimeField(
         auto_now_add=True,
     )
+    updated_at = ModificationDateTimeField(
+        verbose_name='Изменено',
+    )
     author = models.ForeignKey(
         User,
         related_name='user_comment',
         on_delete=models.CASCADE,
     )
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='child_comments',
+        verbose_name='Ответ на',
+    )
+    # id предков и самого комментария, см. blog.threads
+    path = models.CharField(
+        max_length=255,
+        default='',
+        editable=False,
+    )
+    depth = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Уровень вложенности',
+    )
 
     class Meta:
         ordering = ('created_at',)
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = (
+            models.Index(
+                fields=('post', 'path'),
+                name='comment_post_path_idx',
+            ),
+            # Корни веток по порядку, не проходя по их ответам
+            models.Index(
+                fields=('post', 'depth', 'path'),
+                name='comment_post_root_idx',
+            ),
+        )
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.depth = self.parent.depth + 1 if self.parent else 0
+        super().save(*args, **kwargs)
+
+
+class MonthlyPostCount(models.Model):
+    # Сводная таблица для архива: число видимых постов за месяц
+    # по всему сайту (scope='all'), категории ('category:<id>')
+    # или автору ('author:<id>')
+    scope = models.CharField(
+        max_length=64,
+        verbose_name='Раздел',
+    )
+    year = models.PositiveSmallIntegerField(
+        verbose_name='Год',
+    )
+    month = models.PositiveSmallIntegerField(
+        verbose_name='Месяц',
+    )
+    post_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество постов',
+    )
+
+    class Meta:
+        verbose_name = 'месяц архива'
+        verbose_name_plural = 'Архив по месяцам'
+        ordering = ('scope', '-year', '-month')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('scope', 'year', 'month'),
+                name='unique_archive_month',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.scope} {self.year}-{self.month:02}: {self.post_count}'
+
+    @property
+    def month_start(self):
+        return date(self.year, self.month, 1)
+
+
+class ImageBlob(models.Model):
+    # Файл фото в хранилище по содержимому (blog.storage) и число постов,
+    # которые на него ссылаются; без ссылок файл удаляется, но не раньше
+    # IMAGE_CLAIM_TTL после того, как хранилище последний раз его отдало
+    name = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name='Файл',
+    )
+    ref_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество ссылок',
+    )
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Загружен',
+    )
+
+    class Meta:
+        verbose_name = 'файл фото'
+        verbose_name_plural = 'Файлы фото'
+
+    def __str__(self):
+        return f'{self.name}: {self.ref_count}'
+
+
+class ChunkedUpload(models.Model):
+    # Фото, которое медленный клиент загружает частями с докачкой;
+    # offset — сколько байт уже записано во временный файл
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='chunked_uploads',
+        verbose_name='Автор загрузки',
+    )
+    name = models.CharField(
+        max_length=255,
+        verbose_name='Имя файла',
+    )
+    size = models.PositiveBigIntegerField(
+        verbose_name='Размер файла',
+    )
+    offset = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Загружено байт',
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Начата',
+    )
+
+    class Meta:
+        verbose_name = 'загрузка по частям'
+        verbose_name_plural = 'Загрузки по частям'
+
+    def __str__(self):
+        return f'{self.name}: {self.offset} из {self.size}'
+
+    @property
+    def complete(self):
+        return self.offset == self.size
+
+
+class CacheVersion(models.Model):
+    # Версия раздела кэша (поста, категории, ленты...): ключи кэша
+    # включают её, поэтому смена версии сбрасывает кэш во всех процессах.
+    # Версия меняется в той же транзакции, что и данные
+    key = models.CharField(
+        max_length=255,
+        primary_key=True,
+        verbose_name='Раздел',
+    )
+    token = models.CharField(
+        max_length=32,
+        verbose_name='Версия',
+    )
+    updated_at = ModificationDateTimeField(
+        verbose_name='Изменена',
+    )
+
+    class Meta:
+        verbose_name = 'версия кэша'
+        verbose_name_plural = 'Версии кэша'
+
+    def __str__(self):
+        return f'{self.key}: {self.token}'
@@ -0,0 +1,168 @@
+import base64
+import binascii
+from collections.abc import Sequence
+from datetime import datetime
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+# Начиная с этой страницы ссылка «вперёд» переключается на курсор
+CURSOR_PAGE_THRESHOLD = 5
+
+
+def encode_cursor(post):
+    raw = f'{post.pub_date.isoformat()}|{post.pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        pub_date, pk = raw.decode().split('|')
+        return datetime.fromisoformat(pub_date), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise Http404('Некорректный курсор страницы.')
+
+
+class WindowedPage(Page):
+
+    def page_window(self):
+        return self.paginator.get_elided_page_range(
+            self.number, on_each_side=self.paginator.window, on_ends=0,
+        )
+
+
+class WindowedPaginator(Paginator):
+    # В шаблон попадает только окно страниц вокруг текущей
+    window = 3
+
+    def _get_page(self, *args, **kwargs):
+        return WindowedPage(*args, **kwargs)
+
+
+class CachedCountPaginator(WindowedPaginator):
+    # Общее количество записей берётся из кэша и пересчитывается
+    # не чаще раза в PAGINATOR_COUNT_TIMEOUT секунд
+    @cached_property
+    def count_key(self):
+        sql, params = self.object_list.query.sql_with_params()
+        return 'blog:count:' + md5(f'{sql}{params}'.encode()).hexdigest()
+
+    @cached_property
+    def count(self):
+        count = cache.get(self.count_key)
+        if count is None:
+            count = super().count
+            cache.set(self.count_key, count, settings.PAGINATOR_COUNT_TIMEOUT)
+        return count
+
+    def page(self, number):
+        page = super().page(number)
+        page.object_list = list(page.object_list)
+        if len(page) < self.per_page and (
+            page.has_next() or not page.object_list
+        ):
+            # Короткая страница не в конце списка — закэшированное число
+            # устарело: считаем заново, лишняя страница станет 404
+            cache.delete(self.count_key)
+            for name in ('count', 'num_pages', 'page_range'):
+                self.__dict__.pop(name, None)
+            page = super().page(number)
+            page.object_list = list(page.object_list)
+        return page
+
+
+class CursorPage(Sequence):
+    # Страница keyset-пагинации: без номера и без подсчёта всех записей
+    number = None
+    paginator = None
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = list(object_list)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginationMixin:
+    # Keyset-пагинация по (pub_date, id) для ?after=/?before=;
+    # обычные ссылки ?page=N продолжают работать для первых страниц
+    cursor_pagination = True
+    cursor_page_threshold = CURSOR_PAGE_THRESHOLD
+
+    def paginate_queryset(self, queryset, page_size):
+        after = self.request.GET.get('after')
+        before = self.request.GET.get('before')
+        if self.cursor_pagination and (after or before):
+            page = self.get_cursor_page(queryset, page_size, after, before)
+            return None, page, page.object_list, page.has_other_pages()
+        paginator, page, object_list, is_paginated = (
+            super().paginate_queryset(queryset, page_size)
+        )
+        page.object_list = list(page.object_list)
+        if (self.cursor_pagination
+                and page.number >= self.cursor_page_threshold
+                and page.has_next() and page.object_list):
+            page.next_cursor = encode_cursor(page.object_list[-1])
+        return paginator, page, page.object_list, is_paginated
+
+    def get_cursor_page(self, queryset, page_size, after, before):
+        if after:
+            pub_date, pk = decode_cursor(after)
+            posts = list(queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            ).order_by('-pub_date', '-pk')[:page_size + 1])
+            if not posts:
+                raise Http404('Страница не найдена.')
+            return CursorPage(
+                posts[:page_size],
+                next_cursor=(
+                    encode_cursor(posts[page_size - 1])
+                    if len(posts) > page_size else None
+                ),
+                previous_cursor=encode_cursor(posts[0]),
+            )
+        pub_date, pk = decode_cursor(before)
+        posts = list(queryset.filter(
+            Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+        ).order_by('pub_date', 'pk')[:page_size + 1])
+        if len(posts) <= page_size:
+            # Дошли до начала ленты — отдаём первую страницу целиком
+            posts = list(
+                queryset.order_by('-pub_date', '-pk')[:page_size + 1]
+            )
+            return CursorPage(
+                posts[:page_size],
+                next_cursor=(
+                    encode_cursor(posts[page_size - 1])
+                    if len(posts) > page_size else None
+                ),
+            )
+        posts = posts[:page_size][::-1]
+        return CursorPage(
+            posts,
+            next_cursor=encode_cursor(posts[-1]),
+            previous_cursor=encode_cursor(posts[0]),
+        )
@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.utils import timezone
+
+from blog.archive import archive_buckets, refresh_archive
+from blog.cache import invalidate_pages
+from blog.models import Post
+
+
+def scheduled_posts(now=None):
+    # Отложенные посты читаются по частичному индексу pub_date
+    return Post.objects.filter(
+        is_published=True,
+        is_visible=False,
+        category__is_published=True,
+        pub_date__gt=now or timezone.now(),
+    ).select_related('author', 'category').order_by('pub_date')
+
+
+@transaction.atomic
+def set_visibility(posts, is_visible):
+    # Возвращает (pub_date, category_id, author_id) изменённых постов
+    changed = list(
+        posts.values_list('pub_date', 'category_id', 'author_id')
+    )
+    if changed:
+        posts.update(is_visible=is_visible, updated_at=timezone.now())
+        refresh_archive(archive_buckets(changed))
+    return changed
+
+
+@transaction.atomic
+def publish_due_posts(now=None):
+    # Показывает в ленте посты, время публикации которых наступило
+    changed = set_visibility(Post.objects.filter(
+        is_published=True,
+        is_visible=False,
+        category__is_published=True,
+        pub_date__lte=now or timezone.now(),
+    ), True)
+    if changed:
+        category_ids = {row[1] for row in changed}
+        author_ids = {row[2] for row in changed}
+        transaction.on_commit(
+            lambda: invalidate_pages(category_ids, author_ids)
+        )
+    return len(changed)
+
+
+def refresh_category_visibility(category, now=None):
+    posts = Post.objects.filter(category=category)
+    if category.is_published:
+        return set_visibility(posts.filter(
+            is_published=True,
+            is_visible=False,
+            pub_date__lte=now or timezone.now(),
+        ), True)
+    return set_visibility(posts.filter(is_visible=True), False)
+
+
+def hide_category_posts(category):
+    return set_visibility(
+        category.category_posts.filter(is_visible=True), False,
+    )
@@ -0,0 +1,110 @@
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+
+REPLICA_ALIAS = 'replica'
+
+# Время последней записи пользователя: пока снимок старше,
+# его запросы читают основную базу
+STICKY_COOKIE = 'replica_pin'
+
+# Время снимка, из которого читает текущий запрос; None — основная база
+_snapshot = ContextVar('replica_snapshot', default=None)
+
+
+def replica_path():
+    return Path(settings.REPLICA_PATH)
+
+
+def snapshot_time(path):
+    # Время начала копирования, записанное в mtime снимка
+    try:
+        return os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def refresh_snapshot(source, target, pages=1024):
+    # Онлайн-бэкап SQLite: копия согласована на один момент, а писатели
+    # ждут только пока копируется очередная порция страниц. Готовый
+    # снимок подменяется атомарно, открытые соединения дочитывают старый
+    started = time.time()
+    target = Path(target)
+    descriptor, temp_path = tempfile.mkstemp(dir=target.parent, suffix='.tmp')
+    os.close(descriptor)
+    try:
+        with closing(sqlite3.connect(source)) as primary, closing(
+            sqlite3.connect(temp_path)
+        ) as copy:
+            primary.backup(copy, pages=pages)
+            # Снимок из базы в WAL тоже в WAL, а для такого файла
+            # соединение только для чтения требует -wal и -shm рядом
+            copy.execute('PRAGMA journal_mode = DELETE')
+        os.chmod(temp_path, 0o644)
+        # Данные снимка не старше начала копирования
+        os.utime(temp_path, (started, started))
+        os.replace(temp_path, target)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return started
+
+
+def required_snapshot_time(request, now=None):
+    # Снимок не старше REPLICA_MAX_LAG и сделан после последней
+    # записи этого пользователя
+    required = (now or time.time()) - settings.REPLICA_MAX_LAG
+    try:
+        written = float(request.COOKIES.get(STICKY_COOKIE, 0))
+    except ValueError:
+        written = 0
+    return max(required, written)
+
+
+class ReplicaRouter:
+    # Чтение идёт в снимок, только если его выбрал ReplicaMiddleware;
+    # после первой записи запрос до конца читает основную базу
+    def db_for_read(self, model, **hints):
+        return None if _snapshot.get() is None else REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _snapshot.set(None)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db != REPLICA_ALIAS
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+
+    def process_request(self, request):
+        _snapshot.set(None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in ('GET', 'HEAD')
+                and request.resolver_match.view_name
+                in settings.REPLICA_VIEWS):
+            taken = snapshot_time(replica_path())
+            if taken is not None and taken >= required_snapshot_time(request):
+                _snapshot.set(taken)
+
+    def process_response(self, request, response):
+        _snapshot.set(None)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            # Чтение своих записей: до следующего снимка — основная база
+            response.set_cookie(
+                STICKY_COOKIE, f'{time.time():.3f}',
+                max_age=settings.REPLICA_MAX_LAG,
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,170 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.functional import cached_property
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from blog.models import Post
+
+SEARCH_TABLE = 'blog_post_search'
+
+# Вес совпадения в заголовке и в тексте для bm25
+TITLE_WEIGHT = 10.0
+TEXT_WEIGHT = 1.0
+
+# Границы подсветки: управляющие символы не встречаются в тексте
+# поста, поэтому сниппет можно экранировать целиком, а затем
+# заменить их на теги
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+CREATE_TABLE_SQL = f'''
+CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+    title, text,
+    content='blog_post', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+)
+'''
+
+# SQLite пересоздаёт таблицу при изменении её схемы в миграциях
+# и теряет триггеры, поэтому они ставятся и после каждого migrate
+TRIGGERS_SQL = (
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert
+    AFTER INSERT ON blog_post BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete
+    AFTER DELETE ON blog_post BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update
+    AFTER UPDATE OF title, text ON blog_post BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO {SEARCH_TABLE}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    ''',
+)
+
+DROP_SQL = (
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_update',
+    f'DROP TABLE IF EXISTS {SEARCH_TABLE}',
+)
+
+
+def install_search_index(using_connection=connection):
+    if (using_connection.vendor != 'sqlite' or 'blog_post'
+            not in using_connection.introspection.table_names()):
+        return
+    with using_connection.cursor() as cursor:
+        cursor.execute(CREATE_TABLE_SQL)
+        for sql in TRIGGERS_SQL:
+            cursor.execute(sql)
+
+
+def rebuild_search_index(using_connection=connection):
+    install_search_index(using_connection)
+    with using_connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')"
+        )
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')"
+        )
+
+
+def to_match(query):
+    # Каждое слово ищется по префиксу: «кот» найдёт и «котов».
+    # Кавычки не дают словам из запроса стать операторами FTS5
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def matching_ids(query):
+    # Подзапрос для фильтра pk__in, например в поиске админки
+    return RawSQL(
+        f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+        (to_match(query),),
+    )
+
+
+def highlight(raw):
+    return mark_safe(
+        escape(raw)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class SearchResults:
+    # Последовательность для Paginator: FTS5 считает и ранжирует
+    # совпадения среди видимых постов, сами посты догружаются по id
+    def __init__(self, query):
+        self.match = to_match(query)
+
+    def count(self):
+        return self.total
+
+    @cached_property
+    def total(self):
+        if not self.match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {SEARCH_TABLE} '
+                f'JOIN blog_post ON blog_post.id = {SEARCH_TABLE}.rowid '
+                f'WHERE {SEARCH_TABLE} MATCH %s AND blog_post.is_visible',
+                (self.match,),
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        if not self.match or stop is None or stop <= start:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT {SEARCH_TABLE}.rowid, '
+                f'highlight({SEARCH_TABLE}, 0, %s, %s), '
+                f"snippet({SEARCH_TABLE}, 1, %s, %s, '…', 32) "
+                f'FROM {SEARCH_TABLE} '
+                f'JOIN blog_post ON blog_post.id = {SEARCH_TABLE}.rowid '
+                f'WHERE {SEARCH_TABLE} MATCH %s AND blog_post.is_visible '
+                f'ORDER BY bm25({SEARCH_TABLE}, %s, %s) '
+                f'LIMIT %s OFFSET %s',
+                (
+                    MARK_START, MARK_END, MARK_START, MARK_END, self.match,
+                    TITLE_WEIGHT, TEXT_WEIGHT, stop - start, start,
+                ),
+            )
+            rows = cursor.fetchall()
+        posts = Post.objects.select_related(
+            'author', 'category', 'location',
+        ).in_bulk([pk for pk, _, _ in rows])
+        results = []
+        for pk, title, snippet in rows:
+            post = posts.get(pk)
+            if post is None:
+                # Пост удалили между двумя запросами
+                continue
+            post.search_title = highlight(title)
+            post.search_snippet = highlight(snippet)
+            results.append(post)
+        return results
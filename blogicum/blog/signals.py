@@ -0,0 +1,261 @@
+from django.db.models import F
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from blog.autocomplete import refresh_entry
+from blog.cache import bump_version, invalidate_pages, invalidate_posts_pages
+from blog.images import (
+    acquire_image, record_image_header, release_image, schedule_renditions,
+    settle_image,
+)
+from blog.models import Category, Comment, Location, Post, User
+from blog.archive import archive_buckets, refresh_archive
+from blog.publishing import hide_category_posts, refresh_category_visibility
+from blog.threads import path_segment
+
+
+# Посты, которые сейчас удаляются вместе с комментариями: счётчик
+# и кэш поста не трогаются для каждого комментария, пост сбрасывает
+# кэш один раз
+_deleting_posts = set()
+
+
+def change_comment_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=F('comment_count') + delta,
+        updated_at=timezone.now(),
+    )
+    bump_version('post', post_id)
+
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_post(sender, instance, raw=False, **kwargs):
+    # Комментарий могут перенести к другому посту из админки
+    instance._previous_post_id = None
+    if not raw and not instance._state.adding:
+        instance._previous_post_id = Comment.objects.filter(
+            pk=instance.pk
+        ).values_list('post_id', flat=True).first()
+
+
+@receiver(post_save, sender=Comment)
+def comment_path_filled(sender, instance, raw=False, **kwargs):
+    # Путь содержит id самого комментария и известен только после
+    # вставки; комментарии из фикстур без пути становятся корнями
+    if not instance.path:
+        instance.path = (
+            instance.parent.path if instance.parent_id and not raw else ''
+        ) + path_segment(instance.pk)
+        Comment.objects.filter(pk=instance.pk).update(path=instance.path)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        change_comment_count(instance.post_id, 1)
+    elif instance._previous_post_id not in (None, instance.post_id):
+        change_comment_count(instance._previous_post_id, -1)
+        change_comment_count(instance.post_id, 1)
+    else:
+        # Отредактированный комментарий меняет страницу поста
+        Post.objects.filter(pk=instance.post_id).update(
+            updated_at=timezone.now()
+        )
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    _deleting_posts.add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    _deleting_posts.discard(instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    # Срабатывает и при каскадном удалении, и при удалении из админки
+    if instance.post_id in _deleting_posts:
+        return
+    Post.objects.filter(
+        pk=instance.post_id, comment_count__gt=0,
+    ).update(
+        comment_count=F('comment_count') - 1,
+        updated_at=timezone.now(),
+    )
+    bump_version('post', instance.post_id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_pages_changed(sender, instance, raw=False, **kwargs):
+    if not raw and instance.post_id not in _deleting_posts:
+        invalidate_posts_pages(Post.objects.filter(
+            pk__in={instance.post_id, getattr(
+                instance, '_previous_post_id', None)}
+        ), posts_changed=False)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_placement(sender, instance, raw=False, **kwargs):
+    # Пост могли перенести в другую категорию или передать другому автору
+    instance._previous_placement = None
+    if not raw and not instance._state.adding:
+        instance._previous_placement = Post.objects.filter(
+            pk=instance.pk
+        ).values_list(
+            'category_id', 'author_id', 'pub_date', 'is_visible', 'image',
+        ).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_pages_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    category_ids = {instance.category_id}
+    author_ids = {instance.author_id}
+    previous = getattr(instance, '_previous_placement', None)
+    if previous:
+        category_ids.add(previous[0])
+        author_ids.add(previous[1])
+    invalidate_pages(category_ids, author_ids)
+
+
+@receiver(post_save, sender=Post)
+def post_image_refs_changed(sender, instance, created, raw=False, **kwargs):
+    # Учёт ссылок на файлы фото: новое фото получает ссылку,
+    # заменённое — теряет. Ссылки считает только пост, хранилище лишь
+    # отмечает отданный файл
+    if raw:
+        return
+    previous = getattr(instance, '_previous_placement', None)
+    previous_image = previous[4] if previous else ''
+    if instance.image.name != previous_image:
+        if instance.image:
+            acquire_image(instance.image.name)
+        if previous_image:
+            release_image(previous_image)
+    elif instance.image:
+        # Те же байты загрузили заново: ссылка уже есть
+        settle_image(instance.image.name)
+
+
+@receiver(post_delete, sender=Post)
+def post_image_released(sender, instance, **kwargs):
+    if instance.image:
+        release_image(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def post_image_saved(sender, instance, raw=False, **kwargs):
+    # Новое фото: уменьшенные копии готовятся в фоне
+    if (not raw and instance.image
+            and instance.image_meta.get('name') != instance.image.name):
+        record_image_header(instance)
+        schedule_renditions(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_archive_changed(sender, instance, raw=False, **kwargs):
+    # Месяцы архива, в которых пост был или стал видимым
+    if raw:
+        return
+    changed = []
+    previous = getattr(instance, '_previous_placement', None)
+    if previous and previous[3]:
+        changed.append((previous[2], previous[0], previous[1]))
+    if instance.is_visible:
+        changed.append(
+            (instance.pub_date, instance.category_id, instance.author_id)
+        )
+    refresh_archive(archive_buckets(changed))
+
+
+@receiver(post_save, sender=Category)
+def category_visibility_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_category_visibility(instance)
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    # Посты без категории не показываются в ленте
+    hide_category_posts(instance)
+
+
+# При удалении посты ещё ссылаются на объект только до удаления
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def category_pages_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_version('category_page', instance.slug)
+        bump_version('category_feed', instance.slug)
+        invalidate_posts_pages(instance.category_posts.all())
+
+
+@receiver(post_save, sender=Location)
+@receiver(pre_delete, sender=Location)
+def location_pages_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_posts_pages(instance.location_posts.all())
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, raw=False, **kwargs):
+    instance._previous_username = None
+    if not raw and not instance._state.adding:
+        instance._previous_username = User.objects.filter(
+            pk=instance.pk
+        ).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def profile_page_changed(sender, instance, update_fields=None, **kwargs):
+    # При каждом входе сохраняется last_login — страницу это не меняет
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        bump_version('profile_page', instance.username)
+        bump_version('profile_feed', instance.username)
+    previous = getattr(instance, '_previous_username', None)
+    if previous not in (None, instance.username):
+        # Имя автора выводится в карточках его постов на всех списках
+        bump_version('profile_page', previous)
+        bump_version('profile_feed', previous)
+        invalidate_posts_pages(instance.user_posts.all())
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def card_data_changed(sender, instance, update_fields=None, **kwargs):
+    # Сбрасываем закэшированные карточки постов, которые показывают объект;
+    # last_login, сохраняемый при входе, в карточках не выводится
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        bump_version(sender._meta.model_name, instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Location)
+def autocomplete_entry_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        refresh_entry(sender._meta.model_name, instance)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Location)
+def autocomplete_entry_deleted(sender, instance, **kwargs):
+    refresh_entry(sender._meta.model_name, instance, deleted=True)
@@ -0,0 +1,203 @@
+import gzip
+import json
+import os
+import tempfile
+from hashlib import md5
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, F, Max
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import Category, Post, User
+
+INDEX_NAME = 'sitemap.xml'
+MANIFEST_NAME = 'manifest.json'
+
+URLSET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+
+
+def shard_bounds(shard):
+    # Шард — диапазон первичных ключей, поэтому пост всегда
+    # попадает в один и тот же файл
+    size = settings.SITEMAP_SHARD_SIZE
+    return shard * size, (shard + 1) * size
+
+
+def iterate_rows(queryset, shard, *fields):
+    # Строки читаются пачками по первичному ключу внутри шарда,
+    # без OFFSET и без загрузки всего queryset в память
+    start, end = shard_bounds(shard)
+    queryset = queryset.filter(pk__lte=end).order_by('pk')
+    last_pk = start
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk).values_list(
+            'pk', *fields,
+        )[:settings.SITEMAP_CHUNK_SIZE])
+        if not rows:
+            return
+        yield from rows
+        last_pk = rows[-1][0]
+
+
+def aggregate_fingerprints(queryset):
+    # Число строк и последнее изменение по каждому шарду одним запросом
+    return {
+        row['shard']: f'{row["count"]}|{row["updated_at"].isoformat()}'
+        for row in queryset.annotate(
+            shard=(F('pk') - 1) / settings.SITEMAP_SHARD_SIZE,
+        ).values('shard').annotate(
+            count=Count('pk'), updated_at=Max('updated_at'),
+        ).order_by()
+    }
+
+
+def post_fingerprints():
+    return aggregate_fingerprints(Post.objects.filter(is_visible=True))
+
+
+def post_urls(shard):
+    for pk, updated_at in iterate_rows(
+        Post.objects.filter(is_visible=True), shard, 'updated_at',
+    ):
+        yield reverse('blog:post_detail', args=[pk]), updated_at
+
+
+def category_fingerprints():
+    return aggregate_fingerprints(
+        Category.objects.filter(is_published=True)
+    )
+
+
+def category_urls(shard):
+    for _, slug, updated_at in iterate_rows(
+        Category.objects.filter(is_published=True), shard,
+        'slug', 'updated_at',
+    ):
+        yield reverse('blog:category_posts', args=[slug]), updated_at
+
+
+def profile_fingerprints():
+    # У пользователя нет времени изменения, поэтому отпечаток шарда
+    # считается по потоку (pk, username): переименование тоже заметно
+    fingerprints = {}
+    last_shard = User.objects.aggregate(last=Max('pk'))['last']
+    if last_shard is None:
+        return fingerprints
+    for shard in range((last_shard - 1) // settings.SITEMAP_SHARD_SIZE + 1):
+        digest = md5()
+        for pk, username in iterate_rows(User.objects.all(), shard,
+                                         'username'):
+            digest.update(f'{pk}|{username}\n'.encode())
+        if digest.digest() != md5().digest():
+            fingerprints[shard] = digest.hexdigest()
+    return fingerprints
+
+
+def profile_urls(shard):
+    for _, username in iterate_rows(User.objects.all(), shard, 'username'):
+        yield reverse('blog:profile', args=[username]), None
+
+
+SECTIONS = {
+    'posts': (post_fingerprints, post_urls),
+    'categories': (category_fingerprints, category_urls),
+    'profiles': (profile_fingerprints, profile_urls),
+}
+
+
+def shard_name(section, shard):
+    return f'sitemap-{section}-{shard:05}.xml.gz'
+
+
+def atomic_write(path, write, opener=open):
+    descriptor, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    os.close(descriptor)
+    try:
+        with opener(temp_path, 'wt', encoding='utf-8') as outfile:
+            write(outfile)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def write_shard(path, urls, base_url):
+    def write(outfile):
+        outfile.write(URLSET_HEADER)
+        for location, lastmod in urls:
+            outfile.write(f'<url><loc>{escape(base_url + location)}</loc>')
+            if lastmod is not None:
+                outfile.write(f'<lastmod>{lastmod.isoformat()}</lastmod>')
+            outfile.write('</url>\n')
+        outfile.write('</urlset>\n')
+
+    atomic_write(path, write, opener=gzip.open)
+
+
+def write_index(path, shards, base_url):
+    def write(outfile):
+        outfile.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<sitemapindex '
+            'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        )
+        for name, entry in sorted(shards.items()):
+            location = escape(
+                base_url + reverse('blog:sitemap_shard', args=[name])
+            )
+            outfile.write(
+                f'<sitemap><loc>{location}</loc>'
+                f'<lastmod>{entry["lastmod"]}</lastmod></sitemap>\n'
+            )
+        outfile.write('</sitemapindex>\n')
+
+    atomic_write(path, write)
+
+
+def read_manifest(root):
+    try:
+        with open(root / MANIFEST_NAME, encoding='utf-8') as manifest:
+            return json.load(manifest)
+    except (FileNotFoundError, ValueError):
+        return {'base_url': None, 'shards': {}}
+
+
+def build_sitemaps(base_url, force=False):
+    # Пересобирает только шарды, у которых изменился отпечаток;
+    # возвращает имена записанных и удалённых файлов
+    root = Path(settings.SITEMAP_ROOT)
+    root.mkdir(parents=True, exist_ok=True)
+    base_url = base_url.rstrip('/')
+    manifest = read_manifest(root)
+    force = force or manifest['base_url'] != base_url
+    shards, written = {}, []
+    for section, (fingerprints, urls) in SECTIONS.items():
+        for shard, fingerprint in sorted(fingerprints().items()):
+            name = shard_name(section, shard)
+            entry = manifest['shards'].get(name)
+            if (force or entry is None
+                    or entry['fingerprint'] != fingerprint
+                    or not (root / name).exists()):
+                write_shard(root / name, urls(shard), base_url)
+                entry = {
+                    'fingerprint': fingerprint,
+                    'lastmod': timezone.now().isoformat(),
+                }
+                written.append(name)
+            shards[name] = entry
+    removed = sorted(set(manifest['shards']) - set(shards))
+    if written or removed or force or not (root / INDEX_NAME).exists():
+        write_index(root / INDEX_NAME, shards, base_url)
+        atomic_write(root / MANIFEST_NAME, lambda outfile: json.dump(
+            {'base_url': base_url, 'shards': shards}, outfile, indent=2,
+        ))
+    for name in removed:
+        (root / name).unlink(missing_ok=True)
+    return written, removed
@@ -0,0 +1,18 @@
+from django.conf import settings
+
+from blog.replica import REPLICA_ALIAS
+
+# Меняют файл базы, поэтому к снимку только для чтения не применяются
+WRITE_PRAGMAS = ('journal_mode', 'synchronous')
+
+
+def configure_connection(sender, connection, **kwargs):
+    # Настройки SQLite действуют на соединение, поэтому выставляются
+    # при каждом подключении; с CONN_MAX_AGE это редкое событие
+    if connection.vendor != 'sqlite' or not settings.SQLITE_TUNING:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            if connection.alias == REPLICA_ALIAS and name in WRITE_PRAGMAS:
+                continue
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,58 @@
+import hashlib
+import os
+import tempfile
+from pathlib import PurePosixPath
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+
+from blog.images import claim_image
+
+
+def blob_name(digest, suffix):
+    # Два уровня каталогов по 256 вариантов: в каждом каталоге
+    # остаётся немного файлов даже при сотнях тысяч загрузок
+    return f'{digest[:2]}/{digest[2:4]}/{digest}{suffix}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    # Файл хранится под SHA-256 своего содержимого: ab/cd/<sha256>.jpg.
+    # Одинаковые загрузки становятся одним файлом, а удаляет его
+    # учёт ссылок в blog.images, когда файл больше не нужен постам
+
+    def get_available_name(self, name, max_length=None):
+        # Имя задаёт содержимое: совпадение имён — это тот же файл
+        return name
+
+    def _save(self, name, content):
+        suffix = PurePosixPath(name).suffix.lower()
+        digest = hashlib.sha256()
+        os.makedirs(self.location, exist_ok=True)
+        if hasattr(content, 'temporary_file_path'):
+            # Большая загрузка уже лежит во временном файле:
+            # хешируем её и переносим без копирования
+            for chunk in content.chunks():
+                digest.update(chunk)
+            source = content.temporary_file_path()
+        else:
+            descriptor, source = tempfile.mkstemp(
+                dir=self.location, prefix='.upload-',
+            )
+            with os.fdopen(descriptor, 'wb') as temp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+        name = blob_name(digest.hexdigest(), suffix)
+        # Отметка ставится до проверки файла: если его как раз удаляют,
+        # проверка дождётся удаления и файл запишется заново
+        claim_image(name)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            if not hasattr(content, 'temporary_file_path'):
+                os.remove(source)
+            return name
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        file_move_safe(source, full_path, allow_overwrite=True)
+        # mkstemp создаёт файл только для владельца
+        os.chmod(full_path, self.file_permissions_mode or 0o644)
+        return name
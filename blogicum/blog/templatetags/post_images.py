@@ -0,0 +1,23 @@
+from django import template
+from django.conf import settings
+
+from blog.images import image_meta, image_sources
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/post_image.html')
+def post_image(post, listing=False):
+    # В ленте — копии не шире POST_IMAGE_LISTING_WIDTH,
+    # на странице поста — все; ссылка ведёт на оригинал. Размеры
+    # и цвет-заглушка берутся из сохранённых сведений, а не из файла
+    sources = image_sources(
+        post, settings.POST_IMAGE_LISTING_WIDTH if listing else None,
+    )
+    return {
+        'post': post,
+        'meta': image_meta(post),
+        'listing': listing,
+        'src': sources[0][0] if sources else post.image.url,
+        'srcset': ', '.join(f'{url} {width}w' for url, width in sources),
+    }
@@ -0,0 +1,128 @@
+from django.db.models import OuterRef, Q, Subquery, Value
+from django.db.models.functions import Concat
+from django.http import Http404
+
+from blog.models import Comment
+from blog.pagination import CursorPage
+
+# Путь комментария — id его предков и его собственный, по PATH_STEP
+# цифр на уровень. Сортировка по пути даёт обход дерева в глубину,
+# а ветка целиком — непрерывный диапазон в индексе (post, path)
+PATH_STEP = 10
+
+# Больше любого пути: цифры в ASCII идут раньше тильды
+PATH_END = '~'
+
+
+def path_segment(pk):
+    return f'{pk:0{PATH_STEP}d}'
+
+
+def split_path(path):
+    return [
+        int(path[start:start + PATH_STEP])
+        for start in range(0, len(path), PATH_STEP)
+    ]
+
+
+def subtree_end(path):
+    # Первый путь после ветки: тот же уровень, следующий id
+    return path[:-PATH_STEP] + path_segment(int(path[-PATH_STEP:]) + 1)
+
+
+def subtree_range(post_id, path, after=None, before=None):
+    # Ответы ветки — пути с её префиксом, от after (не включая) до before
+    return Q(
+        post_id=post_id,
+        path__gt=after or path,
+        path__lt=before or path + PATH_END,
+    )
+
+
+def thread_roots(post, page_size, replies_limit, after=None):
+    # Корни веток страницы. replies_cutoff — путь первого ответа ветки,
+    # который не поместился в replies_limit; NULL — поместились все
+    roots = Comment.objects.select_related('author').filter(
+        post=post, depth=0,
+    )
+    if after is not None:
+        roots = roots.filter(path__gte=subtree_end(path_segment(after)))
+    cutoff = Comment.objects.filter(
+        post_id=OuterRef('post_id'),
+        path__gt=OuterRef('path'),
+        path__lt=Concat(OuterRef('path'), Value(PATH_END)),
+    ).order_by('path').values('path')[replies_limit:replies_limit + 1]
+    return roots.annotate(
+        replies_cutoff=Subquery(cutoff),
+    ).order_by('path')[:page_size + 1]
+
+
+def thread_replies(roots):
+    # Ответы нескольких веток одним запросом: по диапазону индекса
+    # (post, path) на ветку, не больше replies_limit в каждой.
+    # Сортировка по пути — в Python, иначе SQLite не объединит диапазоны
+    ranges = Q()
+    for root in roots:
+        ranges |= subtree_range(
+            root.post_id, root.path, before=root.replies_cutoff,
+        )
+    return Comment.objects.select_related('author').filter(
+        ranges,
+    ).order_by()
+
+
+def build_threads(comments):
+    # Строки отсортированы по пути, поэтому родитель всегда встречается
+    # раньше ответов и дерево собирается за один проход
+    nodes, roots = {}, []
+    for comment in comments:
+        comment.replies = []
+        nodes[comment.path] = comment
+        parent = nodes.get(comment.path[:-PATH_STEP])
+        (parent.replies if parent else roots).append(comment)
+    return roots
+
+
+def thread_page(post, page_size, replies_limit, after=None):
+    # after — id последней показанной ветки
+    if after is not None:
+        if not after.isdigit():
+            raise Http404('Некорректный курсор страницы.')
+        after = int(after)
+    roots = list(thread_roots(post, page_size, replies_limit, after))
+    has_next = len(roots) > page_size
+    roots = roots[:page_size]
+    replies = sorted(
+        thread_replies(roots) if roots else (), key=lambda reply: reply.path,
+    )
+    build_threads([*roots, *replies])
+    for root in roots:
+        # Остальные ответы догружаются после последнего показанного
+        root.more_replies = root.replies_cutoff and max(
+            reply.path for reply in replies
+            if reply.path.startswith(root.path)
+        )
+    return CursorPage(
+        roots, next_cursor=roots[-1].pk if has_next else None,
+    )
+
+
+def replies_page(root, replies_limit, after):
+    # Продолжение ветки после ответа с путём after; ответы, чьи
+    # родители уже показаны, выводятся с отступом по уровню
+    if not (
+        after.isdigit() and after.startswith(root.path)
+        and len(after) > len(root.path) and len(after) % PATH_STEP == 0
+    ):
+        raise Http404('Некорректный курсор ответов.')
+    rows = list(Comment.objects.select_related('author').filter(
+        subtree_range(root.post_id, root.path, after=after),
+    ).order_by('path')[:replies_limit + 1])
+    replies = build_threads(rows[:replies_limit])
+    for reply in replies:
+        reply.indent = reply.depth - 1
+    return CursorPage(
+        replies,
+        next_cursor=rows[replies_limit - 1].path
+        if len(rows) > replies_limit else None,
+    )
@@ -0,0 +1,241 @@
+import gzip
+import json
+import os
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime, time
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from blog.abstracts import ModificationDateTimeField
+from blog.models import Category, Comment, Location, Post, User
+from blog.threads import path_segment, split_path
+
+# Порядок важен: родительские объекты выгружаются раньше зависимых
+TRANSFER_MODELS = (Category, Location, User, Post, Comment)
+
+# Объекты с таким же значением уникального поля не создаются заново,
+# а сопоставляются с уже существующими
+NATURAL_KEYS = {
+    Category._meta.label_lower: 'slug',
+    User._meta.label_lower: 'username',
+}
+
+
+def open_dump(path, mode):
+    # Сжатый дамп определяется по расширению, «-» — стандартный поток
+    if path == '-':
+        return sys.stdout if 'w' in mode else sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def encode_value(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def transfer_fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+
+
+def export_rows(model, chunk_size):
+    # Строки читаются пачками по первичному ключу, без OFFSET,
+    # поэтому память не растёт вместе с размером таблицы
+    fields = transfer_fields(model)
+    label = model._meta.label_lower
+    queryset = model._base_manager.order_by('pk').values_list(
+        'pk', *(field.attname for field in fields)
+    )
+    last_pk = None
+    while True:
+        chunk = queryset.filter(
+            pk__gt=last_pk
+        ) if last_pk is not None else queryset
+        rows = list(chunk[:chunk_size])
+        if not rows:
+            return
+        for pk, *values in rows:
+            yield {
+                'model': label,
+                'pk': pk,
+                'fields': {
+                    field.name: value for field, value in zip(fields, values)
+                },
+            }
+        last_pk = rows[-1][0]
+
+
+class ImportState:
+    # Сдвиги первичных ключей и сопоставленные объекты сохраняются
+    # в файл контрольной точки после каждой пачки
+    def __init__(self, line=0, offsets=None, matched=None):
+        self.line = line
+        self.offsets = offsets or {
+            model._meta.label_lower: model._base_manager.order_by(
+                '-pk'
+            ).values_list('pk', flat=True).first() or 0
+            for model in TRANSFER_MODELS
+        }
+        self.matched = {
+            label: {int(old): new for old, new in pks.items()}
+            for label, pks in (matched or {}).items()
+        }
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, encoding='utf-8') as checkpoint:
+                return cls(**json.load(checkpoint))
+        except FileNotFoundError:
+            return cls()
+
+    def save(self, path):
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as checkpoint:
+            json.dump({
+                'line': self.line,
+                'offsets': self.offsets,
+                'matched': self.matched,
+            }, checkpoint)
+        os.replace(temp_path, path)
+
+    def remap(self, label, pk):
+        # Пустая база сохраняет исходные ключи: сдвиг равен нулю
+        matched = self.matched.get(label, {})
+        if pk in matched:
+            return matched[pk]
+        return pk + self.offsets[label]
+
+
+@contextmanager
+def preserved_timestamps(models):
+    # bulk_create вызывает pre_save, и auto_now перезаписал бы
+    # выгруженные даты текущим временем
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in flags:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def build_object(model, row, state):
+    obj = model(pk=state.remap(model._meta.label_lower, row['pk']))
+    values = row['fields']
+    for field in transfer_fields(model):
+        if field.name not in values:
+            # Дамп старой версии: время изменения берём из времени создания
+            if isinstance(field, ModificationDateTimeField):
+                setattr(obj, field.attname, field.to_python(
+                    values.get('created_at') or timezone.now()
+                ))
+            continue
+        value = values[field.name]
+        if field.is_relation and value is not None:
+            value = state.remap(
+                field.related_model._meta.label_lower, value,
+            )
+        setattr(obj, field.attname, field.to_python(value))
+    if model is Comment:
+        # Путь ветки состоит из id предков, их сдвигаем так же, как
+        # ключи; в дампе старой версии все комментарии — корни
+        label = model._meta.label_lower
+        obj.path = ''.join(
+            path_segment(state.remap(label, pk))
+            for pk in split_path(values.get('path') or path_segment(row['pk']))
+        )
+    return obj
+
+
+def import_batch(model, rows, state):
+    label = model._meta.label_lower
+    key = NATURAL_KEYS.get(label)
+    if key:
+        existing = dict(model._base_manager.filter(**{
+            f'{key}__in': [row['fields'][key] for row in rows]
+        }).values_list(key, 'pk'))
+        for row in rows:
+            if row['fields'][key] in existing:
+                state.matched.setdefault(label, {})[row['pk']] = (
+                    existing[row['fields'][key]]
+                )
+        rows = [
+            row for row in rows
+            if row['pk'] not in state.matched.get(label, {})
+        ]
+    objects = [build_object(model, row, state) for row in rows]
+    # После сбоя между коммитом и записью контрольной точки пачка
+    # могла уже попасть в базу — такие объекты пропускаем
+    present = set(model._base_manager.filter(
+        pk__in=[obj.pk for obj in objects]
+    ).values_list('pk', flat=True))
+    objects = [obj for obj in objects if obj.pk not in present]
+    model._base_manager.bulk_create(objects)
+    return len(objects)
+
+
+def read_batches(dump, state, batch_size):
+    # Пачки из строк одной модели; уже загруженные строки пропускаются
+    models = {model._meta.label_lower: model for model in TRANSFER_MODELS}
+    model, rows = None, []
+    for number, line in enumerate(dump, start=1):
+        if number <= state.line or not line.strip():
+            continue
+        row = json.loads(line)
+        if row['model'] not in models:
+            raise ValueError(
+                f'Строка {number}: неизвестная модель {row["model"]}.'
+            )
+        if rows and (models[row['model']] is not model
+                     or len(rows) >= batch_size):
+            yield model, rows, number - 1
+            rows = []
+        model = models[row['model']]
+        rows.append(row)
+    if rows:
+        yield model, rows, number
+
+
+def import_dump(dump, state, checkpoint, batch_size, report):
+    with preserved_timestamps(TRANSFER_MODELS):
+        for model, rows, line in read_batches(dump, state, batch_size):
+            with transaction.atomic():
+                created = import_batch(model, rows, state)
+            state.line = line
+            state.save(checkpoint)
+            report(model, created, line)
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(
+            no_style(), TRANSFER_MODELS,
+        ):
+            cursor.execute(sql)
+
+
+def refresh_imported_posts(offset):
+    # bulk_create не вызывает сигналы: видимость постов пересчитываем
+    # по тем же правилам, что и Post.save
+    posts = Post.objects.filter(pk__gt=offset)
+    visible = Q(
+        is_published=True,
+        category__is_published=True,
+        pub_date__lte=timezone.now(),
+    )
+    posts.filter(visible).update(is_visible=True)
+    posts.exclude(visible).update(is_visible=False)
+    return posts
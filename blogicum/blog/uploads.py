@@ -0,0 +1,113 @@
+import fcntl
+import os
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.utils import timezone
+
+from blog.models import ChunkedUpload
+
+# По столько байт тело запроса читается и пишется на диск
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class RejectedUpload(UploadedFile):
+    # Файл, который оказался больше POST_IMAGE_MAX_SIZE: содержимое
+    # отброшено, форма сообщит об ошибке по размеру
+    def __init__(self, name, content_type, size):
+        super().__init__(None, name, content_type, size)
+
+    def open(self, mode=None):
+        return self
+
+    def chunks(self, chunk_size=None):
+        return iter(())
+
+
+class CappedUploadHandler(FileUploadHandler):
+    # Стоит первым в FILE_UPLOAD_HANDLERS: пропускает данные дальше,
+    # пока файл не больше POST_IMAGE_MAX_SIZE, а остаток тела читает
+    # без записи в память или на диск
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_SIZE:
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.received > settings.POST_IMAGE_MAX_SIZE:
+            return RejectedUpload(
+                self.file_name, self.content_type, self.received,
+            )
+        return None
+
+
+def part_path(upload):
+    return Path(settings.CHUNKED_UPLOAD_DIR) / f'{upload.pk}.part'
+
+
+class ChunkedUploadFile(UploadedFile):
+    # Собранный файл загрузки по частям; хранилище переносит его
+    # по temporary_file_path без копирования
+    def __init__(self, upload):
+        self.path = part_path(upload)
+        super().__init__(
+            open(self.path, 'rb'), upload.name, None, upload.size,
+        )
+
+    def temporary_file_path(self):
+        return str(self.path)
+
+
+@contextmanager
+def locked_part(upload):
+    # Файл загрузки открыт на запись под блокировкой: одновременные
+    # запросы к одной загрузке пишут и удаляют его по очереди
+    path = part_path(upload)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor = os.open(path, os.O_WRONLY | os.O_CREAT, 0o600)
+    with os.fdopen(descriptor, 'wb') as part:
+        fcntl.flock(part, fcntl.LOCK_EX)
+        yield part
+
+
+def append_chunk(part, offset, stream, length):
+    # Дописывает часть из тела запроса, не держа её в памяти целиком.
+    # Хвост от прерванной записи после offset отбрасывается
+    part.truncate(offset)
+    part.seek(offset)
+    while length:
+        data = stream.read(min(READ_CHUNK_SIZE, length))
+        if not data:
+            break
+        part.write(data)
+        length -= len(data)
+    return part.tell()
+
+
+def discard_upload(upload):
+    with locked_part(upload):
+        part_path(upload).unlink()
+    upload.delete()
+
+
+def clear_expired_uploads():
+    # Брошенные загрузки старше CHUNKED_UPLOAD_TTL вместе с их файлами
+    expired = ChunkedUpload.objects.filter(
+        created_at__lt=timezone.now() - timedelta(
+            seconds=settings.CHUNKED_UPLOAD_TTL,
+        ),
+    )
+    total = 0
+    for upload in expired.iterator():
+        discard_upload(upload)
+        total += 1
+    return total
@@ -1,24 +1,41 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 
 from blog import views
+from blog.async_views import ASYNC_VARIANTS
 
 app_name = 'blog'
 
+
+def read_view(view_class):
+    # Под ASGI ленту, категории, профили и посты обслуживают
+    # асинхронные варианты представлений
+    if settings.ASYNC_VIEWS:
+        view_class = ASYNC_VARIANTS[view_class]
+    return view_class.as_view()
+
+
 urlpatterns = [
-    path('', views.PostListView.as_view(), name='index'),
+    path('', read_view(views.PostListView), name='index'),
     path('category/<slug:category>/',
-         views.CategoryPosts.as_view(), name='category_posts'),
+         read_view(views.CategoryPosts), name='category_posts'),
     path('admin/',
          admin.site.urls),
     path('posts/<int:pk>/',
-         views.PostDetailView.as_view(), name='post_detail'),
+         read_view(views.PostDetailView), name='post_detail'),
     path('posts/<int:pk>/edit/',
          views.PostUpdateView.as_view(), name='edit_post'),
     path('posts/<int:pk>/delete/',
          views.PostDeleteView.as_view(), name='delete_post'),
+    path('posts/<int:pk>/comments/',
+         views.PostComments.as_view(), name='post_comments'),
+    path('posts/<int:pk>/comments/<int:comment_id>/replies/',
+         views.CommentReplies.as_view(), name='comment_replies'),
     path('posts/<int:pk>/comment/',
          views.CommentCreateView.as_view(), name='add_comment'),
+    path('comments/<int:comment_id>/reply/',
+         views.CommentReplyView.as_view(), name='reply_comment'),
     path('posts/<int:post_id>/edit_comment/<int:comment_id>/',
          views.CommentUpdateView.as_view(), name='edit_comment'),
     path('posts/<int:post_id>/delete_comment/<int:comment_id>/',
@@ -28,5 +45,37 @@ urlpatterns = [
     path('profile/edit/',
          views.EditProfile.as_view(), name='edit_profile'),
     path('profile/<slug:author>/',
-         views.Profile.as_view(), name='profile'),
+         read_view(views.Profile), name='profile'),
+    path('archive/',
+         views.ArchiveIndex.as_view(), name='archive'),
+    path('archive/<int:year>/<int:month>/',
+         views.MonthArchive.as_view(), name='archive_month'),
+    path('category/<slug:category>/archive/',
+         views.ArchiveIndex.as_view(), name='category_archive'),
+    path('category/<slug:category>/archive/<int:year>/<int:month>/',
+         views.MonthArchive.as_view(), name='category_archive_month'),
+    path('profile/<slug:author>/archive/',
+         views.ArchiveIndex.as_view(), name='profile_archive'),
+    path('profile/<slug:author>/archive/<int:year>/<int:month>/',
+         views.MonthArchive.as_view(), name='profile_archive_month'),
+    path('feed/<str:feed_format>/',
+         views.PostFeed.as_view(), name='feed'),
+    path('category/<slug:category>/feed/<str:feed_format>/',
+         views.PostFeed.as_view(), name='category_feed'),
+    path('profile/<slug:author>/feed/<str:feed_format>/',
+         views.PostFeed.as_view(), name='profile_feed'),
+    path('filter/',
+         views.PostFilter.as_view(), name='filter'),
+    path('search/',
+         views.PostSearch.as_view(), name='search'),
+    path('autocomplete/',
+         views.Autocomplete.as_view(), name='autocomplete'),
+    path('uploads/',
+         views.ChunkedUploadCreate.as_view(), name='create_upload'),
+    path('uploads/<uuid:upload_id>/',
+         views.ChunkedUploadDetail.as_view(), name='upload'),
+    path('sitemap.xml',
+         views.SitemapFile.as_view(), name='sitemap'),
+    path('sitemaps/<str:filename>',
+         views.SitemapFile.as_view(), name='sitemap_shard'),
 ]
@@ -1,17 +1,46 @@
-from datetime import datetime as dt
+import os
+import re
+from datetime import MAXYEAR, MINYEAR
+from pathlib import Path
 
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Count
-from django.http import Http404
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
-from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag, urlencode
 from django.views.generic import (
-    CreateView, DeleteView, DetailView, ListView, UpdateView,
+    CreateView, DeleteView, DetailView, ListView, TemplateView, UpdateView,
+    View,
 )
 
+from blog.archive import (
+    SITE_SCOPE, archive_months, author_scope, category_scope, month_bounds,
+)
+from blog.autocomplete import AUTOCOMPLETE_KINDS, autocomplete
+from blog.cache import (
+    AnonymousPageCacheMixin, ConditionalGetMixin, attach_post_card_versions,
+)
+from blog.facets import (
+    DATE_PRESETS, FacetFilters, FacetResults, facet_values, get_facet_index,
+)
+from blog.feeds import FEED_TYPES, open_feed
 from blog.forms import CommentForm, PostForm
-from blog.models import Category, Comment, Post, User
+from blog.models import (
+    Category, ChunkedUpload, Comment, Location, Post, User,
+)
+from blog.pagination import (
+    CachedCountPaginator, CursorPaginationMixin, WindowedPaginator,
+)
+from blog.search import SearchResults
+from blog.sitemaps import INDEX_NAME
+from blog.threads import replies_page, thread_page
+from blog.uploads import (
+    ChunkedUploadFile, append_chunk, discard_upload, locked_part, part_path,
+)
 
 PAGINATE_BY_CONSTANT = 10
 
@@ -39,6 +68,39 @@ class PostMixin:
 
 class PostFormMixin:
     form_class = PostForm
+    chunked_upload = None
+
+    def get_form_kwargs(self):
+        # Фото, загруженное по частям, приходит в поле upload
+        # и подставляется в форму как обычный файл
+        kwargs = super().get_form_kwargs()
+        upload_id = self.request.POST.get('upload')
+        if upload_id and 'image' not in self.request.FILES:
+            try:
+                upload = ChunkedUpload.objects.filter(
+                    pk=upload_id, author=self.request.user,
+                ).first()
+            except ValidationError:
+                upload = None
+            if upload is not None and upload.complete:
+                self.chunked_upload = upload
+                kwargs['files'] = kwargs['files'].copy()
+                kwargs['files']['image'] = ChunkedUploadFile(upload)
+        return kwargs
+
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        if self.chunked_upload is not None:
+            form.files['image'].close()
+            discard_upload(self.chunked_upload)
+        return response
+
+    def form_invalid(self, form):
+        # Собранная загрузка остаётся: форма вернёт её номер в поле
+        # upload, и фото не придётся отправлять заново
+        if self.chunked_upload is not None:
+            form.files['image'].close()
+        return super().form_invalid(form)
 
 
 class PostUserRedirectMixin:
@@ -50,6 +112,14 @@ class PostUserRedirectMixin:
         return super().dispatch(request, *args, **kwargs)
 
 
+class PostCardCacheMixin:
+    def get_context_data(self, **kwargs):
+        # Версии для кэша карточек постов на текущей странице
+        context = super().get_context_data(**kwargs)
+        attach_post_card_versions(context['page_obj'])
+        return context
+
+
 class GetSuccessUrlCurrentUserProfileMixin:
     def get_success_url(self):
         # Определяем страницу для success_url
@@ -95,49 +165,116 @@ class PostDeleteView(LoginRequiredMixin,
         return f'/posts/{self.kwargs["pk"]}/'
 
 
-class PostListView(ListView):
+class PostListView(
+    ConditionalGetMixin, AnonymousPageCacheMixin, CursorPaginationMixin,
+    PostCardCacheMixin, ListView,
+):
     template_name = 'blog/index.html'
     model = Post
     paginate_by = PAGINATE_BY_CONSTANT
+    paginator_class = CachedCountPaginator
+    page_cache_name = 'index'
 
     def get_queryset(self):
         queryset = Post.objects.select_related(
             'category',
             'location',
             'author',
-        ).filter(
-            is_published=True,
-            category__is_published=True,
-            pub_date__lte=dt.now(tz=timezone.get_current_timezone()),
-        ).order_by('-pub_date').annotate(comment_count=Count('post_comment'))
+        ).filter(is_visible=True).order_by('-pub_date', '-id')
         return queryset
 
 
-class PostDetailView(PostMixin, PostFormMixin, DetailView):
+class PostDetailView(
+    ConditionalGetMixin, PostMixin, PostFormMixin, DetailView,
+):
     template_name = 'blog/detail.html'
 
+    def get_conditional_state(self):
+        # Новые, изменённые и удалённые комментарии обновляют updated_at
+        # у поста, поэтому комментарии отдельно не читаются
+        return Post.objects.filter(pk=self.kwargs['pk']).values(
+            'updated_at',
+            'comment_count',
+            'category__updated_at',
+            'location__updated_at',
+            'author__username',
+        ).first() or {}
+
     def get_context_data(self, **kwargs):
         return dict(
             **super().get_context_data(**kwargs),
             form=CommentForm(),
-            comments=self.object.post_comment.select_related('author'),
+            comments=thread_page(
+                self.object,
+                settings.COMMENTS_PAGE_SIZE,
+                settings.COMMENT_THREAD_REPLIES,
+            ),
+        )
+
+
+class PostComments(TemplateView):
+    # Следующие ветки комментариев для ссылки «Показать ещё»
+    template_name = 'includes/comment_list.html'
+
+    def get_context_data(self, **kwargs):
+        post = get_object_or_404(Post.objects.only('pk'), pk=self.kwargs['pk'])
+        return dict(
+            **super().get_context_data(**kwargs),
+            post=post,
+            comments=thread_page(
+                post,
+                settings.COMMENTS_PAGE_SIZE,
+                settings.COMMENT_THREAD_REPLIES,
+                self.request.GET.get('after'),
+            ),
         )
 
 
-class CategoryPosts(PostMixin, ListView):
+class CommentReplies(TemplateView):
+    # Остальные ответы ветки для ссылки «Показать ещё ответы»
+    template_name = 'includes/comment_replies.html'
+
+    def get_context_data(self, **kwargs):
+        root = get_object_or_404(
+            Comment.objects.select_related('post').only(
+                'post_id', 'path', 'post__id',
+            ),
+            pk=self.kwargs['comment_id'],
+            post_id=self.kwargs['pk'],
+            depth=0,
+        )
+        return dict(
+            **super().get_context_data(**kwargs),
+            post=root.post,
+            root=root,
+            replies=replies_page(
+                root,
+                settings.COMMENT_THREAD_REPLIES,
+                self.request.GET.get('after', ''),
+            ),
+        )
+
+
+class CategoryPosts(
+    ConditionalGetMixin, AnonymousPageCacheMixin, CursorPaginationMixin,
+    PostCardCacheMixin, PostMixin, ListView,
+):
     template_name = 'blog/category.html'
     model = Post
     paginate_by = PAGINATE_BY_CONSTANT
+    paginator_class = CachedCountPaginator
+    page_cache_name = 'category_posts'
+
+    def get_page_cache_scopes(self):
+        return (('category_page', self.kwargs['category']),)
 
     def get_queryset(self):
         return Post.objects.select_related(
             'author', 'location', 'category',
-        ).annotate(comment_count=Count('post_comment')).filter(
+        ).filter(
             category__slug=self.kwargs['category'],
-            is_published=True,
-            category__is_published=True,
-            pub_date__lte=dt.now(tz=timezone.get_current_timezone()),
-        ).order_by('-pub_date')
+            is_visible=True,
+        ).order_by('-pub_date', '-id')
 
     def get_context_data(self, **kwargs):
         return dict(
@@ -151,11 +288,20 @@ class CategoryPosts(PostMixin, ListView):
         )
 
 
-class Profile(ListView):
+class Profile(
+    ConditionalGetMixin, AnonymousPageCacheMixin, CursorPaginationMixin,
+    PostCardCacheMixin, ListView,
+):
     template_name = 'blog/profile.html'
     model = Post
     paginate_by = PAGINATE_BY_CONSTANT
+    # Автор сразу видит новые посты, поэтому количество считается точно
+    paginator_class = WindowedPaginator
     form_class = PostForm
+    page_cache_name = 'profile'
+
+    def get_page_cache_scopes(self):
+        return (('profile_page', self.kwargs['author']),)
 
     def get_queryset(self):
         user = get_object_or_404(User, username=self.kwargs.get('author'))
@@ -163,14 +309,11 @@ class Profile(ListView):
             'author',
             'category',
             'location',
-        ).annotate(comment_count=Count('post_comment')).order_by('-pub_date')
+        ).order_by('-pub_date', '-id')
         if user == self.request.user:
             queryset = base_query
         else:
-            queryset = base_query.filter(
-                is_published=True,
-                pub_date__lte=dt.now(tz=timezone.get_current_timezone()),
-            )
+            queryset = base_query.filter(is_visible=True)
         return queryset
 
     def get_context_data(self, **kwargs):
@@ -182,6 +325,286 @@ class Profile(ListView):
         )
 
 
+class ArchiveMixin:
+    # Раздел архива: весь сайт, категория или автор из адреса страницы
+    def get_archive_scope(self):
+        if 'category' in self.kwargs:
+            self.category = get_object_or_404(
+                Category, slug=self.kwargs['category'], is_published=True,
+            )
+            return category_scope(self.category.pk)
+        if 'author' in self.kwargs:
+            self.profile = get_object_or_404(
+                User, username=self.kwargs['author'],
+            )
+            return author_scope(self.profile.pk)
+        return SITE_SCOPE
+
+    def get_page_cache_scopes(self):
+        if 'category' in self.kwargs:
+            return (('category_page', self.kwargs['category']),)
+        if 'author' in self.kwargs:
+            return (('profile_page', self.kwargs['author']),)
+        return (('feed_page', 'all'),)
+
+    def get_context_data(self, **kwargs):
+        return dict(
+            **super().get_context_data(**kwargs),
+            archive_scope=self.archive_scope,
+            archive_months=archive_months(self.archive_scope),
+            category=getattr(self, 'category', None),
+            profile=getattr(self, 'profile', None),
+        )
+
+
+class ArchiveIndex(AnonymousPageCacheMixin, ArchiveMixin, TemplateView):
+    template_name = 'blog/archive.html'
+    page_cache_name = 'archive'
+
+    def get(self, request, *args, **kwargs):
+        self.archive_scope = self.get_archive_scope()
+        return super().get(request, *args, **kwargs)
+
+
+class MonthArchive(
+    AnonymousPageCacheMixin, ArchiveMixin, CursorPaginationMixin,
+    PostCardCacheMixin, ListView,
+):
+    template_name = 'blog/archive.html'
+    model = Post
+    paginate_by = PAGINATE_BY_CONSTANT
+    paginator_class = CachedCountPaginator
+    page_cache_name = 'archive'
+
+    def get_queryset(self):
+        self.archive_scope = self.get_archive_scope()
+        if not 1 <= self.kwargs['month'] <= 12:
+            raise Http404('Такого месяца нет.')
+        # Граница месяца должна уложиться в datetime вместе со сдвигом
+        # часового пояса
+        if not MINYEAR < self.kwargs['year'] < MAXYEAR:
+            raise Http404('Такого года нет.')
+        start, end = month_bounds(self.kwargs['year'], self.kwargs['month'])
+        queryset = Post.objects.select_related(
+            'author', 'location', 'category',
+        ).filter(is_visible=True, pub_date__gte=start, pub_date__lt=end)
+        if 'category' in self.kwargs:
+            queryset = queryset.filter(category=self.category)
+        elif 'author' in self.kwargs:
+            queryset = queryset.filter(author=self.profile)
+        return queryset.order_by('-pub_date', '-id')
+
+    def get_context_data(self, **kwargs):
+        return dict(
+            **super().get_context_data(**kwargs),
+            month_start=month_bounds(
+                self.kwargs['year'], self.kwargs['month'],
+            )[0],
+        )
+
+
+class PostFilter(
+    AnonymousPageCacheMixin, PostCardCacheMixin, ListView,
+):
+    # Лента с фильтрами по категории, месту, автору и дате; выборка
+    # и счётчики фасетов считаются по индексу в памяти
+    template_name = 'blog/filter.html'
+    paginate_by = PAGINATE_BY_CONSTANT
+    paginator_class = WindowedPaginator
+    page_cache_name = 'filter'
+    facets = (
+        ('category', 'Категории', Category, 'title'),
+        ('location', 'Места', Location, 'name'),
+        ('author', 'Авторы', User, 'username'),
+    )
+
+    def get_queryset(self):
+        self.filters = FacetFilters(self.request.GET)
+        self.index = get_facet_index()
+        return FacetResults(self.index, self.filters)
+
+    def get_facets(self):
+        facets = []
+        for facet, title, model, label_field in self.facets:
+            values = facet_values(self.index, self.filters, facet)
+            labels = model.objects.in_bulk(
+                [value for value, _, _ in values]
+            )
+            facets.append((title, [
+                (
+                    getattr(labels[value], label_field), count, selected,
+                    urlencode(self.filters.toggled(facet, value)),
+                )
+                for value, count, selected in values if value in labels
+            ]))
+        return facets
+
+    def get_context_data(self, **kwargs):
+        return dict(
+            **super().get_context_data(**kwargs),
+            facets=self.get_facets(),
+            filters=self.filters,
+            date_presets=[
+                (days, title, urlencode(self.filters.for_days(days)))
+                for days, title in DATE_PRESETS
+            ],
+            any_date_query=urlencode(self.filters.for_days(None)),
+            page_query='&' + urlencode(self.filters.params()),
+        )
+
+
+class PostSearch(ListView):
+    template_name = 'blog/search.html'
+    paginate_by = PAGINATE_BY_CONSTANT
+    paginator_class = WindowedPaginator
+
+    def get_queryset(self):
+        return SearchResults(self.request.GET.get('q', ''))
+
+    def get_context_data(self, **kwargs):
+        query = self.request.GET.get('q', '')
+        return dict(
+            **super().get_context_data(**kwargs),
+            query=query,
+            # Ссылки пагинатора сохраняют поисковый запрос
+            page_query='&' + urlencode({'q': query}),
+        )
+
+
+class PostFeed(View):
+    # RSS/Atom ленты сайта, категории и автора из готового файла
+    def get(self, request, feed_format, category=None, author=None):
+        if feed_format not in FEED_TYPES:
+            raise Http404('Неизвестный формат ленты.')
+        feed_file, path = open_feed(feed_format, request, category, author)
+        stat = os.fstat(feed_file.fileno())
+        # Имя файла содержит версию раздела, на котором собрана лента
+        etag = quote_etag(path.stem)
+        last_modified = int(stat.st_mtime)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified,
+        )
+        if response is not None:
+            feed_file.close()
+            return response
+        response = FileResponse(
+            feed_file, content_type=FEED_TYPES[feed_format].content_type,
+        )
+        response['Content-Length'] = stat.st_size
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class SitemapFile(View):
+    # Индекс и шарды sitemap заранее собирает команда build_sitemaps,
+    # здесь только отдаётся готовый файл
+    filename_re = re.compile(r'sitemap-[a-z]+-\d+\.xml\.gz')
+
+    def get(self, request, filename=INDEX_NAME):
+        if filename != INDEX_NAME and not self.filename_re.fullmatch(
+            filename
+        ):
+            raise Http404('Такого файла sitemap нет.')
+        try:
+            return FileResponse(
+                open(Path(settings.SITEMAP_ROOT) / filename, 'rb'),
+            )
+        except FileNotFoundError:
+            raise Http404('Sitemap ещё не собран.')
+
+
+class Autocomplete(View):
+    # Подсказки для профилей, категорий и местоположений отвечают
+    # из индекса в памяти процесса, без запросов к базе
+    def get(self, request):
+        kind = request.GET.get('kind')
+        if kind is not None and kind not in AUTOCOMPLETE_KINDS:
+            raise Http404('Неизвестный вид подсказок.')
+        return JsonResponse({'results': autocomplete(
+            request.GET.get('q', ''),
+            kinds=(kind,) if kind else AUTOCOMPLETE_KINDS,
+        )})
+
+
+class ChunkedUploadCreate(LoginRequiredMixin, View):
+    # Начало загрузки фото по частям: клиент сообщает имя и размер,
+    # получает адрес, на который отправляет части
+    def post(self, request):
+        try:
+            size = int(request.POST['size'])
+            name = request.POST['name'][:255]
+        except (KeyError, ValueError):
+            return JsonResponse(
+                {'error': 'Укажите имя и размер файла.'}, status=400,
+            )
+        if not 0 < size <= settings.POST_IMAGE_MAX_SIZE:
+            return JsonResponse(
+                {'error': 'Недопустимый размер файла.'}, status=413,
+            )
+        upload = ChunkedUpload.objects.create(
+            author=request.user, name=name, size=size,
+        )
+        return JsonResponse({
+            'id': str(upload.pk),
+            'url': reverse('blog:upload', args=[upload.pk]),
+            'offset': 0,
+        }, status=201)
+
+
+class ChunkedUploadDetail(LoginRequiredMixin, View):
+    # HEAD — сколько байт уже принято, PATCH с заголовком Upload-Offset —
+    # следующая часть. После обрыва клиент продолжает с принятого места
+    upload = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            self.upload = get_object_or_404(
+                ChunkedUpload, pk=kwargs['upload_id'], author=request.user,
+            )
+        return super().dispatch(request, *args, **kwargs)
+
+    def offset_response(self, status=204):
+        response = HttpResponse(status=status)
+        response['Upload-Offset'] = self.upload.offset
+        response['Upload-Length'] = self.upload.size
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    def head(self, request, upload_id):
+        return self.offset_response(200)
+
+    def patch(self, request, upload_id):
+        upload = self.upload
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return HttpResponse(status=400)
+        if offset != upload.offset:
+            return self.offset_response(409)
+        if offset + length > upload.size:
+            return self.offset_response(413)
+        with locked_part(upload) as part:
+            # Одновременные отправки той же части пишут по очереди,
+            # поэтому принятое смещение читается уже под блокировкой
+            try:
+                upload.refresh_from_db(fields=['offset'])
+            except ChunkedUpload.DoesNotExist:
+                # Загрузку удалили, пока запрос ждал
+                part_path(upload).unlink(missing_ok=True)
+                raise Http404
+            if offset != upload.offset:
+                return self.offset_response(409)
+            upload.offset = append_chunk(part, offset, request, length)
+            upload.save(update_fields=['offset'])
+        return self.offset_response()
+
+    def delete(self, request, upload_id):
+        discard_upload(self.upload)
+        return HttpResponse(status=204)
+
+
 class EditProfile(
     LoginRequiredMixin, GetSuccessUrlCurrentUserProfileMixin, UpdateView,
 ):
@@ -197,6 +620,7 @@ class EditProfile(
 class CommentCreateView(LoginRequiredMixin, CreateView):
     template_name = 'blog/comment.html'
     object = None
+    parent = None
     model = Comment
     form_class = CommentForm
 
@@ -204,19 +628,40 @@ class CommentCreateView(LoginRequiredMixin, CreateView):
         self.object = get_object_or_404(Post, pk=kwargs['pk'])
         return super().dispatch(request, *args, **kwargs)
 
+    @transaction.atomic
     def form_valid(self, form):
+        # Комментарий и счётчик у поста сохраняются в одной транзакции
         form.instance.author = self.request.user
         form.instance.post = self.object
         form.instance.post_id = self.kwargs['pk']
+        form.instance.parent = self.parent
         return super().form_valid(form)
 
     def get_success_url(self):
         return reverse('blog:post_detail', args=[self.kwargs['pk'], ])
 
 
+class CommentReplyView(CommentCreateView):
+
+    def dispatch(self, request, *args, **kwargs):
+        # Ответы глубже COMMENT_MAX_DEPTH встают рядом с родителем,
+        # чтобы ветка не уходила вправо бесконечно
+        self.parent = get_object_or_404(
+            Comment.objects.select_related('parent'),
+            pk=kwargs['comment_id'],
+        )
+        if self.parent.depth >= settings.COMMENT_MAX_DEPTH:
+            self.parent = self.parent.parent
+        self.kwargs['pk'] = kwargs['pk'] = self.parent.post_id
+        return super().dispatch(request, *args, **kwargs)
+
+
 class CommentUpdateView(LoginRequiredMixin, CommentMixin, UpdateView):
     pass
 
 
 class CommentDeleteView(LoginRequiredMixin, CommentMixin, DeleteView):
-    pass
+
+    @transaction.atomic
+    def delete(self, request, *args, **kwargs):
+        return super().delete(request, *args, **kwargs)
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -20,6 +21,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.forms',
     'debug_toolbar',
     'django_bootstrap5',
 ]
@@ -32,9 +34,19 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+# blogicum/asgi.py включает асинхронные представления для чтения
+# и пул потоков, в котором они ходят в базу и рендерят шаблоны
+ASYNC_VIEWS = os.getenv('BLOGICUM_ASYNC_VIEWS') == '1'
+
+ASYNC_VIEW_WORKERS = int(os.getenv('BLOGICUM_ASYNC_VIEW_WORKERS', 16))
+
+# DjDT работает только синхронно и под ASGI перевёл бы в поток
+# всю цепочку middleware вместе с асинхронными представлениями
+if not ASYNC_VIEWS:
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 ROOT_URLCONF = 'blogicum.urls'
 
 TEMPLATES_DIR = BASE_DIR / 'templates'
@@ -55,15 +67,125 @@ TEMPLATES = [
     },
 ]
 
+# Шаблоны виджетов форм ищутся и в каталоге шаблонов проекта
+FORM_RENDERER = 'django.forms.renderers.TemplatesSetting'
+
 WSGI_APPLICATION = 'blogicum.wsgi.application'
 
+# Профиль SQLite под одновременные запросы (blog/sqlite.py): WAL, чтобы
+# читатели не ждали писателя, ожидание блокировки вместо ошибки
+# «database is locked» и постоянные соединения.
+# BLOGICUM_SQLITE_TUNING=0 возвращает настройки SQLite по умолчанию
+SQLITE_TUNING = os.getenv('BLOGICUM_SQLITE_TUNING', '1') == '1'
+
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('BLOGICUM_DB', BASE_DIR / 'db.sqlite3'),
+        'CONN_MAX_AGE': 600 if SQLITE_TUNING else 0,
     }
 }
 
+# Снимок основной базы только для чтения: включается переменной
+# окружения BLOGICUM_REPLICA с путём к файлу, обновляется командой
+# refresh_replica. Снимок старше REPLICA_MAX_LAG секунд не читается
+REPLICA_PATH = os.getenv('BLOGICUM_REPLICA')
+
+REPLICA_MAX_LAG = int(os.getenv('BLOGICUM_REPLICA_MAX_LAG', 30))
+
+# Страницы, запросы которых можно отдать снимку
+REPLICA_VIEWS = (
+    'blog:index',
+    'blog:category_posts',
+    'blog:profile',
+    'blog:post_detail',
+    'blog:post_comments',
+)
+
+if REPLICA_PATH:
+    REPLICA_PATH = Path(REPLICA_PATH).resolve()
+    # refresh_replica подменяет файл снимка, а открытое соединение
+    # читает прежний, уже удалённый файл: соединение со снимком
+    # закрывается после каждого запроса
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{REPLICA_PATH}?mode=ro',
+        'CONN_MAX_AGE': 0,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['blog.replica.ReplicaRouter']
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index(
+            'django.contrib.auth.middleware.AuthenticationMiddleware'
+        ) + 1,
+        'blog.replica.ReplicaMiddleware',
+    )
+
+# Кэш общий для всех процессов сайта и команд управления: страницы,
+# карточки постов и числа постов. Версии разделов хранятся в базе
+# (blog.CacheVersion), счётчики попаданий — в отдельном малом кэше,
+# чтобы их не вытесняли страницы
+CACHE_ROOT = Path(os.getenv('BLOGICUM_CACHE_DIR', BASE_DIR / 'cache'))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_ROOT / 'default',
+        'OPTIONS': {'MAX_ENTRIES': 20000, 'CULL_FREQUENCY': 4},
+    },
+    'stats': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_ROOT / 'stats',
+        'TIMEOUT': None,
+    },
+}
+
+# Кэш страниц для анонимных читателей: время жизни и длина интервала,
+# после которого в ленте появляются отложенные публикации (в секундах)
+PAGE_CACHE_TIMEOUT = 300
+
+PAGE_CACHE_BUCKET = 60
+
+# Как долго пагинатор ленты доверяет закэшированному числу постов
+PAGINATOR_COUNT_TIMEOUT = 60
+
+# Сколько веток комментариев показывать на странице поста
+# и догружать за раз
+COMMENTS_PAGE_SIZE = 20
+
+# Сколько ответов ветки показывать сразу и догружать за раз
+COMMENT_THREAD_REPLIES = 50
+
+# Глубже этого уровня ответы не вкладываются
+COMMENT_MAX_DEPTH = 5
+
+# RSS/Atom: каталог для готовых файлов лент, число постов в ленте
+# и размер пачки, которой посты читаются из базы при сборке
+FEED_ROOT = BASE_DIR / 'feed_cache'
+
+FEED_ITEMS = 50
+
+FEED_CHUNK_SIZE = 200
+
+# Sitemap: каталог с готовыми файлами, адрес сайта для ссылок,
+# число адресов в одном шарде и размер пачки при чтении из базы
+SITEMAP_ROOT = BASE_DIR / 'sitemaps'
+
+SITEMAP_BASE_URL = 'http://127.0.0.1:8000'
+
+SITEMAP_SHARD_SIZE = 50000
+
+SITEMAP_CHUNK_SIZE = 2000
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -105,6 +227,51 @@ LOGIN_REDIRECT_URL = 'blog:index'
 
 MEDIA_ROOT = BASE_DIR / 'media/posts_images/'
 
+# Фото хранятся под хешем содержимого (ab/cd/<sha256>.jpg),
+# одинаковые загрузки — один файл
+DEFAULT_FILE_STORAGE = 'blog.storage.ContentAddressedStorage'
+
+# Ширины уменьшенных копий фото постов; в ленте — не шире
+# POST_IMAGE_LISTING_WIDTH
+POST_IMAGE_WIDTHS = (320, 640, 1280)
+
+POST_IMAGE_LISTING_WIDTH = 640
+
+# Варианты фото и копий в современных форматах; AVIF сохраняется,
+# только если Pillow его поддерживает
+POST_IMAGE_FORMATS = ('AVIF', 'WEBP')
+
+# Процессы, в которых готовятся копии фото; 0 — в запросе
+IMAGE_WORKERS = int(os.getenv('BLOGICUM_IMAGE_WORKERS', 2))
+
+# Сколько секунд файл фото, только что отданный хранилищем, не удаляется,
+# пока пост не возьмёт на него ссылку; брошенные файлы убирает
+# clear_uploads
+IMAGE_CLAIM_TTL = 60 * 60
+
+# Предельный размер фото поста в байтах и в пикселях; размер
+# в пикселях проверяется по заголовку файла до декодирования
+POST_IMAGE_MAX_SIZE = int(
+    os.getenv('BLOGICUM_IMAGE_MAX_SIZE', 20 * 1024 * 1024)
+)
+
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+
+# Загрузки крупнее 256 КБ пишутся во временный файл, а не в память;
+# часть сверх POST_IMAGE_MAX_SIZE не сохраняется вовсе
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+
+FILE_UPLOAD_HANDLERS = [
+    'blog.uploads.CappedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Загрузки по частям: недокачанные файлы и сколько они хранятся
+CHUNKED_UPLOAD_DIR = BASE_DIR / 'media/uploads'
+
+CHUNKED_UPLOAD_TTL = 24 * 60 * 60
+
 EMAIL_BACKEND = 'django.core.mail.backends.<тип бэкенда>.EmailBackend'
 
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
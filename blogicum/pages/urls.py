@@ -1,17 +1,18 @@
 from django.urls import path
-from django.views.generic import TemplateView
+
+from pages.views import StaticPage
 
 app_name = 'pages'
 
 urlpatterns = [
     path(
         'about/',
-        TemplateView.as_view(template_name="pages/about.html"),
+        StaticPage.as_view(template_name="pages/about.html"),
         name='about',
     ),
     path(
         'rules/',
-        TemplateView.as_view(template_name="pages/rules.html"),
+        StaticPage.as_view(template_name="pages/rules.html"),
         name='rules',
     ),
 ]
@@ -1,4 +1,14 @@
 from django.shortcuts import render
+from django.views.generic import TemplateView
+
+from blog.cache import AnonymousPageCacheMixin
+
+
+class StaticPage(AnonymousPageCacheMixin, TemplateView):
+    page_cache_name = 'static_page'
+
+    def get_page_cache_scopes(self):
+        return (('static_page', self.template_name),)
 
 
 def csrf_failure(request, reason='Ошибка CSRF токена. 403'):
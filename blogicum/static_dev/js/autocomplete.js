@@ -0,0 +1,25 @@
+// Подсказки для полей с data-autocomplete-url: варианты приходят
+// из /autocomplete/, выбранный id пишется в скрытое поле формы
+document.querySelectorAll('[data-autocomplete-url]').forEach((input) => {
+  const target = document.getElementById(input.dataset.autocompleteTarget);
+  const options = document.getElementById(input.getAttribute('list'));
+  let choices = new Map([[input.value, target.value]]);
+  let timer = null;
+
+  input.addEventListener('input', () => {
+    target.value = choices.get(input.value) || '';
+    clearTimeout(timer);
+    timer = setTimeout(async () => {
+      const url = new URL(input.dataset.autocompleteUrl, window.location.href);
+      url.searchParams.set('q', input.value);
+      const response = await fetch(url);
+      if (!response.ok) {
+        return;
+      }
+      const { results } = await response.json();
+      choices = new Map(results.map((item) => [item.label, item.id]));
+      options.replaceChildren(...results.map((item) => new Option(item.label)));
+      target.value = choices.get(input.value) || '';
+    }, 150);
+  });
+});
@@ -0,0 +1,80 @@
+// Крупное фото уходит частями по 1 МБ: после обрыва связи загрузка
+// продолжается с последнего принятого байта, а форма отправляется
+// уже без файла, со ссылкой на собранную загрузку
+const CHUNK_SIZE = 1024 * 1024;
+const RETRIES = 5;
+
+async function startUpload(hidden, file, headers) {
+  const body = new FormData();
+  body.append('name', file.name);
+  body.append('size', file.size);
+  const response = await fetch(hidden.dataset.url, {
+    method: 'POST', headers, body,
+  });
+  if (!response.ok) {
+    throw new Error((await response.json()).error);
+  }
+  return response.json();
+}
+
+async function currentOffset(upload, headers) {
+  const response = await fetch(upload.url, {method: 'HEAD', headers});
+  return Number(response.headers.get('Upload-Offset'));
+}
+
+async function sendFile(upload, file, headers) {
+  let offset = upload.offset;
+  let failures = 0;
+  while (offset < file.size) {
+    try {
+      const response = await fetch(upload.url, {
+        method: 'PATCH',
+        headers: {
+          ...headers,
+          'Content-Type': 'application/offset+octet-stream',
+          'Upload-Offset': offset,
+        },
+        body: file.slice(offset, offset + CHUNK_SIZE),
+      });
+      if (response.status !== 204 && response.status !== 409) {
+        throw new Error(response.statusText);
+      }
+      offset = Number(response.headers.get('Upload-Offset'));
+      failures = 0;
+    } catch (error) {
+      failures += 1;
+      if (failures > RETRIES) {
+        throw error;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000 * failures));
+      offset = await currentOffset(upload, headers);
+    }
+  }
+}
+
+document.addEventListener('submit', async (event) => {
+  const form = event.target;
+  const hidden = form.querySelector('[data-chunked-upload]');
+  const input = form.querySelector('input[type="file"][name="image"]');
+  if (!hidden || !input || !input.files.length) {
+    return;
+  }
+  const file = input.files[0];
+  if (file.size <= CHUNK_SIZE) {
+    return;
+  }
+  event.preventDefault();
+  const headers = {
+    'X-CSRFToken': form.elements.csrfmiddlewaretoken.value,
+  };
+  try {
+    const upload = await startUpload(hidden, file, headers);
+    await sendFile(upload, file, headers);
+    hidden.value = upload.id;
+    input.value = '';
+    form.submit();
+  } catch (error) {
+    input.setCustomValidity(error.message);
+    input.reportValidity();
+  }
+});
@@ -0,0 +1,13 @@
+// «Показать ещё»: следующая порция комментариев подгружается
+// фрагментом и встаёт на место ссылки вместе с новой ссылкой
+document.addEventListener('click', async (event) => {
+  const link = event.target.closest('[data-comments-more]');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  const response = await fetch(link.href);
+  if (response.ok) {
+    link.outerHTML = await response.text();
+  }
+});
@@ -3,6 +3,7 @@ import re
 import time
 from http import HTTPStatus
 from inspect import getsource
+from io import BytesIO
 from pathlib import Path
 from typing import (
     Iterable, Type, Optional, Union, Any, Tuple, List, NamedTuple, TypeVar)
@@ -15,6 +16,7 @@ from django.forms import BaseForm
 from django.http import HttpResponse
 from django.test.client import Client
 from mixer.backend.django import mixer as _mixer
+from PIL import Image
 
 N_PER_FIXTURE = 3
 N_PER_PAGE = 10
@@ -81,6 +83,35 @@ def mixer():
     return _mixer
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Откат транзакции в тестах не сбрасывает кэш, поэтому чистим его сами
+    from django.core.cache import caches
+    for cache in caches.all():
+        cache.clear()
+
+
+def image_bytes(size=(60, 40), format='JPEG', color='teal',
+                orientation=None):
+    data = BytesIO()
+    options = {}
+    if orientation:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        options['exif'] = exif
+    Image.new('RGB', size, color).save(data, format, **options)
+    return data.getvalue()
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    # Фото пишутся во временный каталог, а копии готовятся сразу,
+    # а не в фоновых процессах
+    settings.MEDIA_ROOT = tmp_path / 'media'
+    settings.IMAGE_WORKERS = 0
+    return settings.MEDIA_ROOT
+
+
 @pytest.fixture
 def user(mixer):
     User = get_user_model()
@@ -331,10 +362,12 @@ def cleanup(request):
     from blogicum import settings
     image_dir = Path(settings.__file__).parent.parent / settings.MEDIA_ROOT
 
-    for root, dirs, files in os.walk(image_dir):
+    for root, dirs, files in os.walk(image_dir, topdown=False):
         for filename in files:
-            if (filename.endswith('.jpg') or filename.endswith(
-                    '.gif') or filename.endswith('.png')):
+            if filename.endswith(('.jpg', '.gif', '.png', '.webp', '.avif')):
                 file_path = os.path.join(root, filename)
                 if os.path.getmtime(file_path) >= start_time:
                     os.remove(file_path)
+        # Каталоги хранилища по хешу, которые опустели
+        if root != str(image_dir) and not os.listdir(root):
+            os.rmdir(root)
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+import pytest
+from django.utils import timezone
+
+from blog.models import MonthlyPostCount
+
+
+@pytest.mark.django_db
+def test_archive_rollup_and_pages(
+        mixer, user, user_client, published_category):
+    pub_date = timezone.make_aware(datetime(2021, 3, 15, 12))
+    posts = mixer.cycle(3).blend(
+        'blog.Post', author=user, category=published_category,
+        is_published=True, pub_date=pub_date)
+
+    counts = dict(MonthlyPostCount.objects.filter(
+        year=2021, month=3).values_list('scope', 'post_count'))
+    assert counts == {
+        'all': 3,
+        f'category:{published_category.pk}': 3,
+        f'author:{user.pk}': 3,
+    }, 'Убедитесь, что сводная таблица архива обновляется при публикации.'
+
+    response = user_client.get('/archive/2021/3/')
+    assert response.status_code == 200
+    assert len(response.context['page_obj']) == 3
+    assert '(3)' in response.content.decode('utf-8'), (
+        'Убедитесь, что навигация по архиву показывает число постов.'
+    )
+    for url in (
+        f'/category/{published_category.slug}/archive/2021/3/',
+        f'/profile/{user.username}/archive/2021/3/',
+        '/archive/',
+    ):
+        assert user_client.get(url).status_code == 200
+
+    posts[0].delete()
+    posts[1].is_published = False
+    posts[1].save()
+    assert MonthlyPostCount.objects.get(
+        scope='all', year=2021, month=3).post_count == 1
+
+    posts[2].delete()
+    assert not MonthlyPostCount.objects.filter(scope='all').exists()
+    assert user_client.get('/archive/2021/13/').status_code == 404
+    for url in ('/archive/0/5/', '/archive/9999/12/'):
+        assert user_client.get(url).status_code == 404, (
+            'Убедитесь, что архив за год вне календаря не найден.'
+        )
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, RequestFactory
+
+from blog.async_views import ASYNC_VARIANTS
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_variants_match_sync_views(media_root,
+                                         post_with_published_location):
+    # Копии фото готовятся сразу, а не в фоне между двумя рендерами
+    post = post_with_published_location
+    slug, username = post.category.slug, post.author.username
+    pages = (
+        ('/', {}),
+        (f'/category/{slug}/', {'category': slug}),
+        (f'/profile/{username}/', {'author': username}),
+        (f'/posts/{post.pk}/', {'pk': post.pk}),
+    )
+    for (view_class, async_class), (url, kwargs) in zip(
+        ASYNC_VARIANTS.items(), pages,
+    ):
+        async_view = async_class.as_view()
+        assert asyncio.iscoroutinefunction(async_view)
+        request = RequestFactory().get(url)
+        request.user = AnonymousUser()
+        expected = view_class.as_view()(request, **kwargs)
+        expected.render()
+        # Асинхронный вариант должен собрать страницу сам, а не из кэша
+        cache.clear()
+        request = AsyncRequestFactory().get(url)
+        request.user = AnonymousUser()
+        response = async_to_sync(async_view)(request, **kwargs)
+        assert response.status_code == expected.status_code
+        assert response.content == expected.content, (
+            'Убедитесь, что асинхронный вариант представления '
+            f'{view_class.__name__} отдаёт ту же страницу.'
+        )
@@ -0,0 +1,63 @@
+import pytest
+
+from blog.autocomplete import PrefixIndex
+
+
+def test_prefix_index():
+    index = PrefixIndex([
+        (1, 'Нижний Новгород'), (2, 'Новосибирск'), (3, 'Москва'),
+    ])
+    assert [pk for pk, _ in index.search('нов')] == [1, 2], (
+        'Убедитесь, что подсказки ищутся по началу любого слова '
+        'без учёта регистра.'
+    )
+    index.add(3, ['Новая Москва'])
+    index.remove(2)
+    assert [pk for pk, _ in index.search('НОВ')] == [3, 1]
+    assert index.search('') == []
+
+
+@pytest.mark.django_db
+def test_autocomplete_endpoint(client, django_assert_num_queries, mixer,
+                               published_category):
+    published = mixer.blend('blog.Location', name='Вулкан', is_published=True)
+    mixer.blend('blog.Location', name='Вулканово', is_published=False)
+    author = mixer.blend('auth.User', username='vulcan_fan')
+
+    response = client.get('/autocomplete/?q=вулк&kind=location')
+    assert response.json()['results'] == [{
+        'kind': 'location', 'id': published.pk,
+        'label': 'Вулкан', 'url': None,
+    }], 'Убедитесь, что снятые с публикации места не подсказываются.'
+
+    client.get('/autocomplete/?q=vulc')
+    # Только проверка версий индексов
+    with django_assert_num_queries(1):
+        response = client.get('/autocomplete/?q=vulc')
+    assert response.json()['results'] == [{
+        'kind': 'user', 'id': author.pk, 'label': 'vulcan_fan',
+        'url': '/profile/vulcan_fan/',
+    }], 'Убедитесь, что подсказки отвечают из индекса, а не из базы.'
+
+    published_category.title = 'Вулканология'
+    published_category.save()
+    published.is_published = False
+    published.save()
+    response = client.get('/autocomplete/?q=вулк')
+    assert [
+        (item['kind'], item['id']) for item in response.json()['results']
+    ] == [('category', published_category.pk)], (
+        'Убедитесь, что индекс обновляется при сохранении объектов.'
+    )
+    assert client.get('/autocomplete/?kind=post').status_code == 404
+
+
+@pytest.mark.django_db
+def test_post_form_widget(user_client, published_category, mixer):
+    mixer.cycle(5).blend('blog.Location', is_published=True)
+    content = user_client.get('/posts/create/').content.decode('utf-8')
+    assert 'data-autocomplete-url="/autocomplete/?kind=location"' in content
+    assert '<option' not in content, (
+        'Убедитесь, что форма поста не выводит все категории '
+        'и местоположения списком.'
+    )
@@ -0,0 +1,53 @@
+import pytest
+from django.core.management import call_command
+
+from blog.models import Comment, Post
+
+
+@pytest.mark.django_db
+def test_comment_count_follows_comments(
+        mixer, post_with_published_location, user):
+    post = post_with_published_location
+    comments = mixer.cycle(3).blend(Comment, post=post, author=user)
+    post.refresh_from_db()
+    assert post.comment_count == 3, (
+        'Убедитесь, что счётчик комментариев растёт при их создании.'
+    )
+
+    post.title = 'Новый заголовок'
+    post.comment_count = 0
+    post.save()
+    post.refresh_from_db()
+    assert post.comment_count == 3, (
+        'Убедитесь, что сохранение поста не затирает счётчик комментариев.'
+    )
+
+    comments[0].delete()
+    post.refresh_from_db()
+    assert post.comment_count == 2
+
+
+@pytest.mark.django_db
+def test_recount_comments_repairs_drift(
+        mixer, post_with_published_location, user):
+    post = post_with_published_location
+    mixer.cycle(2).blend(Comment, post=post, author=user)
+    Post.objects.filter(pk=post.pk).update(comment_count=10)
+
+    call_command('recount_comments', chunk_size=1)
+
+    post.refresh_from_db()
+    assert post.comment_count == 2, (
+        'Убедитесь, что команда `recount_comments` исправляет счётчики.'
+    )
+
+
+@pytest.mark.django_db
+def test_post_delete_skips_comment_counters(
+        mixer, post_with_published_location, user,
+        django_assert_max_num_queries):
+    post = post_with_published_location
+    mixer.cycle(50).blend(Comment, post=post, author=user)
+    with django_assert_max_num_queries(40):
+        post.delete()
+    assert not Comment.objects.exists()
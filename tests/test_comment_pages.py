@@ -0,0 +1,40 @@
+import re
+
+import pytest
+
+from blog.models import Comment
+
+
+@pytest.mark.django_db
+def test_comment_pages(client, mixer, settings, post_with_published_location,
+                       user):
+    settings.COMMENTS_PAGE_SIZE = 2
+    post = post_with_published_location
+    comments = mixer.cycle(5).blend(Comment, post=post, author=user)
+    # Одинаковое время создания: порядок держится на id
+    Comment.objects.filter(
+        pk__in=[comment.pk for comment in comments[1:4]]
+    ).update(created_at=comments[1].created_at)
+
+    response = client.get(f'/posts/{post.pk}/')
+    page = response.context['comments']
+    assert [comment.pk for comment in page] == [
+        comment.pk for comment in comments[:2]
+    ], 'Убедитесь, что страница поста показывает только первые комментарии.'
+    assert 'Комментарии (5)' in response.content.decode('utf-8')
+
+    seen = [comment.pk for comment in page]
+    url = f'/posts/{post.pk}/comments/?after={page.next_cursor}'
+    while url:
+        content = client.get(url).content.decode('utf-8')
+        seen += map(int, re.findall(r'name="comment_(\d+)"', content))
+        more = re.search(r'href="([^"]+)" role="button" data-comments-more',
+                         content)
+        url = more.group(1).replace('&amp;', '&') if more else None
+    assert seen == [comment.pk for comment in comments], (
+        'Убедитесь, что фрагменты догружают оставшиеся комментарии '
+        'по порядку без пропусков и повторов.'
+    )
+    assert client.get(
+        f'/posts/{post.pk}/comments/?after=broken'
+    ).status_code == 404
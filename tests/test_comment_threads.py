@@ -0,0 +1,118 @@
+import re
+
+import pytest
+from django.core.management import call_command
+
+from blog.models import Comment
+from blog.threads import path_segment
+
+
+@pytest.mark.django_db
+def test_comment_replies(user_client, user, mixer, settings,
+                         post_with_published_location,
+                         django_assert_max_num_queries):
+    settings.COMMENT_MAX_DEPTH = 2
+    post = post_with_published_location
+    first, second = mixer.cycle(2).blend(Comment, post=post, author=user)
+    for parent_id, text in (
+        (first.pk, 'Ответ'), (first.pk, 'Второй ответ'),
+    ):
+        user_client.post(f'/comments/{parent_id}/reply/', {'text': text})
+    reply = Comment.objects.get(text='Ответ')
+    user_client.post(f'/comments/{reply.pk}/reply/', {'text': 'Глубже'})
+    deep = Comment.objects.get(text='Глубже')
+    user_client.post(f'/comments/{deep.pk}/reply/', {'text': 'Ещё глубже'})
+
+    assert (reply.parent_id, reply.depth) == (first.pk, 1)
+    assert deep.path == first.path + reply.path[-10:] + path_segment(deep.pk)
+    assert Comment.objects.get(text='Ещё глубже').parent_id == reply.pk, (
+        'Убедитесь, что ответы глубже COMMENT_MAX_DEPTH прикрепляются '
+        'к родителю комментария.'
+    )
+    post.refresh_from_db()
+    assert post.comment_count == 6
+
+    settings.COMMENTS_PAGE_SIZE = 1
+    with django_assert_max_num_queries(12):
+        response = user_client.get(f'/posts/{post.pk}/')
+    roots = response.context['comments']
+    assert [comment.pk for comment in roots] == [first.pk], (
+        'Убедитесь, что страница содержит ветки целиком.'
+    )
+    assert [
+        [inner.text for inner in comment.replies]
+        for comment in roots[0].replies
+    ] == [['Глубже', 'Ещё глубже'], []]
+    content = user_client.get(
+        f'/posts/{post.pk}/comments/?after={roots.next_cursor}'
+    ).content.decode('utf-8')
+    assert f'name="comment_{second.pk}"' in content
+    assert 'data-comments-more' not in content
+
+    first.delete()
+    post.refresh_from_db()
+    assert list(Comment.objects.all()) == [second], (
+        'Убедитесь, что вместе с комментарием удаляются ответы на него.'
+    )
+    assert post.comment_count == 1
+
+
+@pytest.mark.django_db
+def test_thread_replies_are_capped(client, user, settings,
+                                   post_with_published_location):
+    settings.COMMENT_THREAD_REPLIES = 2
+    post = post_with_published_location
+    root = Comment.objects.create(post=post, author=user, text='Корень')
+    replies = [
+        Comment.objects.create(
+            post=post, author=user, text=f'Ответ {number}', parent=root,
+        )
+        for number in range(5)
+    ]
+    nested = Comment.objects.create(
+        post=post, author=user, text='Вложенный', parent=replies[3],
+    )
+
+    response = client.get(f'/posts/{post.pk}/')
+    shown = response.context['comments'][0].replies
+    assert [reply.pk for reply in shown] == [
+        reply.pk for reply in replies[:2]
+    ], 'Убедитесь, что ветка показывает не больше COMMENT_THREAD_REPLIES.'
+
+    seen = []
+    content = response.content.decode('utf-8')
+    while True:
+        more = re.search(
+            r'href="(/posts/\d+/comments/\d+/replies/[^"]+)"', content,
+        )
+        if not more:
+            break
+        content = client.get(more.group(1)).content.decode('utf-8')
+        seen += map(int, re.findall(r'name="comment_(\d+)"', content))
+    assert seen == [
+        *(reply.pk for reply in replies[2:4]), nested.pk, replies[4].pk,
+    ], (
+        'Убедитесь, что остальные ответы ветки догружаются по порядку '
+        'без пропусков и повторов.'
+    )
+    assert client.get(
+        f'/posts/{post.pk}/comments/{root.pk}/replies/?after=broken'
+    ).status_code == 404
+
+
+@pytest.mark.django_db
+def test_import_remaps_comment_paths(tmp_path, comment_to_a_post, user):
+    Comment.objects.create(
+        text='Ответ', post=comment_to_a_post.post, author=user,
+        parent=comment_to_a_post,
+    )
+    dump = tmp_path / 'blog.jsonl'
+    call_command('export_blog', str(dump))
+    call_command('import_blog', str(dump))
+    copy = Comment.objects.exclude(
+        post=comment_to_a_post.post,
+    ).select_related('parent').get(text='Ответ')
+    assert copy.path == copy.parent.path + path_segment(copy.pk), (
+        'Убедитесь, что при загрузке пути веток пересчитываются '
+        'под новые id.'
+    )
@@ -0,0 +1,94 @@
+from http import HTTPStatus
+
+import pytest
+from django.utils import timezone
+
+from blog.models import Comment
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    'url', ('/', '/category/{slug}/', '/profile/{username}/'),
+)
+def test_listing_not_modified(client, post_with_published_location, url):
+    post = post_with_published_location
+    url = url.format(slug=post.category.slug, username=post.author.username)
+    response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert response.has_header('ETag') and response.has_header(
+        'Last-Modified'
+    ), 'Убедитесь, что страница-список отдаёт заголовки ETag и Last-Modified.'
+
+    not_modified = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED, (
+        'Убедитесь, что неизменившаяся страница отдаётся с кодом 304.'
+    )
+    assert not not_modified.content
+
+    post.title = 'Новый заголовок'
+    post.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == HTTPStatus.OK, (
+        'Убедитесь, что после изменения поста ETag страницы меняется.'
+    )
+
+
+@pytest.mark.django_db
+def test_post_detail_not_modified(user_client, post_with_published_location):
+    post = post_with_published_location
+    url = f'/posts/{post.pk}/'
+    # Первый ответ выставляет CSRF-куку, которая входит в ETag
+    user_client.get(url)
+    etag = user_client.get(url)['ETag']
+    assert user_client.get(
+        url, HTTP_IF_NONE_MATCH=etag
+    ).status_code == HTTPStatus.NOT_MODIFIED
+
+    Comment.objects.create(
+        post=post, author=post.author, text='Новый комментарий',
+    )
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK, (
+        'Убедитесь, что новый комментарий меняет ETag страницы поста.'
+    )
+    assert 'Новый комментарий' in response.content.decode('utf-8')
+
+
+@pytest.mark.django_db
+def test_listing_state_is_one_query(client, django_assert_num_queries,
+                                    post_with_published_location):
+    etag = client.get('/')['ETag']
+    with django_assert_num_queries(1):
+        response = client.get('/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+        'Убедитесь, что ETag списка строится по версиям разделов, '
+        'без агрегирующего запроса по постам.'
+    )
+    with django_assert_num_queries(1):
+        assert client.get('/')['X-Page-Cache'] == 'HIT'
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('url', (
+    '/', '/category/{slug}/', '/posts/{pk}/', '/archive/{year}/{month}/',
+))
+def test_author_rename_changes_pages(client, post_with_published_location,
+                                     url):
+    post = post_with_published_location
+    pub_date = timezone.localtime(post.pub_date)
+    url = url.format(
+        slug=post.category.slug, pk=post.pk,
+        year=pub_date.year, month=pub_date.month,
+    )
+    etag = client.get(url).get('ETag', '')
+    post.author.username = 'renamed_author'
+    post.author.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK, (
+        'Убедитесь, что после смены имени автора ETag страниц '
+        'с его постами меняется.'
+    )
+    assert '@renamed_author' in response.content.decode(), (
+        'Убедитесь, что страница после смены имени автора не берётся '
+        'из кэша.'
+    )
@@ -0,0 +1,56 @@
+from http import HTTPStatus
+
+import pytest
+
+from blog.models import Post
+from blog.pagination import encode_cursor
+from conftest import N_PER_PAGE
+
+
+@pytest.mark.django_db
+def test_cursor_pagination(user_client, many_posts_with_published_locations):
+    first_page = user_client.get('/').context['page_obj']
+    first_ids = [post.id for post in first_page]
+    assert len(first_ids) == N_PER_PAGE
+
+    after = encode_cursor(first_page[len(first_page) - 1])
+    response = user_client.get(f'/?after={after}')
+    assert response.status_code == HTTPStatus.OK
+    second_page = response.context['page_obj']
+    second_ids = [post.id for post in second_page]
+    assert len(second_ids) == N_PER_PAGE
+    assert not set(first_ids) & set(second_ids), (
+        'Убедитесь, что курсорная страница продолжает ленту без повторов.'
+    )
+    pub_dates = [post.pub_date for post in second_page]
+    assert pub_dates == sorted(pub_dates, reverse=True)
+
+    before = second_page.previous_cursor
+    response = user_client.get(f'/?before={before}')
+    assert [post.id for post in response.context['page_obj']] == first_ids
+
+
+@pytest.mark.django_db
+def test_cursor_pagination_bad_token(user_client):
+    response = user_client.get('/?after=not-a-cursor')
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_stale_cached_count(mixer, user_client, user, published_category):
+    posts = mixer.cycle(N_PER_PAGE * 10).blend(
+        'blog.Post', author=user, category=published_category,
+        location=None,
+    )
+    assert user_client.get('/?page=6').status_code == HTTPStatus.OK
+    Post.objects.filter(
+        pk__in=[post.pk for post in posts[:N_PER_PAGE * 7]],
+    ).update(is_published=False, is_visible=False)
+    response = user_client.get('/?page=6')
+    assert response.status_code == HTTPStatus.NOT_FOUND, (
+        'Убедитесь, что страница за концом ленты при устаревшем '
+        'закэшированном числе постов отвечает 404, а не ошибкой.'
+    )
+    response = user_client.get('/?page=3')
+    assert response.status_code == HTTPStatus.OK
+    assert not response.context['page_obj'].has_next()
@@ -0,0 +1,135 @@
+from datetime import timedelta
+
+import pytest
+from django.http import QueryDict
+from django.utils import timezone
+
+from blog.facets import FacetFilters, FacetIndex
+
+
+@pytest.mark.django_db
+def test_facet_filter(client, django_assert_max_num_queries, mixer, user,
+                      another_user, published_category, published_locations):
+    now = timezone.now()
+    first, second = published_locations[:2]
+    recent = mixer.cycle(3).blend(
+        'blog.Post', author=user, category=published_category,
+        location=first, pub_date=now - timedelta(days=1),
+    )
+    old = mixer.blend(
+        'blog.Post', author=another_user, category=published_category,
+        location=second, pub_date=now - timedelta(days=100),
+    )
+
+    response = client.get(f'/filter/?location={first.pk}&days=30')
+    ids = {post.pk for post in response.context['page_obj']}
+    assert ids == {post.pk for post in recent}, (
+        'Убедитесь, что фильтры по месту и дате сочетаются.'
+    )
+    facets = dict(response.context['facets'])
+    counts = {label: count for label, count, _, _ in facets['Места']}
+    assert counts == {first.name: 3}, (
+        'Убедитесь, что счётчик фасета учитывает остальные фильтры.'
+    )
+    authors = {label: count for label, count, _, _ in facets['Авторы']}
+    assert authors == {user.username: 3}
+
+    with django_assert_max_num_queries(7):
+        response = client.get(f'/filter/?author={another_user.pk}')
+    assert [post.pk for post in response.context['page_obj']] == [old.pk]
+
+
+@pytest.mark.django_db
+def test_facet_index_follows_changes(
+        client, post_with_published_location, another_user):
+    post = post_with_published_location
+    url = f'/filter/?author={another_user.pk}'
+    assert not client.get(url).context['page_obj']
+    post.author = another_user
+    post.save()
+    assert [p.pk for p in client.get(url).context['page_obj']] == [post.pk], (
+        'Убедитесь, что индекс фасетов обновляется после изменения поста.'
+    )
+
+
+@pytest.mark.django_db
+def test_facet_index_is_updated_in_place(
+        client, monkeypatch, mixer, user, published_category,
+        published_locations):
+    first, second = mixer.cycle(2).blend(
+        'blog.Post', author=user, category=published_category,
+        location=published_locations[0],
+    )
+    client.get('/filter/')
+
+    def rebuild():
+        raise AssertionError(
+            'Убедитесь, что после изменения поста индекс фасетов '
+            'дополняется, а не строится заново.'
+        )
+
+    monkeypatch.setattr(FacetIndex, 'build', staticmethod(rebuild))
+    first.location = published_locations[1]
+    first.save()
+    second.delete()
+    location = published_locations[0]
+    location.is_published = False
+    location.save()
+    response = client.get('/filter/')
+    assert [post.pk for post in response.context['page_obj']] == [first.pk]
+    counts = {
+        label: count
+        for label, count, _, _ in dict(response.context['facets'])['Места']
+    }
+    assert counts == {published_locations[1].name: 1}
+    response = client.get(f'/filter/?location={location.pk}')
+    assert not response.context['page_obj'], (
+        'Убедитесь, что снятое с публикации место не фильтрует посты.'
+    )
+
+
+def test_facet_index_date_range():
+    now = timezone.now()
+    rows = [
+        FacetIndex.row(pk, now - timedelta(days=pk), 1, None, 1)
+        for pk in range(1, 21)
+    ]
+    index = FacetIndex(rows)
+    filters = FacetFilters(QueryDict('days=5'))
+    selected = index.select(filters)
+    assert index.ids_at(selected, 0, 100) == [1, 2, 3, 4]
+    assert index.ids_at(index.select(FacetFilters(QueryDict(''))), 15, 3) == [
+        16, 17, 18,
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('query', (
+    'days=1000000', 'date_to=9999-12-31', 'date_from=0001-01-01',
+))
+def test_facet_filter_out_of_range_dates(client, query):
+    response = client.get(f'/filter/?{query}')
+    assert response.status_code == 200, (
+        'Убедитесь, что дата за пределами календаря не ломает фильтр.'
+    )
+    filters = response.context['filters']
+    assert filters.start is None and filters.end is None
+
+
+@pytest.mark.django_db
+def test_facet_index_keeps_feed_order(client, mixer, user, published_category):
+    now = timezone.now()
+    posts = [
+        mixer.blend(
+            'blog.Post', author=user, category=published_category,
+            location=None, pub_date=now - timedelta(days=days),
+        )
+        for days in (1, 2, 3)
+    ]
+    client.get('/filter/')
+    posts[2].pub_date = now
+    posts[2].save()
+    response = client.get('/filter/')
+    assert [post.pk for post in response.context['page_obj']] == [
+        posts[2].pk, posts[0].pk, posts[1].pk,
+    ], 'Убедитесь, что изменённые посты встают на своё место в ленте.'
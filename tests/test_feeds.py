@@ -0,0 +1,94 @@
+from http import HTTPStatus
+
+import pytest
+from django.db.models import F
+
+from blog.models import Comment, Post
+
+
+@pytest.fixture(autouse=True)
+def feed_root(settings, tmp_path):
+    settings.FEED_ROOT = tmp_path
+    return tmp_path
+
+
+def read(response):
+    return b''.join(response.streaming_content).decode('utf-8')
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('feed_format', ('rss', 'atom'))
+def test_feeds(client, post_with_published_location, feed_format):
+    post = post_with_published_location
+    for url in (
+        f'/feed/{feed_format}/',
+        f'/category/{post.category.slug}/feed/{feed_format}/',
+        f'/profile/{post.author.username}/feed/{feed_format}/',
+    ):
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f'Убедитесь, что лента `{url}` доступна.'
+        )
+        assert response.streaming, 'Убедитесь, что лента отдаётся потоком.'
+        assert post.title in read(response)
+
+
+@pytest.mark.django_db
+def test_feed_is_built_once_per_change(
+        client, django_assert_num_queries, feed_root,
+        post_with_published_location, future_posts,
+):
+    post = post_with_published_location
+    response = client.get('/feed/rss/')
+    content = read(response)
+    for future_post in future_posts:
+        assert future_post.title not in content, (
+            'Убедитесь, что в ленту попадают только опубликованные посты.'
+        )
+    with django_assert_num_queries(1):
+        repeated = client.get('/feed/rss/')
+        assert read(repeated) == content, (
+            'Убедитесь, что повторный запрос ленты читает из базы '
+            'только её версию.'
+        )
+    assert client.get(
+        '/feed/rss/', HTTP_IF_NONE_MATCH=response['ETag'],
+    ).status_code == HTTPStatus.NOT_MODIFIED
+
+    Comment.objects.create(post=post, author=post.author, text='Комментарий')
+    assert client.get(
+        '/feed/rss/', HTTP_IF_NONE_MATCH=response['ETag'],
+    ).status_code == HTTPStatus.NOT_MODIFIED, (
+        'Убедитесь, что новый комментарий не пересобирает ленту.'
+    )
+
+    post.title = 'Новый заголовок'
+    post.save()
+    content = read(client.get('/feed/rss/'))
+    assert 'Новый заголовок' in content, (
+        'Убедитесь, что лента пересобирается после изменения поста.'
+    )
+    assert len(list(feed_root.glob('*.xml'))) == 1, (
+        'Убедитесь, что устаревшие файлы ленты удаляются.'
+    )
+    Post.objects.update(title=F('text'))
+    assert 'Новый заголовок' in read(client.get('/feed/rss/'))
+
+
+@pytest.mark.django_db
+def test_feed_unknown_format(client, post_with_published_location):
+    assert client.get('/feed/json/').status_code == HTTPStatus.NOT_FOUND
+    assert client.get(
+        '/category/no-such-category/feed/rss/'
+    ).status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_feed_self_link_ignores_query(client, post_with_published_location):
+    read(client.get('/feed/atom/?utm_source=mail'))
+    content = read(client.get('/feed/atom/'))
+    assert 'utm_source' not in content, (
+        'Убедитесь, что ссылка ленты на саму себя не содержит строку '
+        'запроса первого читателя.'
+    )
+    assert 'href="http://testserver/feed/atom/"' in content
@@ -0,0 +1,62 @@
+from io import StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+
+from blog.models import Post
+from conftest import image_bytes
+
+
+@pytest.fixture
+def post(settings, media_root, post_with_published_location):
+    settings.POST_IMAGE_FORMATS = ()
+    return post_with_published_location
+
+
+@pytest.mark.django_db
+def test_image_meta_at_upload(user_client, post, media_root,
+                              django_capture_on_commit_callbacks):
+    # Повёрнутое фото 300x200 показывается как 200x300
+    with django_capture_on_commit_callbacks():
+        post.image.save('photo.jpg', ContentFile(
+            image_bytes((300, 200), color=(200, 30, 30), orientation=6)
+        ))
+    post.refresh_from_db()
+    meta = post.image_meta
+    assert (meta['width'], meta['height'], meta['format']) == (
+        200, 300, 'JPEG',
+    ), 'Убедитесь, что размеры фото сохраняются при загрузке.'
+    assert meta['size'] == post.image.size
+
+    # Страницам не нужен файл фото, чтобы вывести его размеры
+    (media_root / post.image.name).unlink()
+    for url in ('/', f'/posts/{post.pk}/'):
+        content = user_client.get(url).content.decode()
+        assert 'width="200" height="300"' in content, (
+            'Убедитесь, что у фото в ленте и на странице поста '
+            'указаны размеры.'
+        )
+
+
+@pytest.mark.django_db
+def test_image_placeholder(user_client, post,
+                           django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        post.image.save('photo.jpg', ContentFile(
+            image_bytes((400, 200), color=(0, 128, 255))
+        ))
+    post.refresh_from_db()
+    placeholder = post.image_meta['placeholder']
+    content = user_client.get(f'/posts/{post.pk}/').content.decode()
+    assert f'background-color: {placeholder}' in content, (
+        'Убедитесь, что у фото есть цвет-заглушка.'
+    )
+
+    Post.objects.filter(pk=post.pk).update(image_meta={})
+    call_command('fill_image_meta', stdout=StringIO())
+    post.refresh_from_db()
+    assert post.image_meta['placeholder'] == placeholder, (
+        'Убедитесь, что fill_image_meta заполняет сведения о старых фото.'
+    )
+    assert post.image_meta['width'] == 400
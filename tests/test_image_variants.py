@@ -0,0 +1,63 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from PIL import Image
+
+from blog.imaging import render_renditions, variant_formats
+
+
+@pytest.fixture
+def photo(tmp_path, settings):
+    settings.MEDIA_ROOT = tmp_path
+    size = (800, 400)
+    image = Image.merge('RGB', (
+        Image.effect_mandelbrot(size, (-2, -1, 1, 1), 100),
+        Image.linear_gradient('L').resize(size),
+        Image.effect_noise(size, 40),
+    ))
+    image.save(tmp_path / 'photo.jpg', 'JPEG', quality=95)
+    return tmp_path / 'photo.jpg'
+
+
+def test_variants(photo):
+    formats = variant_formats(('AVIF', 'WEBP'))
+    assert 'WEBP' in formats
+    result = render_renditions(str(photo), 'photo.jpg', (320,), formats)
+    assert result['formats'] == formats
+    for name in ('photo.jpg.webp', 'photo.320w.jpg.webp'):
+        variant = photo.parent / name
+        assert variant.stat().st_size < (
+            photo.parent / name[:-len('.webp')]
+        ).stat().st_size, (
+            'Убедитесь, что вариант WebP меньше исходного файла.'
+        )
+        with Image.open(variant) as image:
+            assert image.format == 'WEBP'
+            assert not image.getexif()
+
+
+@pytest.mark.django_db
+def test_media_negotiation(client, photo):
+    render_renditions(str(photo), 'photo.jpg', (), ('WEBP',))
+    response = client.get('/photo.jpg', HTTP_ACCEPT='image/webp,*/*')
+    assert response['Content-Type'] == 'image/webp', (
+        'Убедитесь, что браузеру, который принимает WebP, '
+        'отдаётся вариант WebP.'
+    )
+    assert 'Accept' in response['Vary'], (
+        'Убедитесь, что ответ с фото содержит заголовок Vary: Accept.'
+    )
+    response = client.get('/photo.jpg', HTTP_ACCEPT='image/png,*/*')
+    assert response['Content-Type'] == 'image/jpeg'
+    assert 'Accept' in response['Vary']
+
+    out = StringIO()
+    call_command('image_savings', '--json', stdout=out)
+    report = json.loads(out.getvalue())
+    assert report['files'] == report['webp_files'] == 1
+    assert report['saved_bytes'] == (
+        photo.stat().st_size
+        - (photo.parent / 'photo.jpg.webp').stat().st_size
+    ), 'Убедитесь, что отчёт считает сэкономленные байты.'
@@ -0,0 +1,53 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+def test_anonymous_page_cache(
+        unlogged_client, user_client, post_with_published_location):
+    post = post_with_published_location
+    response = unlogged_client.get('/')
+    assert response['X-Page-Cache'] == 'MISS'
+    response = unlogged_client.get('/')
+    assert response['X-Page-Cache'] == 'HIT', (
+        'Убедитесь, что главная страница для анонимов берётся из кэша.'
+    )
+
+    post.title = 'Обновлённый заголовок'
+    post.save()
+    response = unlogged_client.get('/')
+    assert response['X-Page-Cache'] == 'MISS', (
+        'Убедитесь, что сохранение поста сбрасывает кэш ленты.'
+    )
+    assert 'Обновлённый заголовок' in response.content.decode('utf-8')
+
+    category_url = f'/category/{post.category.slug}/'
+    unlogged_client.get(category_url)
+    assert unlogged_client.get(category_url)['X-Page-Cache'] == 'HIT'
+
+    assert 'X-Page-Cache' not in user_client.get('/'), (
+        'Убедитесь, что страницы авторизованных пользователей не кэшируются.'
+    )
+
+
+@pytest.mark.django_db
+def test_static_pages_cached(unlogged_client):
+    unlogged_client.get('/pages/about/')
+    assert unlogged_client.get('/pages/about/')['X-Page-Cache'] == 'HIT'
+
+
+@pytest.mark.django_db
+def test_page_cache_stats_lists_all_pages(unlogged_client):
+    unlogged_client.get('/archive/')
+    out = StringIO()
+    call_command('page_cache_stats', stdout=out)
+    rows = dict(
+        line.split(maxsplit=1) for line in out.getvalue().splitlines()
+    )
+    assert {'archive', 'filter', 'static_page'} <= set(rows), (
+        'Убедитесь, что `page_cache_stats` показывает все страницы '
+        'с кэшем для анонимов.'
+    )
+    assert 'промахов: 1 ' in rows['archive']
@@ -0,0 +1,26 @@
+import pytest
+
+from blog.models import Post
+from blog.pagination import CachedCountPaginator, WindowedPaginator
+
+
+def test_windowed_page_range():
+    paginator = WindowedPaginator(range(50000 * 10), 10)
+    window = list(paginator.page(25000).page_window())
+    assert len(window) <= 2 * paginator.window + 3, (
+        'Убедитесь, что пагинатор выводит только окно страниц '
+        'вокруг текущей.'
+    )
+    assert 25000 in window
+
+
+@pytest.mark.django_db
+def test_cached_count(mixer, many_posts_with_published_locations):
+    queryset = Post.objects.filter(is_visible=True).order_by('-pub_date')
+    total = queryset.count()
+    assert CachedCountPaginator(queryset, 10).count == total
+
+    mixer.blend('blog.Post', category=Post.objects.first().category)
+    assert CachedCountPaginator(queryset, 10).count == total, (
+        'Убедитесь, что пагинатор берёт количество постов из кэша.'
+    )
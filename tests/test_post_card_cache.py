@@ -0,0 +1,37 @@
+import pytest
+from django.test import Client
+
+from blog.models import Post
+
+
+@pytest.mark.django_db
+def test_post_card_fragment_cache(user_client, post_with_published_location):
+    post = post_with_published_location
+    content = user_client.get('/').content.decode('utf-8')
+    assert post.title in content
+
+    Post.objects.filter(pk=post.pk).update(title='Изменено в обход save')
+    content = user_client.get('/').content.decode('utf-8')
+    assert post.title in content, (
+        'Убедитесь, что карточки постов в ленте берутся из кэша.'
+    )
+
+    post.category.title = 'Новое название категории'
+    post.category.save()
+    content = user_client.get('/').content.decode('utf-8')
+    assert 'Изменено в обход save' in content, (
+        'Убедитесь, что изменение категории сбрасывает кэш карточек.'
+    )
+    assert 'Новое название категории' in content
+
+
+@pytest.mark.django_db
+def test_login_keeps_post_cards(user_client, post_with_published_location):
+    post = post_with_published_location
+    user_client.get('/')
+    Post.objects.filter(pk=post.pk).update(title='Изменено в обход save')
+    Client().force_login(post.author)
+    content = user_client.get('/').content.decode('utf-8')
+    assert post.title in content, (
+        'Убедитесь, что вход автора не сбрасывает кэш его карточек.'
+    )
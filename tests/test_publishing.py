@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from blog.publishing import publish_due_posts, scheduled_posts
+
+
+@pytest.mark.django_db
+def test_scheduled_post_is_published_by_publisher(
+        user_client, mixer, user, published_category):
+    pub_date = timezone.now() + timedelta(hours=1)
+    post = mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        is_published=True, pub_date=pub_date)
+    assert not post.is_visible
+    assert list(scheduled_posts()) == [post], (
+        'Убедитесь, что отложенный пост попадает в список '
+        'запланированных публикаций.'
+    )
+
+    assert publish_due_posts() == 0
+    assert publish_due_posts(now=pub_date) == 1
+    post.refresh_from_db()
+    assert post.is_visible, (
+        'Убедитесь, что публикатор показывает пост, когда наступает '
+        'время его публикации.'
+    )
+    assert not scheduled_posts(now=pub_date).exists()
+
+
+@pytest.mark.django_db
+def test_unpublished_category_hides_posts(post_with_published_location):
+    post = post_with_published_location
+    assert post.is_visible
+
+    category = post.category
+    category.is_published = False
+    category.save()
+    post.refresh_from_db()
+    assert not post.is_visible, (
+        'Убедитесь, что снятие категории с публикации скрывает её посты.'
+    )
+
+    category.is_published = True
+    category.save()
+    post.refresh_from_db()
+    assert post.is_visible
@@ -0,0 +1,13 @@
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+def test_listing_queries_use_indexes(user, post_with_published_location):
+    try:
+        call_command('check_query_plans')
+    except Exception as e:
+        raise AssertionError(
+            'Убедитесь, что запросы страниц-списков используют индексы. '
+            f'Команда `check_query_plans` завершилась с ошибкой:\n{e}'
+        )
@@ -0,0 +1,64 @@
+from io import StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from PIL import Image
+
+from blog.imaging import render_renditions
+from blog.models import Post
+from conftest import image_bytes
+
+
+def test_render_renditions(tmp_path):
+    path = tmp_path / 'photo.jpg'
+    # Повёрнутое фото: после поворота 600x1000
+    path.write_bytes(image_bytes((1000, 600), orientation=6))
+    result = render_renditions(str(path), 'photo.jpg', (320, 640, 1280))
+    assert result['renditions'] == [(320, 'photo.320w.jpg')], (
+        'Убедитесь, что копии шире фото с учётом поворота не создаются.'
+    )
+    with Image.open(tmp_path / 'photo.320w.jpg') as image:
+        assert image.size == (320, 533)
+        assert not image.getexif(), (
+            'Убедитесь, что копии сохраняются без метаданных.'
+        )
+
+
+@pytest.mark.django_db
+def test_post_image_srcset(user_client, settings, media_root,
+                           post_with_published_location,
+                           django_capture_on_commit_callbacks):
+    settings.POST_IMAGE_FORMATS = ()
+    post = post_with_published_location
+    with django_capture_on_commit_callbacks(execute=True):
+        post.image.save('photo.jpg', ContentFile(image_bytes((1000, 500))))
+    post.refresh_from_db()
+    stem = post.image.name[:-len('.jpg')]
+    assert post.image_meta['renditions'] == [
+        [320, f'{stem}.320w.jpg'], [640, f'{stem}.640w.jpg'],
+    ]
+
+    content = user_client.get('/').content.decode()
+    assert (
+        f'srcset="/{stem}.320w.jpg 320w, /{stem}.640w.jpg 640w"' in content
+    ), 'Убедитесь, что в ленте у фото есть srcset из уменьшенных копий.'
+    assert f'src="/{stem}.320w.jpg"' in content, (
+        'Убедитесь, что в ленте показывается уменьшенная копия фото.'
+    )
+    content = user_client.get(f'/posts/{post.pk}/').content.decode()
+    assert f'href="/{post.image.name}"' in content
+    assert (
+        f'srcset="/{stem}.320w.jpg 320w, /{stem}.640w.jpg 640w, '
+        f'/{post.image.name} 1000w"' in content
+    ), (
+        'Убедитесь, что на странице поста srcset заканчивается '
+        'оригиналом фото.'
+    )
+
+    Post.objects.filter(pk=post.pk).update(image_meta={})
+    (media_root / f'{stem}.640w.jpg').unlink()
+    call_command('build_renditions', stdout=StringIO())
+    assert (media_root / f'{stem}.640w.jpg').exists(), (
+        'Убедитесь, что команда build_renditions создаёт недостающие копии.'
+    )
@@ -0,0 +1,121 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve
+
+from blog.cache import page_cache_key
+from blog.replica import (
+    REPLICA_ALIAS, STICKY_COOKIE, ReplicaMiddleware, ReplicaRouter,
+    refresh_snapshot, snapshot_time,
+)
+
+
+def test_refresh_snapshot(tmp_path):
+    source, target = tmp_path / 'db.sqlite3', tmp_path / 'replica.sqlite3'
+    with closing(sqlite3.connect(source)) as connection:
+        connection.execute('CREATE TABLE post (title TEXT)')
+        connection.execute("INSERT INTO post VALUES ('Первый')")
+        connection.commit()
+    started = refresh_snapshot(source, target)
+    with closing(sqlite3.connect(target)) as connection:
+        rows = connection.execute('SELECT title FROM post').fetchall()
+    assert rows == [('Первый',)], (
+        'Убедитесь, что снимок содержит данные основной базы.'
+    )
+    assert snapshot_time(target) == pytest.approx(started, abs=1e-3), (
+        'Убедитесь, что время снимка — время начала копирования.'
+    )
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        'db.sqlite3', 'replica.sqlite3',
+    ], (
+        'Убедитесь, что временный файл снимка не остаётся на диске.'
+    )
+
+
+@pytest.fixture
+def replica(tmp_path, settings):
+    path = tmp_path / 'replica.sqlite3'
+    path.touch()
+    settings.REPLICA_PATH = path
+    settings.REPLICA_MAX_LAG = 30
+    return path
+
+
+def route(path, method='get', cookies=None):
+    request = getattr(RequestFactory(), method)(path)
+    request.user = AnonymousUser()
+    request.COOKIES.update(cookies or {})
+    request.resolver_match = match = resolve(path)
+    middleware = ReplicaMiddleware(lambda request: HttpResponse())
+    middleware.process_request(request)
+    middleware.process_view(request, match.func, match.args, match.kwargs)
+    alias = ReplicaRouter().db_for_read(None)
+    key = page_cache_key('index', ['версия'], request)
+    response = middleware.process_response(request, HttpResponse())
+    return alias, key, response
+
+
+def test_fresh_snapshot_serves_reads(replica):
+    alias, key, response = route('/')
+    assert alias == REPLICA_ALIAS, (
+        'Убедитесь, что свежий снимок обслуживает чтение ленты.'
+    )
+    assert key == page_cache_key(
+        'index', ['версия'], RequestFactory().get('/'),
+    ), (
+        'Убедитесь, что ключ кэша страниц зависит от версий разделов, '
+        'а не от того, какой снимок их прочитал.'
+    )
+    assert STICKY_COOKIE not in response.cookies
+    assert ReplicaRouter().db_for_read(None) is None, (
+        'Убедитесь, что выбор снимка не переживает запрос.'
+    )
+
+
+@pytest.mark.parametrize('path, method, written', (
+    ('/', 'get', 5),
+    ('/', 'post', None),
+    ('/posts/create/', 'get', None),
+))
+def test_primary_serves_reads(replica, path, method, written):
+    cookies = {}
+    if written is not None:
+        # Запись позже снимка
+        cookies[STICKY_COOKIE] = f'{time.time() + written:.3f}'
+    alias, _, _ = route(path, method, cookies)
+    assert alias is None, (
+        'Убедитесь, что после своей записи, при записи и на страницах '
+        'вне REPLICA_VIEWS запрос читает основную базу.'
+    )
+
+
+def test_stale_snapshot_is_skipped(replica):
+    stale = time.time() - 60
+    os.utime(replica, (stale, stale))
+    alias, _, _ = route('/')
+    assert alias is None, (
+        'Убедитесь, что снимок старше REPLICA_MAX_LAG не читается.'
+    )
+
+
+def test_write_pins_user_and_primary(replica):
+    request = RequestFactory().get('/')
+    request.resolver_match = resolve('/')
+    middleware = ReplicaMiddleware(lambda request: HttpResponse())
+    middleware.process_view(request, None, (), {})
+    assert ReplicaRouter().db_for_write(None) == 'default'
+    assert ReplicaRouter().db_for_read(None) is None, (
+        'Убедитесь, что после записи запрос читает основную базу.'
+    )
+    before = time.time()
+    _, _, response = route('/posts/1/comment/', 'post')
+    written = float(response.cookies[STICKY_COOKIE].value)
+    assert before - 0.001 <= written <= time.time() + 0.001, (
+        'Убедитесь, что запись ставит cookie со временем записи.'
+    )
@@ -0,0 +1,60 @@
+from http import HTTPStatus
+
+import pytest
+
+from blog.models import Post
+
+
+@pytest.mark.django_db
+def test_search(client, post_with_published_location, future_posts):
+    post = post_with_published_location
+    post.title = 'Прогулка по набережной'
+    post.text = 'Вечером <b>ветер</b> стих, и мы гуляли до полуночи.'
+    post.save()
+    hidden = future_posts[0]
+    hidden.title = 'Прогулка в будущем'
+    hidden.save()
+
+    response = client.get('/search/?q=прогул')
+    assert response.status_code == HTTPStatus.OK
+    results = list(response.context['page_obj'])
+    assert [result.pk for result in results] == [post.pk], (
+        'Убедитесь, что поиск находит посты по префиксу слова '
+        'и не показывает скрытые публикации.'
+    )
+    content = response.content.decode('utf-8')
+    assert '<mark>Прогулка</mark>' in content, (
+        'Убедитесь, что совпадения подсвечиваются в результатах поиска.'
+    )
+
+    response = client.get('/search/?q=ветер')
+    content = response.content.decode('utf-8')
+    assert '&lt;b&gt;<mark>ветер</mark>&lt;/b&gt;' in content, (
+        'Убедитесь, что текст поста в сниппете экранируется.'
+    )
+
+    post.delete()
+    assert not client.get('/search/?q=прогул').context['page_obj'], (
+        'Убедитесь, что поисковый индекс обновляется при удалении поста.'
+    )
+
+
+@pytest.mark.django_db
+def test_search_ranks_title_matches_first(
+        client, many_posts_with_published_locations):
+    in_text, in_title = many_posts_with_published_locations[:2]
+    Post.objects.filter(pk=in_text.pk).update(text='Пишу про вулкан.')
+    Post.objects.filter(pk=in_title.pk).update(title='Вулкан')
+    response = client.get('/search/?q=вулкан')
+    assert [post.pk for post in response.context['page_obj']] == [
+        in_title.pk, in_text.pk,
+    ], 'Убедитесь, что совпадения в заголовке ранжируются выше.'
+
+
+@pytest.mark.django_db
+def test_search_query_syntax(client):
+    for query in ('"', 'NEAR(', '*', 'a OR', ''):
+        response = client.get('/search/', {'q': query})
+        assert response.status_code == HTTPStatus.OK, (
+            'Убедитесь, что спецсимволы FTS5 в запросе не ломают поиск.'
+        )
@@ -0,0 +1,70 @@
+import gzip
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+
+from blog.models import Post
+from blog.sitemaps import build_sitemaps
+
+
+@pytest.fixture(autouse=True)
+def sitemap_root(settings, tmp_path):
+    settings.SITEMAP_ROOT = tmp_path
+    settings.SITEMAP_SHARD_SIZE = 5
+    return tmp_path
+
+
+def read_shard(client, name):
+    response = client.get(f'/sitemaps/{name}')
+    assert response.status_code == HTTPStatus.OK
+    return gzip.decompress(b''.join(response.streaming_content)).decode()
+
+
+@pytest.mark.django_db
+def test_sitemaps(client, django_assert_num_queries,
+                  many_posts_with_published_locations, future_posts):
+    call_command('build_sitemaps', base_url='https://example.com')
+    with django_assert_num_queries(0):
+        response = client.get('/sitemap.xml')
+        index = b''.join(response.streaming_content).decode()
+    assert response.status_code == HTTPStatus.OK
+
+    post = many_posts_with_published_locations[0]
+    shard = f'sitemap-posts-{(post.pk - 1) // 5:05}.xml.gz'
+    assert f'https://example.com/sitemaps/{shard}' in index, (
+        'Убедитесь, что индекс sitemap ссылается на шарды с постами.'
+    )
+    content = read_shard(client, shard)
+    assert f'https://example.com/posts/{post.pk}/' in content
+    for future_post in future_posts:
+        future_shard = f'sitemap-posts-{(future_post.pk - 1) // 5:05}.xml.gz'
+        if future_shard in index:
+            assert f'/posts/{future_post.pk}/' not in read_shard(
+                client, future_shard
+            ), 'Убедитесь, что в sitemap попадают только видимые посты.'
+
+
+@pytest.mark.django_db
+def test_sitemaps_rebuild_changed_shards(many_posts_with_published_locations):
+    written, removed = build_sitemaps('https://example.com')
+    assert len(written) > 2 and not removed
+    assert build_sitemaps('https://example.com') == ([], []), (
+        'Убедитесь, что неизменившиеся шарды не пересобираются.'
+    )
+
+    post = Post.objects.filter(is_visible=True).order_by('pk').first()
+    post.title = 'Новый заголовок'
+    post.save()
+    written, removed = build_sitemaps('https://example.com')
+    assert written == [f'sitemap-posts-{(post.pk - 1) // 5:05}.xml.gz'], (
+        'Убедитесь, что пересобирается только шард изменённого поста.'
+    )
+
+
+@pytest.mark.django_db
+def test_sitemap_unknown_file(client):
+    assert client.get('/sitemap.xml').status_code == HTTPStatus.NOT_FOUND
+    assert client.get(
+        '/sitemaps/manifest.json'
+    ).status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,64 @@
+import sqlite3
+from contextlib import closing
+
+import pytest
+from django.db import connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+
+from blog.replica import REPLICA_ALIAS
+
+pytestmark = pytest.mark.django_db
+
+
+def connect(path, alias, read_only=False):
+    settings_dict = dict(
+        connections['default'].settings_dict,
+        NAME=f'file:{path}?mode=ro' if read_only else str(path),
+    )
+    wrapper = DatabaseWrapper(settings_dict, alias)
+    wrapper.ensure_connection()
+    return wrapper
+
+
+def pragma(wrapper, name):
+    with wrapper.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+def test_connection_pragmas(tmp_path):
+    wrapper = connect(tmp_path / 'db.sqlite3', 'default')
+    try:
+        assert pragma(wrapper, 'journal_mode') == 'wal', (
+            'Убедитесь, что база SQLite работает в режиме WAL.'
+        )
+        assert pragma(wrapper, 'synchronous') == 1
+        assert pragma(wrapper, 'busy_timeout') == 5000, (
+            'Убедитесь, что соединение ждёт блокировку, а не падает.'
+        )
+        assert pragma(wrapper, 'temp_store') == 2
+    finally:
+        wrapper.close()
+
+
+def test_read_only_replica_pragmas(tmp_path):
+    path = tmp_path / 'replica.sqlite3'
+    with closing(sqlite3.connect(path)) as connection:
+        connection.execute('CREATE TABLE post (title TEXT)')
+    wrapper = connect(path, REPLICA_ALIAS, read_only=True)
+    try:
+        assert pragma(wrapper, 'journal_mode') == 'delete', (
+            'Убедитесь, что снимок только для чтения не переводится в WAL.'
+        )
+        assert pragma(wrapper, 'busy_timeout') == 5000
+    finally:
+        wrapper.close()
+
+
+def test_tuning_can_be_disabled(tmp_path, settings):
+    settings.SQLITE_TUNING = False
+    wrapper = connect(tmp_path / 'db.sqlite3', 'default')
+    try:
+        assert pragma(wrapper, 'journal_mode') == 'delete'
+    finally:
+        wrapper.close()
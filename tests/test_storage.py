@@ -0,0 +1,134 @@
+import hashlib
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.utils import timezone
+
+from blog.models import ImageBlob, Post
+from blog.storage import ContentAddressedStorage
+from conftest import image_bytes
+
+
+@pytest.mark.django_db
+def test_content_addressed_names(tmp_path):
+    storage = ContentAddressedStorage(location=tmp_path)
+    digest = hashlib.sha256(b'photo').hexdigest()
+    name = storage.save('first.JPG', ContentFile(b'photo'))
+    assert name == f'{digest[:2]}/{digest[2:4]}/{digest}.jpg', (
+        'Убедитесь, что фото хранится под хешем содержимого.'
+    )
+    upload = TemporaryUploadedFile('second.jpg', 'image/jpeg', 5, None)
+    upload.write(b'photo')
+    upload.seek(0)
+    assert storage.save('second.jpg', upload) == name, (
+        'Убедитесь, что одинаковые файлы сохраняются один раз.'
+    )
+    files = [path for path in tmp_path.rglob('*') if path.is_file()]
+    assert files == [tmp_path / name]
+    assert (tmp_path / name).read_bytes() == b'photo'
+
+
+@pytest.mark.django_db
+def test_shared_image_refs(media_root, mixer, user, published_category,
+                           django_capture_on_commit_callbacks):
+    first, second = mixer.cycle(2).blend(
+        'blog.Post', author=user, category=published_category, image='',
+    )
+    gif = image_bytes((400, 200), 'GIF')
+    for post in (first, second):
+        with django_capture_on_commit_callbacks(execute=True):
+            post.image.save('photo.gif', ContentFile(gif))
+    assert first.image.name == second.image.name
+    assert ImageBlob.objects.get().ref_count == 2
+
+    second.refresh_from_db()
+    path = media_root / first.image.name
+    rendition = media_root / second.image_meta['renditions'][0][1]
+    with django_capture_on_commit_callbacks(execute=True):
+        first.delete()
+    assert path.exists(), (
+        'Убедитесь, что файл, на который ссылается другой пост, '
+        'не удаляется.'
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        second.delete()
+    assert not path.exists() and not rendition.exists(), (
+        'Убедитесь, что файл и его копии удаляются вместе '
+        'с последним постом.'
+    )
+    assert not ImageBlob.objects.exists()
+
+
+@pytest.mark.django_db
+def test_reupload_during_delete(media_root, mixer, user, published_category,
+                                django_capture_on_commit_callbacks):
+    post = mixer.blend(
+        'blog.Post', author=user, category=published_category, image='',
+    )
+    post.image.save('photo.txt', ContentFile(b'photo'))
+    with django_capture_on_commit_callbacks() as callbacks:
+        post.delete()
+    # Те же байты загружают, пока удаление ждёт коммита
+    storage = Post._meta.get_field('image').storage
+    name = storage.save('again.txt', ContentFile(b'photo'))
+    for callback in callbacks:
+        callback()
+    assert (media_root / name).exists(), (
+        'Убедитесь, что файл, загруженный снова во время удаления, '
+        'остаётся на диске.'
+    )
+    mixer.blend(
+        'blog.Post', author=user, category=published_category, image=name,
+    )
+    assert ImageBlob.objects.get(name=name).ref_count == 1, (
+        'Убедитесь, что ссылки на файл считает только пост.'
+    )
+
+
+@pytest.mark.django_db
+def test_same_image_reuploaded(media_root, mixer, user, published_category,
+                               django_capture_on_commit_callbacks):
+    post = mixer.blend(
+        'blog.Post', author=user, category=published_category, image='',
+    )
+    post.image.save('photo.txt', ContentFile(b'photo'))
+    # Форма редактирования с тем же файлом
+    post.image.save('again.txt', ContentFile(b'photo'))
+    blob = ImageBlob.objects.get()
+    assert (blob.ref_count, blob.claimed_at) == (1, None), (
+        'Убедитесь, что повторная загрузка того же фото не добавляет '
+        'ссылку.'
+    )
+    path = media_root / post.image.name
+    with django_capture_on_commit_callbacks(execute=True):
+        post.delete()
+    assert not path.exists(), (
+        'Убедитесь, что после повторной загрузки файл удаляется '
+        'вместе с постом.'
+    )
+
+
+@pytest.mark.django_db
+def test_unused_upload_cleared(settings, media_root):
+    storage = Post._meta.get_field('image').storage
+    name = storage.save('photo.txt', ContentFile(b'photo'))
+    call_command('clear_uploads', stdout=StringIO())
+    assert (media_root / name).exists(), (
+        'Убедитесь, что только что загруженный файл не удаляется, '
+        'пока пост не сохранён.'
+    )
+    ImageBlob.objects.update(
+        claimed_at=timezone.now() - timedelta(
+            seconds=settings.IMAGE_CLAIM_TTL + 1,
+        ),
+    )
+    call_command('clear_uploads', stdout=StringIO())
+    assert not (media_root / name).exists(), (
+        'Убедитесь, что clear_uploads удаляет файлы, которые так '
+        'и не попали в пост.'
+    )
+    assert not ImageBlob.objects.exists()
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+from django.core.management import call_command
+
+from blog.models import Category, Comment, Location, Post, User
+from blog.transfer import ImportState
+
+
+def model_counts():
+    return tuple(
+        model.objects.count()
+        for model in (Category, Location, User, Post, Comment)
+    )
+
+
+@pytest.mark.django_db
+def test_export_import_roundtrip(tmp_path, comment_to_a_post):
+    dump = tmp_path / 'blog.jsonl.gz'
+    call_command('export_blog', str(dump))
+    categories, locations, users, posts, comments = model_counts()
+    post = comment_to_a_post.post
+
+    call_command('import_blog', str(dump), batch_size=2)
+    assert model_counts() == (
+        categories, locations * 2, users, posts * 2, comments * 2,
+    ), (
+        'Убедитесь, что при загрузке в непустую базу пользователи '
+        'и категории сопоставляются по username и slug, '
+        'а остальные объекты создаются заново.'
+    )
+    copy = Post.objects.exclude(pk=post.pk).get(title=post.title)
+    assert copy.author_id == post.author_id
+    assert copy.category_id == post.category_id
+    assert copy.location_id != post.location_id
+    assert copy.created_at == post.created_at, (
+        'Убедитесь, что загрузка сохраняет исходные даты.'
+    )
+    assert copy.comment_count == 1
+    assert copy.post_comment.count() == 1
+    assert not (tmp_path / 'blog.jsonl.gz.checkpoint').exists()
+
+
+@pytest.mark.django_db
+def test_import_resumes_from_checkpoint(tmp_path, comment_to_a_post):
+    dump = tmp_path / 'blog.jsonl'
+    call_command('export_blog', str(dump))
+    lines = dump.read_text(encoding='utf-8').splitlines()
+    before = model_counts()
+
+    # Первая загрузка «упала» после строк с категориями
+    loaded = sum(
+        json.loads(line)['model'] == 'blog.category' for line in lines
+    )
+    state = ImportState()
+    state.line = loaded
+    state.matched = {'blog.category': {
+        pk: pk for pk in Category.objects.values_list('pk', flat=True)
+    }}
+    state.save(f'{dump}.checkpoint')
+    call_command('import_blog', str(dump))
+    after = model_counts()
+    assert after[0] == before[0]
+    assert after[3:] == (before[3] * 2, before[4] * 2), (
+        'Убедитесь, что загрузка продолжается с контрольной точки.'
+    )
+
+
+@pytest.mark.django_db
+def test_import_empty_dump(tmp_path):
+    dump = tmp_path / 'empty.jsonl.gz'
+    call_command('export_blog', str(dump))
+    call_command('import_blog', str(dump))
+    assert model_counts() == (0, 0, 0, 0, 0)
+    assert not (tmp_path / 'empty.jsonl.gz.checkpoint').exists()
@@ -0,0 +1,132 @@
+import threading
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from blog.models import ChunkedUpload, Post
+from blog.uploads import append_chunk, locked_part
+from conftest import image_bytes
+
+
+@pytest.fixture
+def upload_dirs(settings, tmp_path, media_root):
+    settings.CHUNKED_UPLOAD_DIR = tmp_path / 'uploads'
+    return tmp_path
+
+
+def post_data(category, **extra):
+    return {
+        'title': 'Фото',
+        'text': 'Текст поста',
+        'pub_date': '2023-01-01T12:00',
+        'category': category.pk,
+        **extra,
+    }
+
+
+@pytest.mark.django_db
+def test_upload_limits(settings, upload_dirs, user_client,
+                       published_category):
+    url = reverse('blog:create_post')
+    photo = image_bytes(format='PNG')
+    settings.POST_IMAGE_MAX_SIZE = len(photo) - 1
+    response = user_client.post(url, post_data(
+        published_category,
+        image=SimpleUploadedFile('big.png', photo, 'image/png'),
+    ))
+    assert response.status_code == 200
+    assert response.context['form'].has_error('image', 'file_too_large'), (
+        'Убедитесь, что фото больше POST_IMAGE_MAX_SIZE отклоняется.'
+    )
+
+    settings.POST_IMAGE_MAX_SIZE = len(photo)
+    settings.POST_IMAGE_MAX_PIXELS = 60 * 40 - 1
+    response = user_client.post(url, post_data(
+        published_category,
+        image=SimpleUploadedFile('wide.png', photo, 'image/png'),
+    ))
+    assert response.context['form'].has_error('image', 'too_many_pixels'), (
+        'Убедитесь, что фото больше POST_IMAGE_MAX_PIXELS отклоняется '
+        'по заголовку файла.'
+    )
+    assert not Post.objects.exists()
+
+
+@pytest.mark.django_db
+def test_chunked_upload(upload_dirs, user_client, another_user_client,
+                        published_category):
+    photo = image_bytes((200, 100), 'PNG')
+    half = len(photo) // 2
+    response = user_client.post(reverse('blog:create_upload'), {
+        'name': 'photo.png', 'size': len(photo),
+    })
+    assert response.status_code == 201
+    upload = response.json()
+
+    def send(client, offset, data):
+        return client.generic(
+            'PATCH', upload['url'], data,
+            content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    assert send(another_user_client, 0, photo[:half]).status_code == 404, (
+        'Убедитесь, что продолжить загрузку может только её автор.'
+    )
+    assert send(user_client, 0, photo[:half]).status_code == 204
+    response = send(user_client, 0, photo[:half])
+    assert response.status_code == 409
+    assert response['Upload-Offset'] == str(half), (
+        'Убедитесь, что при повторной отправке части сервер сообщает, '
+        'сколько байт уже принято.'
+    )
+    response = user_client.head(upload['url'])
+    assert response['Upload-Offset'] == str(half)
+    response = send(user_client, half, photo[half:])
+    assert response['Upload-Offset'] == str(len(photo))
+
+    response = user_client.post(reverse('blog:create_post'), post_data(
+        published_category, upload=upload['id'], title='',
+    ))
+    assert response.status_code == 200
+    assert response.context['form'].files['image'].closed, (
+        'Убедитесь, что файл загрузки закрывается, если форма с ошибкой.'
+    )
+    assert f'value="{upload["id"]}"' in response.content.decode(), (
+        'Убедитесь, что форма с ошибкой сохраняет номер загрузки '
+        'в поле upload.'
+    )
+    response = user_client.post(reverse('blog:create_post'), post_data(
+        published_category, upload=upload['id'],
+    ))
+    assert response.status_code == 302
+    post = Post.objects.get()
+    assert (upload_dirs / 'media' / post.image.name).read_bytes() == photo, (
+        'Убедитесь, что загруженное по частям фото сохраняется в посте.'
+    )
+    assert not ChunkedUpload.objects.exists()
+    assert not any((upload_dirs / 'uploads').iterdir())
+
+
+def test_part_writes_are_serialized(upload_dirs):
+    upload = ChunkedUpload()
+
+    def write_again():
+        with locked_part(upload) as part:
+            append_chunk(part, 0, BytesIO(b'second'), 6)
+
+    with locked_part(upload) as part:
+        append_chunk(part, 0, BytesIO(b'first'), 5)
+        writer = threading.Thread(target=write_again)
+        writer.start()
+        writer.join(0.2)
+        assert writer.is_alive(), (
+            'Убедитесь, что одновременные запросы не пишут файл загрузки '
+            'вместе.'
+        )
+    writer.join()
+    assert (upload_dirs / 'uploads' / f'{upload.pk}.part').read_bytes() == (
+        b'second'
+    )